@@ -1,49 +1,154 @@
-import tkinter as tk
+import time
+_START = time.perf_counter() # Taken before the GUI imports, so --profile-startup can time them
+
+import sys
+import os
 import customtkinter as ctk
 from frames import Step1Frame, Step2Frame, MainMenu
 from utils import load_settings
-import os
+from engine import stream_process_output
+from jobs import JobManager
+from scrollback import SCROLLBACK_LINES
+from runlog import LOG_MAX_BYTES
+from remote import DAEMON_SOCKET, DAEMON_LOG
+from earlystop import EARLY_STOPPING
+from storage import RETENTION
 
 CONFIG_FILE = "config.json"
 
+class StartupProfile:
+    """Records how long each phase of startup takes, up to the first paint of the window."""
+
+    def __init__(self, start):
+        self.last = start
+        self.start = start
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        print("[PROFILE] Startup time by phase:")
+        for phase, seconds in self.phases:
+            print(f"    {phase:<16}{seconds * 1000:8.1f} ms")
+        print(f"    {'time to paint':<16}{(self.last - self.start) * 1000:8.1f} ms")
+
 class MLAgentsApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, profile=None):
         # Main window setup
         super().__init__()
         self.title("ML-Agents Control Panel")
         #self.geometry("500x400")
 
+        self.profile = profile
+        self._mark("window")
+
         print("[ALERT] Starting app!")
 
         # Stores selected virtual env
         self.working_dir = None
         self.virtual_env = None
-        self.current_training_process = None
+        self.job_manager = JobManager(stream_process_output) # Tracks every queued, running and finished run
+        self.scrollback_lines = SCROLLBACK_LINES # Lines kept in each output popup, older lines are paged in from disk
+        self.log_max_bytes = LOG_MAX_BYTES # Size of each run log segment before rotating
+        self.log_compress = False # Gzip run logs
+        self.use_daemon = False # Run training in the background daemon, so runs outlive the app
+        self.early_stopping = dict(EARLY_STOPPING) # Stop runs whose reward plateaus or diverges, see earlystop.py
+        self.retention = dict(RETENTION) # What the storage manager prunes and compresses, see storage.py
 
         print(f"    working_dir: {self.working_dir}")
         print(f"    virtual_env: {self.virtual_env}")
 
-        # Initialise frames
-        self.step1_frame = Step1Frame(self, self)
-        self.step2_frame = Step2Frame(self, self)
-        self.main_menu = MainMenu(self, self)
-
-        # Place frames
-        for frame in (self.step1_frame, self.step2_frame, self.main_menu):
-            frame.grid(row=0, column=0, sticky="nsew")
+        # Frames are built the first time they are shown
+        self._frames = {}
+        self._run_index = None
 
         # Show the frame
         if os.path.exists(CONFIG_FILE): # Show the main menu if config file exists
             load_settings(self)
+            self._mark("settings")
+            self._attach_daemon()
             self.show_frame(self.main_menu)
         else: # Proceed to setup if config file does not exist
             print("[INFO] Cannot find config file, proceeding to setup.")
             self.show_frame(self.step1_frame)
+        self._mark("first frame")
+
+        if self.profile:
+            self.after_idle(self._first_paint)
+
+    @property
+    def step1_frame(self):
+        return self._get_frame(Step1Frame)
+
+    @property
+    def step2_frame(self):
+        return self._get_frame(Step2Frame)
+
+    @property
+    def main_menu(self):
+        return self._get_frame(MainMenu)
+
+    @property
+    def run_index(self):
+        """The RunIndex of the current working directory's results folder, opened on first use."""
+        from runindex import RunIndex
+
+        results_dir = os.path.abspath(os.path.join(self.working_dir or "", "results"))
+        if self._run_index is None or self._run_index.results_dir != results_dir:
+            self._run_index = RunIndex(results_dir)
+        return self._run_index
+
+    def _attach_daemon(self):
+        """Hands the runs to the run daemon if one is running, or starts one if use_daemon is set."""
+        if not self.use_daemon and not os.path.exists(DAEMON_SOCKET):
+            return
+
+        from remote import DaemonClient, RemoteJobManager, daemon_running, spawn_daemon
+
+        if not daemon_running():
+            if not self.use_daemon:
+                return # A socket left behind by a daemon that has exited
+            print("[INFO] Starting the run daemon...")
+            if not spawn_daemon():
+                print(f"[ERROR] The run daemon did not start, see {DAEMON_LOG}. Runs will stop when the app closes.")
+                return
+
+        self.job_manager = RemoteJobManager(DaemonClient(), self.job_manager)
+        print(f"[ALERT] Attached to the run daemon, {len(self.job_manager.snapshot())} runs")
+
+    def _get_frame(self, frame_class):
+        """Returns the frame of the given class, building and placing it on first use."""
+        frame = self._frames.get(frame_class)
+        if frame is None:
+            frame = frame_class(self, self)
+            frame.grid(row=0, column=0, sticky="nsew")
+            self._frames[frame_class] = frame
+        return frame
 
     # Switch between frames
     def show_frame(self, frame):
         frame.tkraise()
 
+    def _mark(self, phase):
+        if self.profile:
+            self.profile.mark(phase)
+
+    def _first_paint(self):
+        # Idle callbacks queued before this one include the window's first redraw
+        self.update_idletasks()
+        self._mark("first paint")
+        self.profile.report()
+        self.destroy()
+
 if __name__ == "__main__":
-    app = MLAgentsApp()
+    profile = None
+    if "--profile-startup" in sys.argv[1:]:
+        # Report time to first paint by phase, then exit
+        profile = StartupProfile(_START)
+        profile.mark("imports")
+
+    app = MLAgentsApp(profile)
     app.mainloop()
@@ -0,0 +1,366 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+
+from jobs import JobManager
+from engine import create_job, stream_process_output
+from runlog import LOG_MAX_BYTES
+from resources import PAGE_SIZE
+from scrollback import SCROLLBACK_LINES
+
+# Measures the panel's overhead against fake_trainer.py, and reports it as JSON:
+#
+#     python bench.py --output bench.json
+#     python bench.py --quick --only latency,termination
+#
+# Runs go through the same create_job and JobManager path as begin_training, so the reader,
+# the metrics parser, the run log and the search index are all included. With a display, the
+# line rate benchmark also flushes the output into a Tk text widget through OutputBuffer.
+
+FAKE_TRAINER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_trainer.py")
+STAMP_PREFIX = "[DEBUG] t=" # Filler lines of fake_trainer.py, followed by the time they were written
+
+BENCHMARKS = ("launch", "latency", "max_rate", "memory", "termination")
+RATES = (1000, 5000, 10000, 20000, 50000, 100000) # Lines per second tried by max_rate
+MAX_P95_LATENCY = 0.1 # Seconds, above it a rate is not sustained
+HEARTBEAT_MS = 20 # The Tk loop is scheduled this often while the UI is measured
+
+def _stamp(text):
+    """Returns the time a fake_trainer.py filler line was written, or None for other lines."""
+    if not text.startswith(STAMP_PREFIX):
+        return None
+    try:
+        return float(text[len(STAMP_PREFIX):text.index(" ", len(STAMP_PREFIX))])
+    except ValueError:
+        return None
+
+def _percentiles(values, scale=1000.0):
+    """Returns p50, p95, p99 and max of a list of seconds, in milliseconds."""
+    if not values:
+        return None
+    data = np.asarray(values) * scale
+    p50, p95, p99 = np.percentile(data, (50, 95, 99))
+    return {"p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3), "max": round(float(data.max()), 3), "count": len(data)}
+
+def _rss():
+    """Resident memory of this process in bytes."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class LatencyProbe:
+    """Line consumer that records when lines arrive and how long after they were written."""
+
+    def __init__(self):
+        self.first_at = None
+        self.last_at = None
+        self.lines = 0
+        self.latencies = []
+
+    def feed(self, lines):
+        now = time.time()
+        if self.first_at is None:
+            self.first_at = now
+        self.last_at = now
+        self.lines += len(lines)
+        for line in lines:
+            stamp = _stamp(line.text)
+            if stamp is not None:
+                self.latencies.append(now - stamp)
+
+class Bench:
+    """Runs the benchmarks in a temporary working directory.
+
+    Args:
+        working_dir (str): Where the fake runs write their results.
+        quick (bool): Shorter runs, for a smoke test rather than stable numbers.
+        ui (bool): Also measure the Tk output path, if a display is available.
+    """
+
+    def __init__(self, working_dir, quick=False, ui=True):
+        self.working_dir = working_dir
+        self.quick = quick
+        self.log_max_bytes = LOG_MAX_BYTES
+        self.log_compress = False
+        self.early_stopping = {}
+        self.job_manager = JobManager(stream_process_output)
+        self._runs = 0
+
+        self.root = None
+        self.ui_error = None
+        if ui:
+            try:
+                import tkinter as tk
+
+                self.root = tk.Tk()
+                self.root.withdraw()
+            except Exception as e:
+                self.ui_error = str(e)
+        else:
+            self.ui_error = "Disabled with --no-ui"
+
+    def start(self, trainer_args, job_manager=None, search=True):
+        """Queues a fake run the way begin_training does, returns (job, probe, seconds in create_job)."""
+        self._runs += 1
+        run_id = f"bench_{self._runs}"
+        argv = [sys.executable, FAKE_TRAINER, "config.yaml", f"--run-id={run_id}", "--force", *trainer_args]
+
+        started = time.perf_counter()
+        job = create_job(self, run_id, argv, search=search)
+        create_seconds = time.perf_counter() - started
+
+        probe = LatencyProbe()
+        job.consumers.append(probe)
+        (job_manager or self.job_manager).submit(job)
+        return job, probe, create_seconds
+
+    def wait(self, job, timeout=None):
+        deadline = time.monotonic() + timeout if timeout else None
+        while job.active and (deadline is None or time.monotonic() < deadline):
+            if self.root is not None:
+                self.root.update()
+            time.sleep(0.01)
+
+    def launch(self, repeats=None):
+        """Time from queueing a run to its process starting and to its first line of output."""
+        repeats = repeats or (3 if self.quick else 10)
+        python_start, started, first_line, create = [], [], [], []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, "-c", "pass"], check=True)
+            python_start.append(time.perf_counter() - t0)
+
+            t0 = time.time()
+            job, probe, create_seconds = self.start(["--rate=1000", "--duration=0.2", "--save-delay=0"])
+            self.wait(job)
+            create.append(create_seconds)
+            started.append(job.started_at - t0)
+            if probe.first_at is not None:
+                first_line.append(probe.first_at - t0)
+
+        return {
+            "repeats": repeats,
+            "create_job_ms": _percentiles(create),
+            "process_started_ms": _percentiles(started),
+            "first_output_ms": _percentiles(first_line),
+            "python_startup_ms": _percentiles(python_start), # The floor, a bare interpreter start
+        }
+
+    def latency(self, rate=None, seconds=None, line_bytes=120):
+        """Time from a line being written by the trainer to it reaching the consumers."""
+        rate = rate or 2000
+        seconds = seconds or (3 if self.quick else 15)
+        return self._stream(rate, seconds, line_bytes, ui=False)
+
+    def max_rate(self, rates=RATES, seconds=None, line_bytes=120, max_p95=MAX_P95_LATENCY):
+        """The highest line rate the panel keeps up with, with and without the Tk output path."""
+        seconds = seconds or (2 if self.quick else 10)
+        result = {"max_p95_latency_ms": max_p95 * 1000, "seconds": seconds, "line_bytes": line_bytes}
+        for ui in (False, True):
+            if ui and self.root is None:
+                result["ui"] = {"skipped": self.ui_error}
+                continue
+
+            trials = []
+            sustained = None
+            for rate in rates:
+                trial = self._stream(rate, seconds, line_bytes, ui=ui)
+                trials.append(trial)
+                latency = trial["display_latency_ms"] if ui else trial["latency_ms"]
+                ok = (
+                    trial["achieved_rate"] >= 0.95 * rate
+                    and latency is not None and latency["p95"] <= max_p95 * 1000
+                    and (not ui or (trial["heartbeat_late_ms"] or {"p95": 0})["p95"] <= max_p95 * 1000)
+                )
+                trial["sustained"] = ok
+                if not ok:
+                    break
+                sustained = rate
+            result["ui" if ui else "headless"] = {"max_sustained_rate": sustained, "trials": trials}
+        return result
+
+    def memory(self, rate=None, seconds=None, interval=1.0, line_bytes=120):
+        """Resident memory of the panel's process while one run streams output for a long time."""
+        rate = rate or 5000
+        seconds = seconds or (10 if self.quick else 120)
+        job, probe, _ = self.start([f"--rate={rate}", f"--line-bytes={line_bytes}", f"--duration={seconds}", "--save-delay=0"])
+
+        samples = []
+        started = time.monotonic()
+        while job.active:
+            samples.append((time.monotonic() - started, _rss()))
+            self.wait(job, interval)
+        samples.append((time.monotonic() - started, _rss()))
+
+        times = np.array([t for t, _ in samples])
+        rss = np.array([r for _, r in samples], dtype=np.float64) / 2**20
+        settled = times >= times[-1] * 0.1 # Skip the startup allocations
+        slope = np.polyfit(times[settled], rss[settled], 1)[0] if settled.sum() >= 2 else 0.0
+        return {
+            "rate": rate,
+            "seconds": seconds,
+            "lines": probe.lines,
+            "start_mb": round(rss[0], 2),
+            "end_mb": round(rss[-1], 2),
+            "peak_mb": round(rss.max(), 2),
+            "growth_mb_per_minute": round(slope * 60, 3),
+            "mb_per_million_lines": round((rss[-1] - rss[0]) / max(probe.lines, 1) * 1e6, 3),
+        }
+
+    def termination(self):
+        """Time from a stop request to the run having exited, for each step of the escalation."""
+        scenarios = (
+            ("sigint", ["--save-delay=0.5"], 15, 5), # Saves and exits on SIGINT
+            ("sigterm", ["--ignore-sigint"], 1, 5), # Outlives SIGINT, dies on SIGTERM
+            ("sigkill", ["--ignore-sigint", "--ignore-sigterm"], 1, 1), # Only SIGKILL ends it
+        )
+        results = {}
+        for name, trainer_args, sigint_timeout, sigterm_timeout in scenarios:
+            job_manager = JobManager(stream_process_output, sigint_timeout=sigint_timeout, sigterm_timeout=sigterm_timeout)
+            job, probe, _ = self.start(["--rate=100", *trainer_args], job_manager)
+            while probe.first_at is None and job.active:
+                time.sleep(0.01)
+
+            t0 = time.time()
+            job_manager.stop(job)
+            call_seconds = time.time() - t0
+            self.wait(job, sigint_timeout + sigterm_timeout + 10)
+            results[name] = {
+                "stop_call_ms": round(call_seconds * 1000, 3), # stop() must not block
+                "exit_ms": round(((job.ended_at or time.time()) - t0) * 1000, 1),
+                "timeouts_s": [sigint_timeout, sigterm_timeout],
+                "state": job.state,
+                "stop_status": job.stop_status,
+            }
+        return results
+
+    def _stream(self, rate, seconds, line_bytes, ui):
+        """Streams one run at a fixed rate, returns its latencies and the CPU time of this process."""
+        job, probe, _ = self.start([f"--rate={rate}", f"--line-bytes={line_bytes}", f"--duration={seconds}", "--save-delay=0"])
+
+        display, late = [], []
+        if ui:
+            import tkinter as tk
+            from utils import OutputBuffer # Deferred, it needs Tk
+
+            class TimedOutputBuffer(OutputBuffer):
+                def _take(self):
+                    data = super()._take()
+                    now = time.time()
+                    start = data.rfind(STAMP_PREFIX)
+                    if start >= 0:
+                        stamp = _stamp(data[start:])
+                        if stamp is not None:
+                            display.append(now - stamp)
+                    return data
+
+            text_widget = tk.Text(self.root)
+            job.output = TimedOutputBuffer(text_widget, scrollback_lines=SCROLLBACK_LINES)
+            job.output.start()
+
+            def heartbeat(expected):
+                now = time.monotonic()
+                late.append(max(now - expected, 0.0))
+                if job.active:
+                    self.root.after(HEARTBEAT_MS, heartbeat, now + HEARTBEAT_MS / 1000)
+
+            self.root.after(HEARTBEAT_MS, heartbeat, time.monotonic() + HEARTBEAT_MS / 1000)
+
+        cpu = time.process_time()
+        wall = time.monotonic()
+        self.wait(job)
+        cpu = time.process_time() - cpu
+        wall = time.monotonic() - wall
+
+        if ui:
+            job.output.stop()
+            text_widget.destroy()
+
+        # Over the time the lines took to arrive, which grows if the reader falls behind
+        span = max((probe.last_at or 0) - (probe.first_at or 0), seconds)
+        result = {
+            "rate": rate,
+            "achieved_rate": round(len(probe.latencies) / span, 1),
+            "lines": probe.lines,
+            "latency_ms": _percentiles(probe.latencies),
+            "panel_cpu_percent": round(cpu / wall * 100, 1) if wall else None,
+        }
+        if ui:
+            result["display_latency_ms"] = _percentiles(display)
+            result["heartbeat_late_ms"] = _percentiles(late)
+        return result
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the control panel against a synthetic trainer")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    parser.add_argument("--only", help=f"Comma separated benchmarks, of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="Shorter runs, for a smoke test")
+    parser.add_argument("--no-ui", action="store_true", help="Do not measure the Tk output path")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directory")
+    args = parser.parse_args(argv)
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    working_dir = tempfile.mkdtemp(prefix="mlagents-bench-")
+    bench = Bench(working_dir, quick=args.quick, ui=not args.no_ui)
+    report = {
+        "meta": {
+            "time": time.time(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick,
+            "ui": bench.root is not None,
+            "ui_error": bench.ui_error,
+        },
+        "results": {},
+    }
+
+    try:
+        for name in selected:
+            print(f"[INFO] Running {name}...", file=sys.stderr)
+            started = time.monotonic()
+            report["results"][name] = getattr(bench, name)()
+            print(f"    took {time.monotonic() - started:.1f}s", file=sys.stderr)
+    finally:
+        bench.job_manager.stop_all()
+        if bench.root is not None:
+            bench.root.destroy()
+        if args.keep:
+            print(f"[INFO] Runs kept in {working_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(working_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
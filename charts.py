@@ -0,0 +1,326 @@
+import math
+import tkinter as tk
+import numpy as np
+from metrics import downsample
+
+CHART_REFRESH_MS = 1000
+COLORS = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#17becf")
+
+def _nice_ceiling(value):
+    """Rounds up to 1, 2 or 5 times a power of ten, used for axis limits with headroom."""
+    if value <= 0:
+        return 1.0
+    power = 10 ** math.floor(math.log10(value))
+    for factor in (1, 2, 5, 10):
+        if value <= factor * power:
+            return factor * power
+
+class SeriesChart(tk.Canvas):
+    """One line per behavior, drawn from a series source and updated incrementally.
+
+    New points are appended as line segments onto the existing drawing. The axes are given
+    headroom, so the chart is only redrawn in full when a point falls outside them, which
+    happens a logarithmic number of times over a run. Full redraws downsample every series
+    to the width of the canvas.
+
+    A source has a `version` that changes whenever points are added, and a `snapshot(start_at)`
+    method returning {name: (steps, values)} from the given start index per name, for example
+    metrics.TrainingMetrics or tfevents.TagSource.
+
+    Args:
+        parent (tk.Widget): The widget the chart is placed in.
+        source (object): The series to draw.
+    """
+
+    MARGIN = 40
+
+    def __init__(self, parent, source, height=160, **kwargs):
+        super().__init__(parent, height=height, background="white", highlightthickness=0, **kwargs)
+        self.source = source
+        self._names = [] # Series names in the order they were first seen, for stable colors
+
+        self._version = -1
+        self._drawn = {} # Behavior -> number of points already drawn
+        self._last_point = {} # Behavior -> canvas coordinates of the last drawn point
+        self._legend = {} # Behavior -> canvas item showing its latest value
+        self._x_max = None
+        self._y_range = None
+        self._after_id = None
+
+        self.bind("<Configure>", lambda event: self._redraw())
+        self._schedule()
+
+    def _schedule(self):
+        self._after_id = self.after(CHART_REFRESH_MS, self._refresh)
+
+    def set_source(self, source):
+        """Switches the chart to another source and redraws it."""
+        self.source = source
+        self._names = []
+        self._redraw()
+
+    def _refresh(self):
+        try:
+            if self.source.version != self._version:
+                self._update()
+            self._schedule()
+        except tk.TclError:
+            self._after_id = None # The chart has been destroyed
+
+    def _snapshot(self, start_at=None):
+        """Returns (steps, values) float arrays per series, from the given start indices."""
+        self._version = self.source.version # Read first, so a change during the copy is not missed
+        result = {}
+        for name, (steps, values) in self.source.snapshot(start_at).items():
+            result[name] = (np.asarray(steps, dtype=np.float64), np.asarray(values, dtype=np.float64))
+            if name not in self._names:
+                self._names.append(name)
+        return result
+
+    def _update(self):
+        new_points = self._snapshot(self._drawn)
+
+        # New behaviors, or points outside the current axes, mean the whole chart has to be redrawn
+        for behavior, (steps, values) in new_points.items():
+            if not len(steps):
+                continue
+            if behavior not in self._legend or steps.max() > self._x_max:
+                return self._redraw()
+            finite = values[values == values] # Ignore NaN values
+            if len(finite) and (finite.min() < self._y_range[0] or finite.max() > self._y_range[1]):
+                return self._redraw()
+
+        for behavior, (steps, values) in new_points.items():
+            if len(steps):
+                self._append(behavior, steps, values)
+                self.itemconfigure(self._legend[behavior], text=f"{behavior}: {values[-1]:.3f}")
+
+    def _append(self, behavior, steps, values):
+        coords = list(self._last_point.get(behavior, ()))
+        for step, value in zip(steps, values):
+            if value == value: # Skip NaN
+                coords.extend(self._to_canvas(step, value))
+
+        if len(coords) >= 4:
+            self.create_line(*coords, fill=self._color(behavior), tags="series")
+        if len(coords) >= 2:
+            self._last_point[behavior] = coords[-2:]
+        self._drawn[behavior] = self._drawn.get(behavior, 0) + len(steps)
+
+    def _redraw(self):
+        """Rescales the axes with headroom and redraws every series, downsampled to the width."""
+        data = self._snapshot()
+        self.delete("all")
+        self._drawn = {}
+        self._last_point = {}
+        self._legend = {}
+
+        points = [(steps, values) for steps, values in data.values() if len(steps)]
+        if not points:
+            self._x_max = None
+            self.create_text(self.winfo_width() // 2, self.winfo_height() // 2, text="Waiting for data...", fill="gray")
+            return
+
+        x_max = max(steps.max() for steps, _ in points)
+        finite = [values[values == values] for _, values in points]
+        finite = [r for r in finite if len(r)]
+        low = min(r.min() for r in finite) if finite else 0.0
+        high = max(r.max() for r in finite) if finite else 1.0
+        span = max(high - low, 1e-6)
+
+        self._x_max = _nice_ceiling(x_max * 1.25)
+        self._y_range = (low - span * 0.25, high + span * 0.25)
+
+        self._draw_axes()
+
+        width = max(self.winfo_width() - 2 * self.MARGIN, 10)
+        for index, (behavior, (steps, values)) in enumerate(data.items()):
+            shown_steps, shown_values = downsample(steps, values, width)
+            self._append(behavior, shown_steps, shown_values)
+            self._drawn[behavior] = len(steps)
+
+            latest = values[-1] if len(values) else float("nan")
+            self._legend[behavior] = self.create_text(
+                self.MARGIN + 5, 10 + index * 14,
+                text=f"{behavior}: {latest:.3f}",
+                anchor="w",
+                fill=self._color(behavior),
+                font=("Arial", 9)
+            )
+
+    def _draw_axes(self):
+        width, height = self.winfo_width(), self.winfo_height()
+        left, bottom = self.MARGIN, height - 20
+        self.create_line(left, 5, left, bottom, width - 5, bottom, fill="gray")
+        self.create_text(left - 4, 8, text=f"{self._y_range[1]:.2f}", anchor="ne", font=("Arial", 8))
+        self.create_text(left - 4, bottom, text=f"{self._y_range[0]:.2f}", anchor="e", font=("Arial", 8))
+        self.create_text(width - 5, bottom + 4, text=f"{self._x_max:,.0f} steps", anchor="ne", font=("Arial", 8))
+
+    def _to_canvas(self, step, value):
+        width, height = self.winfo_width(), self.winfo_height()
+        low, high = self._y_range
+        x = self.MARGIN + (step / self._x_max) * (width - self.MARGIN - 5)
+        y = (height - 20) - (value - low) / (high - low) * (height - 25)
+        return x, y
+
+    def _color(self, name):
+        return COLORS[self._names.index(name) % len(COLORS)] if name in self._names else COLORS[0]
+
+    def destroy(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        super().destroy()
+
+class CompareChart(tk.Canvas):
+    """Overlay of many aligned curves, with shaded min/max bands and a hover readout.
+
+    It draws what compare.align and compare.smooth produce, one value per grid column, so a
+    redraw costs the same however many points the runs have. Drag across the chart to zoom
+    into a range of steps, right click to zoom out again.
+
+    Args:
+        parent (tk.Widget): The widget the chart is placed in.
+        on_zoom (callable): Called with (low, high) steps to zoom into, or None to zoom out.
+    """
+
+    MARGIN = 50
+    LEGEND_ENTRIES = 12 # More series are summarised as "+N more"
+
+    def __init__(self, parent, on_zoom=None, height=360, **kwargs):
+        super().__init__(parent, height=height, background="white", highlightthickness=0, **kwargs)
+        self.on_zoom = on_zoom
+        self.grid = np.zeros(0)
+        self.lines = {} # Name -> values per grid column
+        self.bands = {} # Group -> (mean, low, high) per grid column
+        self.colors = {} # Name or group -> color
+        self._x_range = (0.0, 1.0)
+        self._y_range = (0.0, 1.0)
+        self._drag_start = None
+
+        self.bind("<Configure>", lambda event: self.redraw())
+        self.bind("<Motion>", self._on_motion)
+        self.bind("<Leave>", lambda event: self.delete("cursor"))
+        self.bind("<ButtonPress-1>", self._on_press)
+        self.bind("<B1-Motion>", self._on_drag)
+        self.bind("<ButtonRelease-1>", self._on_release)
+        self.bind("<Button-3>", lambda event: self.on_zoom and self.on_zoom(None))
+
+    def show(self, grid, lines, bands=None, colors=None):
+        """Replaces what is drawn.
+
+        Args:
+            grid (np.ndarray): Steps of the grid columns.
+            lines (dict): {name: values} per grid column, drawn as lines.
+            bands (dict): {group: (mean, low, high)} per grid column, drawn as a shaded band and a mean line.
+            colors (dict): Color per name or group, from COLORS by default.
+        """
+        self.grid = grid
+        self.lines = lines
+        self.bands = bands or {}
+        names = list(self.bands) + list(lines)
+        self.colors = colors or {name: COLORS[i % len(COLORS)] for i, name in enumerate(names)}
+        self.redraw()
+
+    def redraw(self):
+        self.delete("all")
+        columns = [values for values in self.lines.values()]
+        for _, low, high in self.bands.values():
+            columns.extend((low, high))
+        finite = [values[np.isfinite(values)] for values in columns]
+        finite = [values for values in finite if len(values)]
+        if not len(self.grid) or not finite:
+            self.create_text(self.winfo_width() // 2, self.winfo_height() // 2, text="No data to compare", fill="gray")
+            return
+
+        low = min(values.min() for values in finite)
+        high = max(values.max() for values in finite)
+        span = max(high - low, 1e-6)
+        self._x_range = (float(self.grid[0]), float(self.grid[-1]) if self.grid[-1] > self.grid[0] else float(self.grid[0]) + 1)
+        self._y_range = (low - span * 0.05, high + span * 0.05)
+        self._draw_axes()
+
+        for group, (mean, low_values, high_values) in self.bands.items():
+            for upper, lower in self._segments(high_values, low_values):
+                self.create_polygon(*upper, *lower[::-1], fill=self.colors[group], stipple="gray25", outline="")
+        for name, values in self.lines.items():
+            self._line(values, self.colors.get(name, COLORS[0]), 1)
+        for group, (mean, _, _) in self.bands.items():
+            self._line(mean, self.colors[group], 2)
+
+        entries = list(self.bands) + [name for name in self.lines if name not in self.bands]
+        for index, name in enumerate(entries[:self.LEGEND_ENTRIES]):
+            self.create_text(self.MARGIN + 5, 10 + index * 14, text=name, anchor="w", fill=self.colors.get(name, COLORS[0]), font=("Arial", 9))
+        if len(entries) > self.LEGEND_ENTRIES:
+            self.create_text(self.MARGIN + 5, 10 + self.LEGEND_ENTRIES * 14, text=f"+{len(entries) - self.LEGEND_ENTRIES} more", anchor="w", fill="gray", font=("Arial", 9))
+
+    def _segments(self, upper, lower):
+        """Yields canvas coordinates of the runs of columns where both bounds are finite."""
+        valid = np.isfinite(upper) & np.isfinite(lower)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], valid.view(np.int8), [0]))))
+        for start, end in zip(edges[::2], edges[1::2]):
+            if end - start >= 2:
+                yield self._coords(self.grid[start:end], upper[start:end]), self._coords(self.grid[start:end], lower[start:end])
+
+    def _line(self, values, color, width):
+        valid = np.isfinite(values)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], valid.view(np.int8), [0]))))
+        for start, end in zip(edges[::2], edges[1::2]):
+            if end - start >= 2:
+                self.create_line(*self._coords(self.grid[start:end], values[start:end]), fill=color, width=width)
+
+    def _coords(self, steps, values):
+        """Canvas coordinates of points, flattened to x1, y1, x2, y2, ..."""
+        width, height = self.winfo_width(), self.winfo_height()
+        x_low, x_high = self._x_range
+        y_low, y_high = self._y_range
+        x = self.MARGIN + (steps - x_low) / (x_high - x_low) * (width - self.MARGIN - 5)
+        y = (height - 20) - (values - y_low) / (y_high - y_low) * (height - 25)
+        return np.column_stack((x, y)).ravel().tolist()
+
+    def _to_step(self, x):
+        x_low, x_high = self._x_range
+        return x_low + (x - self.MARGIN) / max(self.winfo_width() - self.MARGIN - 5, 1) * (x_high - x_low)
+
+    def _draw_axes(self):
+        width, height = self.winfo_width(), self.winfo_height()
+        left, bottom = self.MARGIN, height - 20
+        self.create_line(left, 5, left, bottom, width - 5, bottom, fill="gray")
+        self.create_text(left - 4, 8, text=f"{self._y_range[1]:.2f}", anchor="ne", font=("Arial", 8))
+        self.create_text(left - 4, bottom, text=f"{self._y_range[0]:.2f}", anchor="e", font=("Arial", 8))
+        self.create_text(left, bottom + 4, text=f"{self._x_range[0]:,.0f}", anchor="nw", font=("Arial", 8))
+        self.create_text(width - 5, bottom + 4, text=f"{self._x_range[1]:,.0f} steps", anchor="ne", font=("Arial", 8))
+
+    def _on_motion(self, event):
+        """Shows the step under the cursor and the value of each band, or the nearest lines."""
+        self.delete("cursor")
+        if not len(self.grid) or event.x < self.MARGIN:
+            return
+        column = int(np.clip(np.searchsorted(self.grid, self._to_step(event.x)), 0, len(self.grid) - 1))
+        self.create_line(event.x, 5, event.x, self.winfo_height() - 20, fill="gray", dash=(2, 2), tags="cursor")
+
+        values = [(group, mean[column]) for group, (mean, _, _) in self.bands.items()]
+        if len(values) < self.LEGEND_ENTRIES:
+            values += sorted(
+                ((name, line[column]) for name, line in self.lines.items() if np.isfinite(line[column])),
+                key=lambda item: -item[1]
+            )[:self.LEGEND_ENTRIES - len(values)]
+        text = "\n".join([f"{self.grid[column]:,.0f} steps"] + [f"{name}: {value:.3f}" for name, value in values])
+        anchor = "ne" if event.x > self.winfo_width() / 2 else "nw"
+        self.create_text(event.x + (-8 if anchor == "ne" else 8), 10, text=text, anchor=anchor, font=("Arial", 9), tags="cursor")
+
+    def _on_press(self, event):
+        self._drag_start = event.x
+
+    def _on_drag(self, event):
+        self.delete("zoom")
+        if self._drag_start is not None:
+            self.create_rectangle(self._drag_start, 5, event.x, self.winfo_height() - 20, outline="gray", dash=(3, 3), tags="zoom")
+
+    def _on_release(self, event):
+        self.delete("zoom")
+        start, self._drag_start = self._drag_start, None
+        if start is None or abs(event.x - start) < 5 or not self.on_zoom:
+            return
+        low, high = sorted((self._to_step(start), self._to_step(event.x)))
+        self.on_zoom((low, high))
@@ -0,0 +1,245 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import warnings
+import numpy as np
+
+from tfevents import RunEventReader, EVENT_FILE_PREFIX
+
+# Scalars of compared runs are kept here as .npy files, memory-mapped when a comparison reopens
+COMPARE_CACHE_DIR = os.path.join("cache", "compare")
+CACHE_VERSION = 1
+POINT_DTYPE = np.dtype([("step", "<i8"), ("value", "<f4")])
+
+GRID_POINTS = 1000 # Columns of the common step grid, about the width of the chart
+SEED_PATTERN = r"[_-](?:seed|s)?\d+$" # Stripped from Run IDs to group the seeds of one config
+
+def _event_fingerprint(run_dir):
+    """Returns the relative path, size and mtime of every event file of a run."""
+    files = []
+    for root, _, names in os.walk(run_dir):
+        for name in names:
+            if name.startswith(EVENT_FILE_PREFIX):
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append([os.path.relpath(path, run_dir), stat.st_size, stat.st_mtime_ns])
+    return sorted(files)
+
+class CachedRun:
+    """The scalars of one run, read from its event files once and then from the cache.
+
+    The cache holds one structured .npy array of (step, value) per tag and behavior, and a
+    manifest with the event files' sizes and mtimes. While those are unchanged the arrays are
+    memory-mapped, so reopening a comparison costs a few stats and no decoding.
+
+    Args:
+        run_dir (str): The results/<run_id> folder.
+        cache_dir (str): Where the cached arrays are kept.
+    """
+
+    def __init__(self, run_dir, cache_dir=COMPARE_CACHE_DIR):
+        self.run_dir = os.path.abspath(run_dir)
+        self.run_id = os.path.basename(self.run_dir)
+        key = hashlib.sha1(self.run_dir.encode("utf-8")).hexdigest()[:16]
+        self.cache_path = os.path.join(cache_dir, f"{self.run_id}-{key}")
+        self.manifest = None
+        self.from_cache = False
+
+    def load(self):
+        """Makes sure the cache is current, reading the event files if they changed. Returns self."""
+        fingerprint = _event_fingerprint(self.run_dir)
+        try:
+            with open(os.path.join(self.cache_path, "manifest.json"), "r") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == CACHE_VERSION and manifest.get("fingerprint") == fingerprint:
+                self.manifest = manifest
+                self.from_cache = True
+                return self
+        except (OSError, ValueError):
+            pass
+
+        self.manifest = self._build(fingerprint)
+        self.from_cache = False
+        return self
+
+    def _build(self, fingerprint):
+        reader = RunEventReader(self.run_dir)
+        reader.poll()
+
+        # Written next to the old cache, which is only replaced once the new one is complete
+        building = self.cache_path + ".building"
+        shutil.rmtree(building, ignore_errors=True)
+        os.makedirs(building)
+        series = {}
+        for tag in reader.tags():
+            series[tag] = {}
+            for behavior, scalars in reader.series(tag).items():
+                points = np.empty(len(scalars), dtype=POINT_DTYPE)
+                points["step"] = np.frombuffer(scalars.steps, dtype=np.int64) if len(scalars) else []
+                points["value"] = np.frombuffer(scalars.values, dtype=np.float64) if len(scalars) else []
+                points = points[np.argsort(points["step"], kind="stable")] # A resumed run can restart its steps
+                name = f"{len(os.listdir(building))}.npy"
+                np.save(os.path.join(building, name), points)
+                series[tag][behavior] = name
+
+        manifest = {"version": CACHE_VERSION, "fingerprint": fingerprint, "series": series}
+        with open(os.path.join(building, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+        shutil.rmtree(self.cache_path, ignore_errors=True)
+        os.replace(building, self.cache_path)
+        return manifest
+
+    def tags(self):
+        return sorted(self.manifest["series"]) if self.manifest else []
+
+    def series(self, tag):
+        """Returns {behavior: (steps, values)} memory-mapped arrays of a tag, steps ascending."""
+        result = {}
+        for behavior, name in (self.manifest or {}).get("series", {}).get(tag, {}).items():
+            points = np.load(os.path.join(self.cache_path, name), mmap_mode="r")
+            result[behavior] = (points["step"], points["value"])
+        return result
+
+def load_runs(run_dirs, cache_dir=COMPARE_CACHE_DIR, cancelled=None):
+    """Loads several runs through the cache, skipping runs without event files.
+
+    Returns:
+        list: The CachedRun of each run that has scalars, in the given order.
+    """
+    runs = []
+    for run_dir in run_dirs:
+        if cancelled is not None and cancelled.is_set():
+            break
+        try:
+            run = CachedRun(run_dir, cache_dir).load()
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Failed to load the scalars of {run_dir}: {e}")
+            continue
+        if run.tags():
+            runs.append(run)
+    return runs
+
+def curves(runs, tag):
+    """Returns [(name, steps, values)] of a tag, one per run, or per run and behavior if it has several."""
+    result = []
+    for run in runs:
+        series = run.series(tag)
+        for behavior, (steps, values) in series.items():
+            name = run.run_id if len(series) == 1 else f"{run.run_id}/{behavior}"
+            result.append((name, steps, values))
+    return result
+
+def align(series, points=GRID_POINTS, x_range=None):
+    """Puts several curves on a common step grid.
+
+    Each curve is averaged into the grid's bins, so millions of points reduce to one value per
+    column without aliasing. Empty bins inside a curve's range are interpolated, and bins
+    outside it are NaN.
+
+    Args:
+        series (list): (steps, values) of each curve, steps ascending.
+        points (int): Columns of the grid.
+        x_range (tuple): (low, high) steps the grid spans, None for the range of all curves.
+
+    Returns:
+        tuple: The grid's steps, of shape (points,), and the values, of shape (curves, points).
+    """
+    spans = [(steps[0], steps[-1]) for steps, _ in series if len(steps)]
+    if not spans:
+        return np.zeros(0), np.zeros((len(series), 0))
+    low, high = x_range or (min(s for s, _ in spans), max(e for _, e in spans))
+    high = max(high, low + 1)
+
+    edges = np.linspace(low, high, points + 1)
+    grid = (edges[:-1] + edges[1:]) / 2
+    matrix = np.full((len(series), points), np.nan)
+    for row, (steps, values) in enumerate(series):
+        # The points in range, and one either side of it to interpolate up to the edges
+        start = np.searchsorted(steps, low, side="left")
+        end = np.searchsorted(steps, high, side="right")
+        x = np.asarray(steps[max(start - 1, 0):end + 1], dtype=np.float64)
+        y = np.asarray(values[max(start - 1, 0):end + 1], dtype=np.float64)
+        finite = np.isfinite(y)
+        x, y = x[finite], y[finite]
+        if not len(x):
+            continue
+
+        in_range = (x >= low) & (x <= high)
+        bins = np.minimum(((x[in_range] - low) / (high - low) * points).astype(np.int64), points - 1)
+        counts = np.bincount(bins, minlength=points)
+        sums = np.bincount(bins, weights=y[in_range], minlength=points)
+        filled = counts > 0
+        np.divide(sums, counts, out=matrix[row], where=filled)
+
+        gaps = ~filled & (grid >= x[0]) & (grid <= x[-1])
+        if gaps.any():
+            matrix[row, gaps] = np.interp(grid[gaps], x, y)
+    return grid, matrix
+
+def smooth(matrix, method="ema", weight=0.6, window=9):
+    """Smooths every curve of an aligned matrix at once, ignoring NaN.
+
+    Args:
+        matrix (np.ndarray): Values of shape (curves, points), see align.
+        method (str): "ema" for TensorBoard's debiased exponential moving average, "mean" for a
+            centred moving average over `window` columns, anything else leaves the curves as they are.
+        weight (float): The EMA's smoothing weight, from 0 (none) to below 1.
+        window (int): The moving average's width in grid columns.
+
+    Returns:
+        np.ndarray: The smoothed values, NaN where the input is NaN.
+    """
+    valid = np.isfinite(matrix)
+    if method == "ema":
+        result = np.full_like(matrix, np.nan)
+        average = np.zeros(len(matrix))
+        count = np.zeros(len(matrix))
+        for column in range(matrix.shape[1]):
+            ok = valid[:, column]
+            average[ok] = average[ok] * weight + (1 - weight) * matrix[ok, column]
+            count[ok] += 1
+            result[ok, column] = average[ok] / (1 - weight ** count[ok])
+        return result
+
+    if method == "mean":
+        # A box convolution along each row, from cumulative sums so NaN columns can be left out
+        width = matrix.shape[1]
+        sums = np.concatenate((np.zeros((len(matrix), 1)), np.cumsum(np.where(valid, matrix, 0.0), axis=1)), axis=1)
+        counts = np.concatenate((np.zeros((len(matrix), 1)), np.cumsum(valid, axis=1)), axis=1)
+        half = max(int(window), 1) // 2
+        start = np.clip(np.arange(width) - half, 0, width)
+        end = np.clip(np.arange(width) + half + 1, 0, width)
+        total = counts[:, end] - counts[:, start]
+        result = np.full_like(matrix, np.nan)
+        np.divide(sums[:, end] - sums[:, start], total, out=result, where=valid & (total > 0))
+        return result
+    return matrix
+
+def seed_group(name, pattern=SEED_PATTERN):
+    """The name of a run without its seed suffix, e.g. "ppo_lr3_seed2" -> "ppo_lr3"."""
+    return re.sub(pattern, "", name) or name
+
+def bands(matrix, groups):
+    """Returns the mean, min and max across the curves of each group.
+
+    Args:
+        matrix (np.ndarray): Values of shape (curves, points).
+        groups (list): The group of each curve.
+
+    Returns:
+        dict: {group: (mean, low, high)} arrays of shape (points,), in order of first appearance.
+    """
+    labels = list(dict.fromkeys(groups))
+    index = np.array([labels.index(group) for group in groups])
+    result = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning) # Columns where a group has no data are NaN
+        for i, label in enumerate(labels):
+            rows = matrix[index == i]
+            result[label] = (np.nanmean(rows, axis=0), np.nanmin(rows, axis=0), np.nanmax(rows, axis=0))
+    return result
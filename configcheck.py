@@ -0,0 +1,467 @@
+import os
+import json
+import math
+import difflib
+import hashlib
+import collections
+
+# Parsed and checked trainer configs, one JSON file per config file hash
+CONFIG_CACHE_DIR = os.path.join("cache", "configs")
+CACHE_VERSION = 1
+
+ERROR = "error" # mlagents-learn would refuse the config
+WARNING = "warning" # It would start, but probably not as intended
+
+Problem = collections.namedtuple("Problem", ["severity", "path", "message"])
+Problem.__doc__ = """Something wrong with a trainer config.
+
+    severity (str): ERROR or WARNING.
+    path (str): Dotted path of the setting, e.g. "behaviors.3DBall.hyperparameters.batch_size".
+    message (str): What is wrong with it.
+"""
+
+class Field:
+    """The type and range of one trainer setting.
+
+    Args:
+        kind (str): "int", "float", "bool", "str", "choice", "section" (known keys, see
+            `fields`), "sections" (any keys, each one a section) or "any".
+        low (float): The smallest value allowed.
+        high (float): The largest value allowed.
+        above (float): Values must be greater than this.
+        choices (tuple): The values allowed for "choice".
+        fields (dict): Name -> Field of a section's settings.
+    """
+
+    def __init__(self, kind, low=None, high=None, above=None, choices=(), fields=None):
+        self.kind = kind
+        self.low = low
+        self.high = high
+        self.above = above
+        self.choices = choices
+        self.fields = fields
+
+SCHEDULE = Field("choice", choices=("linear", "constant"))
+
+# mlagents-learn's trainer settings, as of ML-Agents release 20
+HYPERPARAMETERS = {
+    "batch_size": Field("int", low=1),
+    "buffer_size": Field("int", low=1),
+    "learning_rate": Field("float", above=0),
+    "learning_rate_schedule": SCHEDULE,
+}
+PPO_HYPERPARAMETERS = {
+    **HYPERPARAMETERS,
+    "beta": Field("float", low=0),
+    "epsilon": Field("float", above=0, high=1),
+    "lambd": Field("float", low=0, high=1),
+    "num_epoch": Field("int", low=1),
+    "beta_schedule": SCHEDULE,
+    "epsilon_schedule": SCHEDULE,
+    "shared_critic": Field("bool"),
+}
+POCA_HYPERPARAMETERS = {key: field for key, field in PPO_HYPERPARAMETERS.items() if key != "shared_critic"}
+SAC_HYPERPARAMETERS = {
+    **HYPERPARAMETERS,
+    "buffer_init_steps": Field("int", low=0),
+    "tau": Field("float", above=0, high=1),
+    "steps_per_update": Field("float", above=0),
+    "save_replay_buffer": Field("bool"),
+    "init_entcoef": Field("float", above=0),
+    "reward_signal_steps_per_update": Field("float", above=0),
+}
+TRAINER_HYPERPARAMETERS = {"ppo": PPO_HYPERPARAMETERS, "poca": POCA_HYPERPARAMETERS, "sac": SAC_HYPERPARAMETERS}
+
+NETWORK_SETTINGS = {
+    "normalize": Field("bool"),
+    "hidden_units": Field("int", low=1),
+    "num_layers": Field("int", low=1),
+    "vis_encode_type": Field("choice", choices=("simple", "nature_cnn", "resnet", "match3", "fully_connected")),
+    "memory": Field("section", fields={"memory_size": Field("int", low=1), "sequence_length": Field("int", low=1)}),
+    "goal_conditioning_type": Field("choice", choices=("hyper", "none")),
+    "deterministic": Field("bool"),
+}
+REWARD_SIGNAL = Field("section", fields={
+    "strength": Field("float", low=0),
+    "gamma": Field("float", low=0, high=1),
+    "network_settings": Field("section", fields=NETWORK_SETTINGS),
+    "learning_rate": Field("float", above=0),
+    "encoding_size": Field("int", low=1),
+    "use_actions": Field("bool"),
+    "use_vail": Field("bool"),
+    "demo_path": Field("str"),
+})
+BEHAVIOR = {
+    "trainer_type": Field("choice", choices=tuple(TRAINER_HYPERPARAMETERS)),
+    "hyperparameters": Field("section"), # Depends on trainer_type, see _check_behavior
+    "network_settings": Field("section", fields=NETWORK_SETTINGS),
+    "reward_signals": Field("section", fields={name: REWARD_SIGNAL for name in ("extrinsic", "curiosity", "gail", "rnd")}),
+    "init_path": Field("str"),
+    "keep_checkpoints": Field("int", low=1),
+    "even_checkpoints": Field("bool"),
+    "checkpoint_interval": Field("int", low=1),
+    "max_steps": Field("int", low=1),
+    "time_horizon": Field("int", low=1),
+    "summary_freq": Field("int", low=1),
+    "threaded": Field("bool"),
+    "self_play": Field("section", fields={
+        "save_steps": Field("int", low=1),
+        "team_change": Field("int", low=1),
+        "swap_steps": Field("int", low=1),
+        "window": Field("int", low=1),
+        "play_against_latest_model_ratio": Field("float", low=0, high=1),
+        "initial_elo": Field("float"),
+    }),
+    "behavioral_cloning": Field("section", fields={
+        "demo_path": Field("str"),
+        "strength": Field("float", low=0),
+        "steps": Field("int", low=0),
+        "batch_size": Field("int", low=1),
+        "num_epoch": Field("int", low=1),
+        "samples_per_update": Field("int", low=0),
+    }),
+}
+CONFIG = {
+    "behaviors": Field("sections", fields=BEHAVIOR),
+    "default_settings": Field("section", fields=BEHAVIOR),
+    "env_settings": Field("any"),
+    "engine_settings": Field("any"),
+    "checkpoint_settings": Field("any"),
+    "environment_parameters": Field("any"),
+    "torch_settings": Field("any"),
+    "debug": Field("bool"),
+}
+
+# Shown in the launch dialog, relative to each behavior's settings
+SUMMARY_KEYS = (
+    "trainer_type",
+    "hyperparameters.batch_size",
+    "hyperparameters.buffer_size",
+    "hyperparameters.learning_rate",
+    "hyperparameters.num_epoch",
+    "network_settings.hidden_units",
+    "network_settings.num_layers",
+    "max_steps",
+    "time_horizon",
+    "reward_signals.extrinsic.gamma",
+)
+
+def _check_value(field, value, path, problems):
+    """Checks a value against its Field, appending to `problems`. Returns the value, numbers converted."""
+    if value is None or field.kind == "any":
+        return value # Unset, mlagents-learn uses its default
+
+    kind = field.kind
+    if kind == "section" or kind == "sections":
+        if not isinstance(value, dict):
+            problems.append(Problem(ERROR, path, f"Should be a section of settings, not {value!r}"))
+        elif kind == "sections":
+            for name, section in value.items():
+                _check_section(field.fields, section, f"{path}.{name}", problems)
+        elif field.fields is not None:
+            _check_section(field.fields, value, path, problems)
+        return value
+
+    if kind == "choice":
+        if value not in field.choices:
+            close = difflib.get_close_matches(str(value), field.choices, n=1)
+            hint = f', did you mean "{close[0]}"?' if close else f", it should be one of {', '.join(field.choices)}"
+            problems.append(Problem(ERROR, path, f"{value!r} is not a valid value{hint}"))
+        return value
+
+    if kind == "bool":
+        if not isinstance(value, bool):
+            problems.append(Problem(ERROR, path, f"Should be true or false, not {value!r}"))
+        return value
+
+    if kind == "str":
+        if not isinstance(value, str):
+            problems.append(Problem(ERROR, path, f"Should be text, not {value!r}"))
+        return value
+
+    # Numbers. YAML reads 3e-4 without a decimal point as text, mlagents-learn converts it
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            problems.append(Problem(ERROR, path, f"Should be a number, not {value!r}"))
+            return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        problems.append(Problem(ERROR, path, f"Should be a number, not {value!r}"))
+        return value
+    if not math.isfinite(value):
+        problems.append(Problem(ERROR, path, f"Should be a finite number, not {value!r}"))
+        return value
+    if kind == "int" and value != int(value):
+        problems.append(Problem(ERROR, path, f"Should be a whole number, not {value!r}"))
+
+    if field.low is not None and value < field.low:
+        problems.append(Problem(ERROR, path, f"{value!r} is below the minimum of {field.low}"))
+    elif field.above is not None and value <= field.above:
+        problems.append(Problem(ERROR, path, f"{value!r} should be greater than {field.above}"))
+    elif field.high is not None and value > field.high:
+        problems.append(Problem(ERROR, path, f"{value!r} is above the maximum of {field.high}"))
+    return value
+
+def _check_section(fields, section, path, problems):
+    if section is None:
+        return
+    if not isinstance(section, dict):
+        problems.append(Problem(ERROR, path, f"Should be a section of settings, not {section!r}"))
+        return
+    for key, value in section.items():
+        field = fields.get(key)
+        if field is None:
+            # mlagents-learn rejects settings it does not know, usually a typo
+            close = difflib.get_close_matches(str(key), fields, n=1)
+            hint = f', did you mean "{close[0]}"?' if close else ""
+            problems.append(Problem(ERROR, f"{path}.{key}", f"Unknown setting{hint}"))
+            continue
+        if key != "hyperparameters": # Checked against the trainer type, see _check_behavior
+            _check_value(field, value, f"{path}.{key}", problems)
+
+def merge(defaults, settings):
+    """Returns `settings` on top of `defaults`, section by section, as mlagents-learn applies default_settings."""
+    if not isinstance(defaults, dict) or not isinstance(settings, dict):
+        return settings if settings is not None else defaults
+    merged = dict(defaults)
+    for key, value in settings.items():
+        merged[key] = merge(defaults.get(key), value)
+    return merged
+
+def _check_behavior(name, settings, path, problems):
+    """Checks what depends on the trainer type, and settings that conflict with each other."""
+    trainer_type = settings.get("trainer_type") or "ppo"
+    fields = TRAINER_HYPERPARAMETERS.get(trainer_type)
+    hyperparameters = settings.get("hyperparameters") or {}
+    if fields is not None and isinstance(hyperparameters, dict):
+        _check_section(fields, hyperparameters, f"{path}.hyperparameters", problems)
+    if not isinstance(hyperparameters, dict):
+        problems.append(Problem(ERROR, f"{path}.hyperparameters", "Should be a section of settings"))
+        return
+
+    def number(section, key):
+        value = (section or {}).get(key) if isinstance(section, dict) else None
+        try:
+            value = None if isinstance(value, bool) else float(value)
+        except (TypeError, ValueError):
+            return None
+        return value if value is not None and math.isfinite(value) else None # Non-finite ones are already errors
+
+    batch_size = number(hyperparameters, "batch_size")
+    buffer_size = number(hyperparameters, "buffer_size")
+    if batch_size and buffer_size:
+        if batch_size > buffer_size:
+            problems.append(Problem(ERROR, f"{path}.hyperparameters.batch_size",
+                                    f"batch_size ({batch_size:g}) is larger than buffer_size ({buffer_size:g})"))
+        elif trainer_type in ("ppo", "poca") and buffer_size % batch_size:
+            problems.append(Problem(WARNING, f"{path}.hyperparameters.buffer_size",
+                                    f"buffer_size ({buffer_size:g}) is not a multiple of batch_size ({batch_size:g})"))
+
+    memory = (settings.get("network_settings") or {}).get("memory") if isinstance(settings.get("network_settings"), dict) else None
+    memory_size = number(memory, "memory_size")
+    if memory_size and memory_size % 2:
+        problems.append(Problem(ERROR, f"{path}.network_settings.memory.memory_size", "memory_size must be a multiple of 2"))
+
+    max_steps = number(settings, "max_steps")
+    for key in ("summary_freq", "checkpoint_interval"):
+        value = number(settings, key)
+        if max_steps and value and value > max_steps:
+            problems.append(Problem(WARNING, f"{path}.{key}", f"{key} ({value:g}) is longer than max_steps ({max_steps:g})"))
+
+    time_horizon = number(settings, "time_horizon")
+    if trainer_type in ("ppo", "poca") and time_horizon and buffer_size and time_horizon > buffer_size:
+        problems.append(Problem(WARNING, f"{path}.time_horizon", f"time_horizon ({time_horizon:g}) is longer than buffer_size ({buffer_size:g})"))
+
+def validate(config):
+    """Checks a parsed trainer config against mlagents-learn's settings.
+
+    Returns:
+        list: A Problem for each error or warning found, errors first.
+    """
+    problems = []
+    if not isinstance(config, dict):
+        return [Problem(ERROR, "", "The file is not a trainer config, it should be a mapping of settings")]
+
+    behaviors = config.get("behaviors")
+    if not behaviors:
+        if any(isinstance(value, dict) and "trainer_type" in value for value in config.values()):
+            return [Problem(ERROR, "", "Behaviors should be listed under a behaviors section, this looks like an older config format")]
+        problems.append(Problem(ERROR, "behaviors", "The config does not define any behaviors"))
+
+    _check_section(CONFIG, config, "", problems)
+    problems = [problem._replace(path=problem.path.lstrip(".")) for problem in problems]
+
+    defaults = config.get("default_settings") if isinstance(config.get("default_settings"), dict) else {}
+    if isinstance(behaviors, dict):
+        for name, settings in behaviors.items():
+            if isinstance(settings, dict) or settings is None:
+                _check_behavior(name, merge(defaults, settings or {}), f"behaviors.{name}", problems)
+    return sorted(problems, key=lambda problem: problem.severity != ERROR)
+
+def check_files(config, working_dir):
+    """Warns about demonstration files that do not exist, relative to the working directory.
+
+    Not cached, unlike validate, as the files can come and go without the config changing.
+    """
+    problems = []
+    behaviors = config.get("behaviors") if isinstance(config, dict) else None
+    for name, settings in (behaviors or {}).items() if isinstance(behaviors, dict) else ():
+        if not isinstance(settings, dict):
+            continue
+        demos = [("behavioral_cloning", (settings.get("behavioral_cloning") or {}))]
+        demos += [(f"reward_signals.{signal}", section) for signal, section in (settings.get("reward_signals") or {}).items()]
+        for path, section in demos:
+            demo_path = section.get("demo_path") if isinstance(section, dict) else None
+            if isinstance(demo_path, str) and not os.path.exists(os.path.join(working_dir or "", demo_path)):
+                problems.append(Problem(WARNING, f"behaviors.{name}.{path}.demo_path", f"{demo_path} does not exist"))
+    return problems
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def parse_config(path, cache_dir=CONFIG_CACHE_DIR):
+    """Parses and validates a trainer config, or reads both from the cache if the file is unchanged.
+
+    Returns:
+        dict: The file's "hash", the parsed "config", the "problems" found by validate and
+        whether it came "from_cache". A file that is not valid YAML is returned with an error.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    digest = file_hash(path)
+    cache_path = os.path.join(cache_dir, f"{digest}.json")
+    try:
+        with open(cache_path, "r") as f:
+            cached = json.load(f)
+        if cached.get("version") == CACHE_VERSION:
+            return {
+                "hash": digest,
+                "config": cached["config"],
+                "problems": [Problem(*problem) for problem in cached["problems"]],
+                "from_cache": True,
+            }
+    except (OSError, ValueError, KeyError):
+        pass
+
+    import yaml # Deferred, startup does not need it
+
+    try:
+        with open(path, "r") as f:
+            config = yaml.safe_load(f)
+        problems = validate(config)
+    except yaml.YAMLError as e:
+        config = None
+        problems = [Problem(ERROR, "", f"Not valid YAML: {e}")]
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path + ".partial", "w") as f:
+            json.dump({"version": CACHE_VERSION, "config": config, "problems": problems}, f, default=str)
+        os.replace(cache_path + ".partial", cache_path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"[WARNING] Could not cache the parsed config {path}: {e}")
+    return {"hash": digest, "config": config, "problems": problems, "from_cache": False}
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict) and value:
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    return {prefix: value}
+
+def summarize(config):
+    """Returns {behavior: [(key, value)]} of the SUMMARY_KEYS each behavior sets, default_settings applied."""
+    if not isinstance(config, dict) or not isinstance(config.get("behaviors"), dict):
+        return {}
+    defaults = config.get("default_settings") if isinstance(config.get("default_settings"), dict) else {}
+    summary = {}
+    for name, settings in config["behaviors"].items():
+        flat = _flatten(merge(defaults, settings if isinstance(settings, dict) else {}))
+        summary[name] = [(key, flat[key]) for key in SUMMARY_KEYS if flat.get(key) is not None]
+    return summary
+
+def diff_configs(config, previous):
+    """Compares the behaviors of a config with those of a previous run.
+
+    Only settings the config sets are compared, as a run's configuration.yaml also lists every
+    default. Behaviors the previous run had and the config does not are listed too.
+
+    Returns:
+        list: (dotted key, previous value, new value), None for values that are not set.
+    """
+    if not isinstance(config, dict) or not isinstance(previous, dict):
+        return []
+    new = _flatten({"behaviors": config.get("behaviors") or {}})
+    old = _flatten({"behaviors": previous.get("behaviors") or {}})
+    changes = [(key, old.get(key), value) for key, value in new.items() if old.get(key) != value]
+
+    new_behaviors = set(config.get("behaviors") or {}) if isinstance(config.get("behaviors"), dict) else set()
+    for name in previous.get("behaviors") or {}:
+        if name not in new_behaviors:
+            changes.append((f"behaviors.{name}", "defined", None))
+    return changes
+
+def last_run_config(run_index, results_dir, cache_dir=CONFIG_CACHE_DIR):
+    """Returns the Run ID and parsed configuration.yaml of the most recently started run, or (None, None)."""
+    for row in run_index.query(sort="start_time", descending=True, limit=20):
+        path = os.path.join(results_dir, row["run_id"], "configuration.yaml")
+        if os.path.exists(path):
+            try:
+                return row["run_id"], parse_config(path, cache_dir)["config"]
+            except OSError:
+                continue
+    return None, None
+
+def preflight(path, working_dir, run_index=None):
+    """Checks a trainer config before a launch, see parse_config, and compares it with the last run.
+
+    Returns:
+        dict: The parsed "config", every Problem in "problems", the "summary" of each behavior,
+        the "last_run" ID, its "diff" and whether the check came "from_cache".
+    """
+    parsed = parse_config(path)
+    problems = parsed["problems"] + check_files(parsed["config"], working_dir)
+    last_run, diff = None, []
+    if run_index is not None and parsed["config"] is not None:
+        last_run, previous = last_run_config(run_index, os.path.join(working_dir or "", "results"))
+        diff = diff_configs(parsed["config"], previous)
+    return {
+        "config": parsed["config"],
+        "problems": problems,
+        "summary": summarize(parsed["config"]),
+        "last_run": last_run,
+        "diff": diff,
+        "from_cache": parsed["from_cache"],
+    }
+
+def format_report(report, max_diff=15):
+    """Returns a preflight report as text for the launch dialog."""
+    lines = []
+    errors = [problem for problem in report["problems"] if problem.severity == ERROR]
+    warnings = [problem for problem in report["problems"] if problem.severity == WARNING]
+    if not errors and not warnings:
+        lines.append("Config OK")
+    for problem in errors + warnings:
+        where = f"{problem.path}: " if problem.path else ""
+        lines.append(f"{problem.severity.upper()}  {where}{problem.message}")
+
+    for behavior, settings in report["summary"].items():
+        lines.append("")
+        lines.append(behavior)
+        lines.extend(f"    {key} = {value}" for key, value in settings)
+
+    if report["last_run"]:
+        lines.append("")
+        if report["diff"]:
+            lines.append(f"Changes from the last run, {report['last_run']}:")
+            for key, old, new in report["diff"][:max_diff]:
+                lines.append(f"    {key.removeprefix('behaviors.')}: {'not set' if old is None else old} -> {'not set' if new is None else new}")
+            if len(report["diff"]) > max_diff:
+                lines.append(f"    ... and {len(report['diff']) - max_diff} more")
+        else:
+            lines.append(f"Same settings as the last run, {report['last_run']}")
+    return "\n".join(lines)
@@ -0,0 +1,471 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+import itertools
+import collections
+import socketserver
+
+from jobs import JobManager
+from reader import read_process_output
+from runlog import RunLogReader, LOG_MAX_BYTES
+from scrollback import SCROLLBACK_LINES
+from engine import read_settings, apply_settings, create_job, training_command, results_exist
+from profiles import launch_args
+from runindex import find_checkpoints
+from earlystop import EARLY_STOPPING
+from storage import RETENTION
+from events import EVENTS, OutputTimings, configure as configure_events
+from remote import DAEMON_SOCKET
+
+DAEMON_EVENTS = os.path.join("cache", "daemon_events.jsonl") # The daemon's events, apart from the GUI's
+
+TAIL_BATCH = 1000 # Most lines in one tail message
+TAIL_POLL = 1.0 # Seconds a follower waits for new output before checking the run is still active
+
+class TailBuffer:
+    """The recent output and status messages of a daemon's run, for clients to follow.
+
+    It is the job's output, so it receives the job manager's status messages, and it is fed
+    the run's lines by stream_to_tail. Every event gets a sequence number, so a follower asks
+    for everything after the last one it saw. Lines also keep their line number, the same one
+    they have in the run log, which holds any lines that no longer fit in the buffer.
+
+    Args:
+        capacity (int): Events kept in memory.
+    """
+
+    def __init__(self, capacity=SCROLLBACK_LINES):
+        self.events = collections.deque(maxlen=capacity) # (seq, line number or None, OutputLine or message)
+        self.seq = 0 # Sequence number of the next event
+        self.lines = 0 # Lines fed so far
+        self.changed = threading.Condition()
+
+    def feed(self, lines):
+        with self.changed:
+            for line in lines:
+                self.events.append((self.seq, self.lines, line))
+                self.seq += 1
+                self.lines += 1
+            self.changed.notify_all()
+
+    def write(self, data):
+        with self.changed:
+            self.events.append((self.seq, None, data))
+            self.seq += 1
+            self.changed.notify_all()
+
+    def first_line(self):
+        """Returns the line number of the oldest line still in the buffer."""
+        with self.changed:
+            for _, line_number, _ in self.events:
+                if line_number is not None:
+                    return line_number
+            return self.lines
+
+    def since(self, seq):
+        """Returns the events from sequence number `seq` on, or from the oldest one kept."""
+        with self.changed:
+            if not self.events:
+                return []
+            start = max(seq - self.events[0][0], 0)
+            return list(itertools.islice(self.events, start, None))
+
+    def wait(self, seq, timeout):
+        """Waits until there is an event at or after `seq`, or the timeout passes."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.seq > seq, timeout)
+
+def stream_to_tail(process, output, consumers=()):
+    """Streams a run's output into its TailBuffer and consumers, see engine.stream_process_output."""
+    timings = OutputTimings(EVENTS, process)
+
+    def on_lines(lines):
+        timings.feed(lines)
+        output.feed(lines)
+        for consumer in consumers:
+            consumer.feed(lines)
+
+    read_process_output(process, on_lines)
+    process.wait()
+    output.write("\n[CTRL Panel] Training Session Ended\n")
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Answers JSON requests, one per line, with JSON replies, one per line."""
+
+    def handle(self):
+        for raw in self.rfile:
+            try:
+                request = json.loads(raw)
+                command = getattr(self.server.run_daemon, f"cmd_{request.get('cmd')}", None)
+                if command is None:
+                    raise ValueError(f"Unknown command: {request.get('cmd')}")
+                reply = command(self, request)
+                self.send({"ok": True, **reply})
+            except (BrokenPipeError, ConnectionResetError):
+                return # The client went away, e.g. a closed tail
+            except Exception as e:
+                try:
+                    self.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+                except OSError:
+                    return
+
+    def send(self, message):
+        self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True # Followers never keep the daemon from exiting
+
+class RunDaemon:
+    """Runs training sessions without a GUI and serves them over a local Unix socket.
+
+    It owns a JobManager, as MLAgentsApp does, so runs outlive any client. Clients send one
+    JSON request per line and get one JSON reply per line, see remote.DaemonClient:
+
+        ping                    The daemon's pid and working directory.
+        start                   Queues a run, from a config, environment and launch profile,
+                                or a full argv.
+        stop                    Cancels a queued run or stops a running one.
+        stop_all                Cancels or stops every active run.
+        list                    Every run the daemon knows about, see `info`.
+        tail                    Streams a run's output, optionally from its first line.
+        events                  Timing histograms and recent events, see events.EventLog.
+        shutdown                Stops every run, then exits.
+
+    Args:
+        socket_path (str): Where the socket is created. Only the owner can connect to it.
+    """
+
+    def __init__(self, socket_path=DAEMON_SOCKET):
+        self.socket_path = socket_path
+        self.working_dir = None
+        self.virtual_env = None
+        self.scrollback_lines = SCROLLBACK_LINES
+        self.log_max_bytes = LOG_MAX_BYTES
+        self.log_compress = False
+        self.use_daemon = True
+        self.early_stopping = dict(EARLY_STOPPING)
+        self.retention = dict(RETENTION)
+        self.job_manager = JobManager(stream_to_tail)
+
+        self.jobs = {} # Job id -> Job, every run started by this daemon
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def load_settings(self, working_dir=None, env=None):
+        """Loads the GUI's saved settings, the working directory and environment can be overridden."""
+        apply_settings(self, read_settings())
+        self.working_dir = working_dir or self.working_dir or os.getcwd()
+        self.virtual_env = env or self.virtual_env
+
+    def serve_forever(self):
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        if os.path.exists(self.socket_path):
+            from remote import daemon_running
+
+            if daemon_running(self.socket_path):
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path) # Left behind by a daemon that did not exit cleanly
+
+        previous = os.umask(0o177) # The socket can start runs, keep it to this user
+        try:
+            self._server = _Server(self.socket_path, _Handler)
+        finally:
+            os.umask(previous)
+        self._server.run_daemon = self
+
+        print(f"[ALERT] Run daemon listening on {self.socket_path} (pid {os.getpid()})")
+        print(f"    working_dir: {self.working_dir}")
+        print(f"    virtual_env: {self.virtual_env}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        """Stops every run, waits for them to exit, then stops serving."""
+        self.job_manager.stop_all()
+        while any(job.active for job in self.job_manager.snapshot()):
+            time.sleep(0.25)
+        if self._server:
+            self._server.shutdown()
+
+    def info(self, job_id, job):
+        """Returns what clients are told about a run."""
+        sample = job.resources.latest() if job.resources else None
+        return {
+            "job_id": job_id,
+            "run_id": job.run_id,
+            "state": job.state,
+            "cwd": job.cwd,
+            "pid": job.process.pid if job.process else None,
+            "base_port": job.base_port,
+            "cpus": sorted(job.cpus) if job.cpus else None,
+            "queued_at": job.queued_at,
+            "started_at": job.started_at,
+            "ended_at": job.ended_at,
+            "returncode": job.returncode,
+            "stop_requested": job.stop_requested,
+            "stop_status": job.stop_status,
+            "stop_reason": job.stop_reason,
+            "lines": job.output.lines,
+            "log_dir": job.log.log_dir if job.log else None,
+            "resources": sample._asdict() if sample else None,
+        }
+
+    def _find(self, request):
+        """Returns (job id, job) for a request's job_id, or its run_id's active or latest run."""
+        with self._lock:
+            if request.get("job_id") is not None:
+                job_id = int(request["job_id"])
+                if job_id in self.jobs:
+                    return job_id, self.jobs[job_id]
+            else:
+                matches = [(job_id, job) for job_id, job in self.jobs.items() if job.run_id == request.get("run_id")]
+                for job_id, job in reversed(matches):
+                    if job.active:
+                        return job_id, job
+                if matches:
+                    return matches[-1]
+        raise KeyError(f"No run {request.get('job_id') or request.get('run_id')}")
+
+    def cmd_ping(self, handler, request):
+        return {"pid": os.getpid(), "working_dir": self.working_dir}
+
+    def cmd_start(self, handler, request):
+        run_id = request["run_id"]
+        if self.job_manager.find_active(run_id):
+            raise ValueError(f'A run with Run ID "{run_id}" is already queued or running')
+
+        # Settings saved by the GUI since the daemon started apply to new runs
+        apply_settings(self, {**read_settings(), "working_dir": self.working_dir, "virtual_env": self.virtual_env})
+        working_dir = request.get("working_dir") or self.working_dir
+
+        argv = request.get("argv")
+        environ = request.get("environ")
+        if not argv:
+            env = request.get("env") or self.virtual_env
+            if not env:
+                raise ValueError("No environment selected for training")
+            force = ""
+            if results_exist(working_dir, run_id):
+                if request.get("resume"):
+                    if not find_checkpoints(os.path.join(working_dir, "results", run_id))["resumable"]:
+                        raise FileNotFoundError(f'"{run_id}" has no checkpoint to resume from')
+                    force = "--resume"
+                elif request.get("force"):
+                    force = "--force"
+                else:
+                    raise FileExistsError(
+                        f'Results for "{run_id}" already exist, start it with resume to continue or force to overwrite them'
+                    )
+            extra_args, first_port = [], request.get("first_port")
+            if request.get("profile"):
+                extra_args, first_port = launch_args(working_dir, request["profile"])
+            initialize_from = request.get("initialize_from")
+            if initialize_from and force != "--resume":
+                if not find_checkpoints(os.path.join(working_dir, "results", initialize_from))["resumable"]:
+                    raise FileNotFoundError(f'"{initialize_from}" has no checkpoint to initialise from')
+                extra_args = [*extra_args, f"--initialize-from={initialize_from}"]
+            if not request.get("skip_check"):
+                from configcheck import parse_config, ERROR
+
+                # Fails now rather than once mlagents-learn has started, the config is relative to the working directory
+                errors = [problem for problem in parse_config(os.path.join(working_dir, request["config"]))["problems"]
+                          if problem.severity == ERROR]
+                if errors:
+                    raise ValueError(
+                        f"The config has {len(errors)} errors, start it with skip_check to launch it anyway: "
+                        + "; ".join(f"{problem.path}: {problem.message}" for problem in errors[:5])
+                    )
+            argv, environ = training_command(env, request["config"], run_id, force, extra_args)
+        else:
+            first_port = request.get("first_port")
+
+        owner = argparse.Namespace(
+            working_dir=working_dir, log_max_bytes=self.log_max_bytes, log_compress=self.log_compress,
+            early_stopping=self.early_stopping, job_manager=self.job_manager
+        )
+        job = create_job(owner, run_id, argv, environ, search=False, first_port=first_port)
+        job.output = TailBuffer(self.scrollback_lines)
+
+        with self._lock:
+            job_id = next(self._ids)
+            self.jobs[job_id] = job
+        self.job_manager.submit(job)
+        print(f"[ALERT] Queued run {run_id} (job {job_id})")
+        return {"job": self.info(job_id, job)}
+
+    def cmd_stop(self, handler, request):
+        job_id, job = self._find(request)
+        if self.job_manager.cancel(job):
+            return {"action": "cancelled", "job": self.info(job_id, job)}
+        if self.job_manager.stop(job):
+            return {"action": "stopping", "job": self.info(job_id, job)}
+        if job.stop_requested and job.active:
+            return {"action": "already stopping", "job": self.info(job_id, job)}
+        raise ValueError(f"Run {job.run_id} is not queued or running")
+
+    def cmd_stop_all(self, handler, request):
+        return {"count": self.job_manager.stop_all()}
+
+    def cmd_list(self, handler, request):
+        with self._lock:
+            jobs = list(self.jobs.items())
+        return {"jobs": [self.info(job_id, job) for job_id, job in jobs]}
+
+    def cmd_tail(self, handler, request):
+        """Sends a run's output as {"first": line number, "lines": [...]} and {"message": text}.
+
+        With `from_start`, lines that no longer fit in the TailBuffer are read from the run log
+        first. Otherwise the last `lines` events are sent. With `follow`, new output is sent as
+        it arrives until the run ends.
+        """
+        job_id, job = self._find(request)
+        buffer = job.output
+
+        if request.get("from_start"):
+            first_line = buffer.first_line()
+            position = 0
+            reader = None
+            if first_line and job.log:
+                try:
+                    reader = RunLogReader(job.log.log_dir)
+                except OSError:
+                    pass # Not written yet, e.g. the run has only just started, the buffer is all there is
+            if reader is not None:
+                while position < first_line:
+                    texts = reader.read_lines(position, min(TAIL_BATCH, first_line - position))
+                    if not texts:
+                        break
+                    handler.send({"first": position, "lines": [["log", 0.0, text] for text in texts]})
+                    position += len(texts)
+            seq = 0
+        else:
+            seq = max(buffer.seq - int(request.get("lines", 100)), 0)
+
+        while True:
+            events = buffer.since(seq)
+            batch = []
+            for event_seq, line_number, item in events:
+                if line_number is None:
+                    if batch:
+                        handler.send({"first": batch_first, "lines": batch})
+                        batch = []
+                    handler.send({"message": item})
+                    continue
+                if not batch:
+                    batch_first = line_number
+                batch.append(list(item))
+                if len(batch) >= TAIL_BATCH:
+                    handler.send({"first": batch_first, "lines": batch})
+                    batch = []
+            if batch:
+                handler.send({"first": batch_first, "lines": batch})
+            if events:
+                seq = events[-1][0] + 1
+
+            if not request.get("follow") or (not job.active and seq >= buffer.seq):
+                break
+            buffer.wait(seq, TAIL_POLL)
+
+        return {"end": True, "job": self.info(job_id, job)}
+
+    def cmd_events(self, handler, request):
+        return EVENTS.snapshot(int(request.get("recent", 100)))
+
+    def cmd_shutdown(self, handler, request):
+        threading.Thread(target=self.shutdown, daemon=True).start()
+        return {"stopping": self.job_manager.stop_all()}
+
+def _print_jobs(jobs):
+    for job in jobs:
+        duration = ""
+        if job["started_at"]:
+            seconds = int((job["ended_at"] or time.time()) - job["started_at"])
+            duration = f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        print(f"{job['job_id']:>4}  {job['run_id']:<30} {job['state']:<10} {job['base_port'] or '':<6} {duration:>9}  {job['stop_status']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs ML-Agents training sessions without the GUI.")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help="The daemon's Unix socket")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run the daemon in the foreground")
+    serve.add_argument("--working-dir", help="The ml-agents working directory, the saved one by default")
+    serve.add_argument("--env", help="The Conda environment, the saved one by default")
+
+    start = commands.add_parser("start", help="Queue a training run")
+    start.add_argument("run_id")
+    start.add_argument("config")
+    start.add_argument("--env", help="The Conda environment, the daemon's by default")
+    start.add_argument("--force", action="store_true", help="Overwrite existing results")
+    start.add_argument("--resume", action="store_true", help="Continue existing results from their checkpoint")
+    start.add_argument("--initialize-from", help="Start from the checkpoint of another run")
+    start.add_argument("--profile", help="A launch profile of the project, the Unity editor by default")
+    start.add_argument("--skip-check", action="store_true", help="Launch even if the config has errors")
+
+    stop = commands.add_parser("stop", help="Cancel or stop a run")
+    stop.add_argument("run_id")
+    commands.add_parser("stop-all", help="Cancel or stop every run")
+    commands.add_parser("list", help="List runs")
+
+    tail = commands.add_parser("tail", help="Print a run's output")
+    tail.add_argument("run_id")
+    tail.add_argument("-n", "--lines", type=int, default=100)
+    tail.add_argument("-f", "--follow", action="store_true")
+
+    commands.add_parser("shutdown", help="Stop every run and exit the daemon")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        configure_events(DAEMON_EVENTS)
+        run_daemon = RunDaemon(args.socket)
+        run_daemon.load_settings(args.working_dir, args.env)
+        def on_signal(signum, frame):
+            print(f"[ALERT] {signal.Signals(signum).name} received, stopping every run")
+            threading.Thread(target=run_daemon.shutdown, daemon=True).start()
+        signal.signal(signal.SIGTERM, on_signal)
+        signal.signal(signal.SIGINT, on_signal)
+        run_daemon.serve_forever()
+        return 0
+
+    from remote import DaemonClient, DaemonError
+
+    client = DaemonClient(args.socket)
+    try:
+        if args.command == "start":
+            job = client.request("start", run_id=args.run_id, config=args.config, env=args.env,
+                                 force=args.force, resume=args.resume, initialize_from=args.initialize_from,
+                                 profile=args.profile, skip_check=args.skip_check, working_dir=None)["job"]
+            print(f"Queued {job['run_id']} as job {job['job_id']}")
+        elif args.command == "stop":
+            print(client.request("stop", run_id=args.run_id)["action"])
+        elif args.command == "stop-all":
+            print(f"Stopping {client.request('stop_all')['count']} runs")
+        elif args.command == "list":
+            _print_jobs(client.request("list")["jobs"])
+        elif args.command == "tail":
+            for message in client.tail(run_id=args.run_id, lines=args.lines, follow=args.follow):
+                for _, _, text in message.get("lines", ()):
+                    sys.stdout.write(text)
+                sys.stdout.write(message.get("message", ""))
+                sys.stdout.flush()
+        elif args.command == "shutdown":
+            print(f"Stopping {client.request('shutdown')['stopping']} runs, then exiting")
+    except (OSError, DaemonError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
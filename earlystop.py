@@ -0,0 +1,121 @@
+# Defaults of the "early_stopping" settings
+EARLY_STOPPING = {
+    "enabled": False,
+    "window": 20, # Summaries per behavior the reward trend is fitted over
+    "min_steps": 100000, # Steps every behavior trains before a plateau or divergence can stop the run
+    "plateau_tolerance": 0.01, # Plateau once the trend moves less than this fraction of the reward range over the window
+    "divergence_drop": 0.5, # Diverged once the trend has lost this fraction of the best improvement
+}
+
+def _np():
+    """Returns numpy, imported on first use so that reading EARLY_STOPPING at startup stays cheap."""
+    import numpy
+    return numpy
+
+def fit_trends(steps, rewards):
+    """Fits a least-squares line to each row, all rows at once.
+
+    Args:
+        steps (np.ndarray): Steps of shape (behaviors, window).
+        rewards (np.ndarray): Mean rewards of the same shape.
+
+    Returns:
+        tuple: The slope per step and the fitted reward at the latest step, one per row.
+    """
+    np = _np()
+    x = steps - steps.mean(axis=1, keepdims=True)
+    y_mean = rewards.mean(axis=1)
+    spread = (x * x).sum(axis=1)
+    covariance = (x * (rewards - y_mean[:, None])).sum(axis=1)
+    slope = np.divide(covariance, spread, out=np.zeros_like(spread), where=spread > 0)
+    return slope, y_mean + slope * x[:, -1]
+
+class EarlyStopping:
+    """Line consumer that stops a run once its mean reward has plateaued or diverged.
+
+    It follows the run's TrainingMetrics and, whenever new summaries arrive, fits a line to the
+    last `window` mean rewards of every behavior. The run is stopped once:
+
+    - any behavior reports a NaN or infinite reward, or
+    - any behavior's trend has fallen back by `divergence_drop` of the best improvement it made, or
+    - every behavior's trend moved less than `plateau_tolerance` of its reward range over the
+      window, and over its latest half.
+
+    Plateau and divergence are only judged once every behavior has `window` summaries and
+    `min_steps` steps. `stop` is called once, with the reason, on the reader thread.
+
+    Args:
+        metrics (TrainingMetrics): The run's metrics, fed before this consumer.
+        stop (callable): Called with the reason to stop the run, must not block.
+        window (int): Summaries per behavior the trend is fitted over.
+        min_steps (int): Steps every behavior trains before the trend is judged.
+        plateau_tolerance (float): See above.
+        divergence_drop (float): See above.
+    """
+
+    def __init__(self, metrics, stop, window=EARLY_STOPPING["window"], min_steps=EARLY_STOPPING["min_steps"],
+                 plateau_tolerance=EARLY_STOPPING["plateau_tolerance"], divergence_drop=EARLY_STOPPING["divergence_drop"]):
+        self.metrics = metrics
+        self.stop = stop
+        self.window = max(int(window), 3)
+        self.min_steps = min_steps
+        self.plateau_tolerance = plateau_tolerance
+        self.divergence_drop = divergence_drop
+
+        self.reason = None # Why the run was stopped, once it was
+        self._version = 0
+
+    def feed(self, lines):
+        if self.reason is not None or self.metrics.version == self._version:
+            return
+        self._version = self.metrics.version
+
+        reason = self.check()
+        if reason:
+            self.reason = reason
+            self.stop(reason)
+
+    def check(self):
+        """Returns why the run should stop, or None while it is still improving."""
+        np = _np()
+        window = self.window
+        with self.metrics.lock:
+            recent = {}
+            for behavior, series in self.metrics.series.items():
+                means = series.column("mean")
+                stds = series.column("std")
+                if not (np.isfinite(means[-1]) and np.isfinite(stds[-1])):
+                    return f"{behavior} diverged, its mean reward is {means[-1]} and std {stds[-1]}"
+                recent[behavior] = (
+                    series.column("step", max(series.size - window, 0)).copy(),
+                    means[-window:].copy(),
+                    (means[0], np.nanmax(means), np.nanmin(means)), # First, best and worst reward
+                )
+
+        if not recent or any(len(steps) < window or steps[-1] < self.min_steps for steps, _, _ in recent.values()):
+            return None
+
+        behaviors = list(recent)
+        steps = np.stack([recent[behavior][0] for behavior in behaviors])
+        rewards = np.stack([recent[behavior][1] for behavior in behaviors])
+        first, best, worst = np.array([recent[behavior][2] for behavior in behaviors]).T
+
+        slope, latest = fit_trends(steps, rewards)
+        improvement = best - first
+        diverged = (improvement > 0) & (best - latest > self.divergence_drop * improvement)
+        if diverged.any():
+            i = int(np.flatnonzero(diverged)[0])
+            return (f"{behaviors[i]} diverged, its reward trend fell to {latest[i]:.3f} "
+                    f"from a best of {best[i]:.3f} (started at {first[i]:.3f})")
+
+        # Flat over the whole window and its latest half, so a peak is not mistaken for a plateau
+        tolerance = self.plateau_tolerance * (best - worst)
+        change = slope * (steps[:, -1] - steps[:, 0])
+        half = window // 2
+        recent_slope, _ = fit_trends(steps[:, half:], rewards[:, half:])
+        recent_change = recent_slope * (steps[:, -1] - steps[:, half])
+        plateaued = (np.abs(change) <= tolerance) & (np.abs(recent_change) <= tolerance)
+        if plateaued.all():
+            summary = ", ".join(f"{behavior} {change[i]:+.3f} at {latest[i]:.3f}" for i, behavior in enumerate(behaviors))
+            return f"Mean reward plateaued, the trend over the last {window} summaries moved {summary}"
+        return None
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+from jobs import Job, MAX_CONCURRENT_RUNS, SIGINT_TIMEOUT, SIGTERM_TIMEOUT
+from reader import read_process_output, OutputLine
+from resources import SAMPLE_INTERVAL
+from runlog import RunLogWriter, log_dir_for, LOG_MAX_BYTES
+from scrollback import SCROLLBACK_LINES
+from envs import resolve_env, activated_environ
+from earlystop import EARLY_STOPPING
+from events import EVENTS, OutputTimings
+from storage import RETENTION
+
+# The run engine without any Tk, shared by the GUI and the headless daemon (see daemon.py)
+
+CONFIG_FILE = "config.json"
+
+def read_settings(path=CONFIG_FILE):
+    """Returns the saved settings, or an empty dict if there are none.
+
+    Raises:
+        ValueError: If the settings file is not valid JSON.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def apply_settings(owner, settings):
+    """Sets the saved settings on an MLAgentsApp or a RunDaemon and its job manager."""
+    owner.working_dir = settings.get("working_dir", "")
+    owner.virtual_env = settings.get("virtual_env", "")
+    owner.scrollback_lines = settings.get("scrollback_lines", SCROLLBACK_LINES)
+    owner.log_max_bytes = settings.get("log_max_bytes", LOG_MAX_BYTES)
+    owner.log_compress = settings.get("log_compress", False)
+    owner.use_daemon = settings.get("use_daemon", False)
+    owner.early_stopping = {**EARLY_STOPPING, **settings.get("early_stopping", {})}
+    owner.retention = {**RETENTION, **settings.get("retention", {})}
+    owner.job_manager.max_concurrency = settings.get("max_concurrent_runs", MAX_CONCURRENT_RUNS)
+    owner.job_manager.cpus_per_run = settings.get("cpus_per_run", 0)
+    owner.job_manager.sigint_timeout = settings.get("stop_sigint_timeout", SIGINT_TIMEOUT)
+    owner.job_manager.sigterm_timeout = settings.get("stop_sigterm_timeout", SIGTERM_TIMEOUT)
+    owner.job_manager.sample_interval = settings.get("resource_sample_interval", SAMPLE_INTERVAL)
+
+def collect_settings(owner):
+    """Returns the settings of an MLAgentsApp or a RunDaemon, in the form they are saved."""
+    return {
+        "working_dir": owner.working_dir,
+        "virtual_env": owner.virtual_env,
+        "scrollback_lines": owner.scrollback_lines,
+        "log_max_bytes": owner.log_max_bytes,
+        "log_compress": owner.log_compress,
+        "use_daemon": owner.use_daemon,
+        "early_stopping": owner.early_stopping,
+        "retention": owner.retention,
+        "max_concurrent_runs": owner.job_manager.max_concurrency,
+        "cpus_per_run": owner.job_manager.cpus_per_run,
+        "stop_sigint_timeout": owner.job_manager.sigint_timeout,
+        "stop_sigterm_timeout": owner.job_manager.sigterm_timeout,
+        "resource_sample_interval": owner.job_manager.sample_interval
+    }
+
+def results_exist(working_dir, run_id):
+    """True if the run already has a results folder, which mlagents-learn only overwrites with --force."""
+    return os.path.isdir(os.path.join(working_dir, "results", run_id))
+
+def training_command(env, config_file, run_id, force_flag="", extra_args=()):
+    """Returns the argv and environment that run mlagents-learn inside the given Conda environment.
+
+    The environment is resolved once and cached (see envs.resolve_env), so mlagents-learn is
+    executed directly without a shell. If it cannot be resolved, the command falls back to
+    activating the environment in bash, which then execs mlagents-learn in its place.
+
+    Args:
+        extra_args (list): More mlagents-learn arguments, e.g. from a launch profile.
+
+    Returns:
+        tuple: The argv list, and the environment variables for the process (None to inherit).
+    """
+    args = [config_file, f"--run-id={run_id}"]
+    if force_flag:
+        args.append(force_flag)
+    args.extend(extra_args)
+
+    start = time.monotonic()
+    resolved = resolve_env(env)
+    EVENTS.timing("env.resolve", time.monotonic() - start, run_id, env=env, resolved=bool(resolved))
+    if resolved:
+        return [resolved["executable"], *args], activated_environ(resolved)
+
+    print(f"    [WARNING] Could not resolve {env}, activating it in a shell instead")
+    script = 'source activate base && conda activate "$0" && exec mlagents-learn "$@"'
+    return ["bash", "-c", script, env, *args], None
+
+def create_job(owner, run_id, argv, environ=None, search=True, first_port=None):
+    """Creates a job whose output is parsed for metrics, written to a run log and optionally indexed.
+
+    If early stopping is enabled in the settings, an earlystop.EarlyStopping watches the metrics
+    and stops the run through the owner's job manager, see stop_early.
+
+    Args:
+        owner (MLAgentsApp or RunDaemon): Gives the working directory, the log and early stopping
+            settings and the job manager.
+        run_id (str): The ID for the training session.
+        argv (list): The command that starts the run.
+        environ (dict): Environment variables for the run, None to inherit.
+        search (bool): Keep a search.OutputIndex of the output in `job.search`.
+        first_port (int): The first port of the slot ranges, see jobs.Job.
+
+    Returns:
+        jobs.Job: The job, not yet submitted.
+    """
+    from metrics import TrainingMetrics # Imported here, metrics loads numpy
+
+    job = Job(run_id, argv, owner.working_dir, environ=environ, first_port=first_port)
+    job.metrics = TrainingMetrics()
+    job.consumers.append(job.metrics)
+
+    # Every line is also kept on disk, in results/<run_id>/run_logs/output-<time>/
+    log_dir = log_dir_for(owner.working_dir, run_id)
+    job.log = RunLogWriter(log_dir, run_id, owner.log_max_bytes, owner.log_compress)
+    job.consumers.append(job.log)
+
+    if search:
+        from search import OutputIndex
+
+        # Lines no longer in memory are searched in the log
+        job.search = OutputIndex(log=job.log)
+        job.consumers.append(job.search)
+
+    options = dict(getattr(owner, "early_stopping", None) or {})
+    if options.pop("enabled", False):
+        from earlystop import EarlyStopping
+
+        job_manager = owner.job_manager
+        job.watchdog = EarlyStopping(job.metrics, lambda reason: stop_early(job_manager, job, reason), **options)
+        job.consumers.append(job.watchdog) # After the metrics, so it sees every new summary
+    return job
+
+def stop_early(job_manager, job, reason):
+    """Stops a run for the reason given by its EarlyStopping, the way End Training Session does.
+
+    The reason is kept in `job.stop_reason`, printed, and written to the run's output and to
+    every consumer, so the run log and the search index keep the same line numbers. It is
+    called on the reader thread, by the last consumer, once the batch has been fed to the rest.
+    """
+    print(f"[ALERT] Stopping {job.run_id} early: {reason}")
+    job.stop_reason = reason
+    message = f"[CTRL Panel] Stopping early: {reason}\n"
+    job.write("\n" + message)
+    lines = [OutputLine("stdout", time.time(), message)]
+    for consumer in job.consumers:
+        consumer.feed(lines)
+
+    # SIGINT first, so mlagents-learn saves its model, see JobManager.stop
+    if not job_manager.stop(job):
+        print(f"    [INFO] {job.run_id} is not running or already stopping")
+
+def stream_process_output(process, output, consumers=()):
+    """Streams the subprocess output into the given output buffer.
+
+    Args:
+        process (subprocess.Popen): The training process to read from, with binary output pipes.
+        output (OutputBuffer): The buffer that batches lines into the popup's text widget, or None.
+        consumers (list): Objects whose `feed(lines)` is called with every batch of
+            reader.OutputLine, on the reading thread. They must not block.
+    """
+    timings = OutputTimings(EVENTS, process) # Time to the first line and first summary, see JobManager._start
+
+    def on_lines(lines):
+        timings.feed(lines)
+        if output:
+            output.write("".join(line.text for line in lines))
+        for consumer in consumers:
+            consumer.feed(lines)
+
+    read_process_output(process, on_lines)
+    process.wait()
+
+    # Mark process as finished
+    if output:
+        output.write("\n[CTRL Panel] Training Session Ended\n")
@@ -0,0 +1,244 @@
+import os
+import json
+import threading
+import subprocess
+
+CACHE_DIR = "cache"
+ENVS_CACHE_FILE = os.path.join(CACHE_DIR, "conda_envs.json")
+RESOLVED_CACHE_FILE = os.path.join(CACHE_DIR, "resolved_envs.json")
+ENVIRONMENTS_TXT = os.path.join(os.path.expanduser("~"), ".conda", "environments.txt")
+
+_resolve_lock = threading.Lock() # A launch waits for a resolution in progress rather than repeating it
+
+def _fingerprint(paths):
+    """Returns the (path, mtime, size) of every path that exists, used to invalidate the cache."""
+    result = []
+    for path in sorted(set(paths)):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        result.append([path, stat.st_mtime_ns, stat.st_size])
+    return result
+
+def _watched_paths(env_paths):
+    """Returns conda's environments.txt and every directory that holds an environment."""
+    paths = [ENVIRONMENTS_TXT]
+    for env_path in env_paths:
+        parent = os.path.dirname(env_path)
+        if os.path.basename(parent) == "envs":
+            paths.append(parent) # Changes when an environment is added to or removed from it
+        paths.append(os.path.join(env_path, "envs")) # The envs directory of a conda root
+    return paths
+
+def _list_conda_envs():
+    """Runs `conda env list` and returns a list of (name, path) pairs."""
+    result = subprocess.run(["conda", "env", "list"], stdout=subprocess.PIPE, text=True)
+    envs = []
+    for line in result.stdout.splitlines():
+        if line.startswith("#") or not line.strip():
+            continue
+        parts = line.split()
+        name = parts[0] if parts[0] != "*" else parts[-1] # Unnamed environments are listed by path only
+        envs.append((name, parts[-1]))
+    return envs
+
+def _load_cache():
+    try:
+        with open(ENVS_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_cache(envs):
+    paths = [path for _, path in envs]
+    cache = {
+        "envs": envs,
+        "fingerprint": _fingerprint(_watched_paths(paths))
+    }
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(ENVS_CACHE_FILE, "w") as f:
+            json.dump(cache, f, indent=4)
+    except OSError as e:
+        print(f"[WARNING] Could not write the Conda environment cache: {e}")
+
+def get_conda_envs(refresh=False):
+    """Returns the names of the Conda environments.
+
+    The list is cached on disk and reused for as long as conda's environments.txt and the
+    directories holding the environments are unchanged, so a warm start never runs conda.
+
+    Args:
+        refresh (bool): Ignore the cache and ask conda again.
+
+    Returns:
+        list: The environment names, empty if conda could not be queried.
+    """
+    if not refresh:
+        cache = _load_cache()
+        if cache:
+            paths = [path for _, path in cache["envs"]]
+            if cache["fingerprint"] == _fingerprint(_watched_paths(paths)):
+                return [name for name, _ in cache["envs"]]
+
+    # Fetch a list of Conda environments
+    try:
+        envs = _list_conda_envs()
+    except Exception as e:
+        print(f"[ERROR] Ran into issue fetching environments: {e}")
+        return []
+
+    _save_cache(envs)
+    return [name for name, _ in envs]
+
+def get_conda_envs_async(callback, refresh=False):
+    """Discovers the Conda environments on a background thread.
+
+    Args:
+        callback (callable): Called on the background thread with the list of names.
+        refresh (bool): Ignore the cache and ask conda again.
+    """
+    thread = threading.Thread(target=lambda: callback(get_conda_envs(refresh)), daemon=True)
+    thread.start()
+    return thread
+
+def _env_prefix(name):
+    """Returns the install prefix of a Conda environment, given its name or path."""
+    if os.path.isdir(os.path.join(name, "conda-meta")):
+        return os.path.abspath(name)
+
+    for refresh in (False, True):
+        get_conda_envs(refresh)
+        cache = _load_cache() or {"envs": []}
+        for env_name, path in cache["envs"]:
+            if env_name == name:
+                return path
+    return None
+
+def _env_fingerprint(prefix):
+    # Installing or removing packages touches conda-meta, activation hooks live in etc/conda
+    return _fingerprint([
+        prefix,
+        os.path.join(prefix, "conda-meta"),
+        os.path.join(prefix, "etc", "conda", "activate.d"),
+        os.path.join(prefix, "conda-meta", "state"), # Holds `conda env config vars`
+    ])
+
+def _activation_environ(name):
+    """Activates an environment once in a shell and returns the variables activation changed.
+
+    Returns:
+        tuple: A dict of the variables that were set or changed, apart from PATH, and the list
+        of PATH entries activation added.
+    """
+    result = subprocess.run(
+        ["bash", "-c", 'source activate base >/dev/null && conda activate "$0" >/dev/null && env -0', name],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True
+    )
+
+    activated = {}
+    for entry in result.stdout.decode("utf-8", errors="replace").split("\0"):
+        key, sep, value = entry.partition("=")
+        if sep:
+            activated[key] = value
+
+    current_path = os.environ.get("PATH", "").split(os.pathsep)
+    path_prepend = [entry for entry in activated.pop("PATH", "").split(os.pathsep) if entry and entry not in current_path]
+
+    changed = {}
+    for key, value in activated.items():
+        if key in ("_", "SHLVL", "PWD", "OLDPWD"):
+            continue # Shell bookkeeping, not part of the activation
+        if os.environ.get(key) != value:
+            changed[key] = value
+
+    return changed, path_prepend
+
+def resolve_env(name):
+    """Resolves what is needed to run mlagents-learn from an environment without a shell.
+
+    The environment is activated in a shell once to find its prefix, its mlagents-learn
+    entry point and the variables activation sets. The result is cached on disk, keyed on the
+    modification times of the environment, so later launches can exec mlagents-learn directly.
+
+    Args:
+        name (str): The Conda environment name, or its path.
+
+    Returns:
+        dict: "prefix", "executable", "environ" and "path_prepend", or None if the environment
+        or its mlagents-learn could not be found.
+    """
+    with _resolve_lock:
+        return _resolve_env(name)
+
+def resolve_env_async(name, callback=None):
+    """Resolves an environment on a background thread, e.g. once it is selected, so launching a run finds it cached.
+
+    Args:
+        name (str): The Conda environment name, or its path.
+        callback (callable): Called on the background thread with the result of resolve_env.
+    """
+    def resolve():
+        entry = resolve_env(name)
+        if callback:
+            callback(entry)
+
+    thread = threading.Thread(target=resolve, daemon=True)
+    thread.start()
+    return thread
+
+def _resolve_env(name):
+    try:
+        with open(RESOLVED_CACHE_FILE, "r") as f:
+            resolved = json.load(f)
+    except (OSError, ValueError):
+        resolved = {}
+
+    entry = resolved.get(name)
+    if entry and entry["fingerprint"] == _env_fingerprint(entry["prefix"]) and os.access(entry["executable"], os.X_OK):
+        return entry
+
+    print(f"[INFO] Resolving Conda environment: {name}")
+    prefix = _env_prefix(name)
+    if not prefix:
+        print(f"[ERROR] Could not find the Conda environment: {name}")
+        return None
+
+    executable = os.path.join(prefix, "bin", "mlagents-learn")
+    if not os.access(executable, os.X_OK):
+        print(f"[ERROR] mlagents-learn is not installed in the Conda environment: {name}")
+        return None
+
+    try:
+        environ, path_prepend = _activation_environ(name)
+    except Exception as e:
+        print(f"[WARNING] Could not capture the activation of {name}, using its bin directory only: {e}")
+        environ, path_prepend = {"CONDA_PREFIX": prefix, "CONDA_DEFAULT_ENV": name}, [os.path.join(prefix, "bin")]
+
+    entry = {
+        "prefix": prefix,
+        "executable": executable,
+        "environ": environ,
+        "path_prepend": path_prepend,
+        "fingerprint": _env_fingerprint(prefix)
+    }
+    resolved[name] = entry
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(RESOLVED_CACHE_FILE, "w") as f:
+            json.dump(resolved, f, indent=4)
+    except OSError as e:
+        print(f"[WARNING] Could not write the resolved environment cache: {e}")
+
+    return entry
+
+def activated_environ(entry):
+    """Returns a copy of this process's environment with a resolved environment activated."""
+    environ = dict(os.environ)
+    environ.update(entry["environ"])
+    environ["PATH"] = os.pathsep.join(entry["path_prepend"] + [environ.get("PATH", "")])
+    return environ
@@ -0,0 +1,209 @@
+import os
+import json
+import math
+import atexit
+import time
+import threading
+import collections
+
+# Every event is appended here as one JSON object per line
+EVENTS_FILE = os.path.join("cache", "events.jsonl")
+EVENTS_MAX_BYTES = 16 * 1024 * 1024 # Size before the file is rotated to events.jsonl.1
+WRITE_INTERVAL = 0.5 # Seconds between batched writes
+RECENT_EVENTS = 500 # Events kept in memory for the diagnostics panel
+
+# Histogram buckets, log spaced from 1 ms to about 3 hours
+BUCKET_LOW = 0.001
+BUCKETS_PER_DECADE = 5
+BUCKET_COUNT = 7 * BUCKETS_PER_DECADE
+
+class Histogram:
+    """Distribution of durations in log-spaced buckets, so percentiles cost no stored samples.
+
+    Percentiles are the upper edge of the bucket they fall in, within about 60% of the true value.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (BUCKET_COUNT + 1) # The last one holds everything above the range
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= BUCKET_LOW:
+            bucket = 0
+        else:
+            bucket = min(int(math.log10(seconds / BUCKET_LOW) * BUCKETS_PER_DECADE), BUCKET_COUNT)
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Returns the upper edge of the bucket holding the p-th percentile, capped at the maximum."""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and bucket < BUCKET_COUNT:
+                return min(BUCKET_LOW * 10 ** ((bucket + 1) / BUCKETS_PER_DECADE), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max if self.count else None,
+        }
+
+class EventLog:
+    """Named events with monotonic timestamps, written to a JSON-lines file.
+
+    Each event is a dict with its name, "mono" (time.monotonic(), for durations), "time"
+    (time.time(), for people), the Run ID if it concerns a run, and any other fields. Timings
+    also carry "seconds" and are added to a Histogram per name.
+
+    A run is tracked from any object standing for it, e.g. its Job or its process, with `track`.
+    `mark` notes when something happened to it and `since` emits the time elapsed since a mark,
+    so the code that starts a run and the code that reads its output need not share state.
+
+    `emit` only queues the event, it is written by a background thread, so it can be called from
+    reader threads without blocking them.
+
+    Args:
+        path (str): The JSON-lines file, None to keep events in memory only.
+        recent (int): Number of events kept for `snapshot`.
+    """
+
+    def __init__(self, path=EVENTS_FILE, recent=RECENT_EVENTS):
+        self.path = path
+        self.histograms = {} # Timing name -> Histogram
+        self.recent = collections.deque(maxlen=recent)
+
+        self._runs = {} # Tracked object -> (run_id, {mark: monotonic time})
+        self._pending = []
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def emit(self, name, run_id=None, **fields):
+        """Records an event. Returns it."""
+        event = {"event": name, "mono": time.monotonic(), "time": time.time()}
+        if run_id is not None:
+            event["run_id"] = run_id
+        event.update(fields)
+
+        with self._lock:
+            self.recent.append(event)
+            if self.path:
+                self._pending.append(event)
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                    self._writer.start()
+        return event
+
+    def timing(self, name, seconds, run_id=None, **fields):
+        """Records how long something took, as an event and in the histogram of its name."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+        return self.emit(name, run_id, seconds=round(seconds, 6), **fields)
+
+    def track(self, key, run_id, mark):
+        """Starts tracking a run under `key`, with a first mark."""
+        with self._lock:
+            self._runs[key] = (run_id, {mark: time.monotonic()})
+
+    def mark(self, key, name):
+        """Notes the time something happened to a tracked run, ignored for untracked keys."""
+        with self._lock:
+            if key in self._runs:
+                self._runs[key][1][name] = time.monotonic()
+
+    def since(self, key, mark, name, **fields):
+        """Emits a timing of the time elapsed since a mark of a tracked run.
+
+        Returns:
+            float: The seconds elapsed, None if the run is not tracked or has no such mark.
+        """
+        with self._lock:
+            run_id, marks = self._runs.get(key, (None, {}))
+            start = marks.get(mark)
+        if start is None:
+            return None
+        seconds = time.monotonic() - start
+        self.timing(name, seconds, run_id, **fields)
+        return seconds
+
+    def untrack(self, key):
+        with self._lock:
+            self._runs.pop(key, None)
+
+    def snapshot(self, recent=100):
+        """Returns the histograms' summaries and the latest events, safe to send as JSON."""
+        with self._lock:
+            return {
+                "histograms": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+                "recent": list(self.recent)[-recent:],
+            }
+
+    def flush(self):
+        """Writes the queued events now."""
+        with self._lock:
+            events, self._pending = self._pending, []
+        if not events or not self.path:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= EVENTS_MAX_BYTES:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a") as f:
+                f.write("".join(json.dumps(event, default=str) + "\n" for event in events))
+        except OSError as e:
+            print(f"[ERROR] Failed to write events to {self.path}: {e}")
+
+    def _write_loop(self):
+        while True:
+            time.sleep(WRITE_INTERVAL)
+            self.flush()
+
+class OutputTimings:
+    """Times a run's first line of output and first "Step:" summary, from its "started" mark.
+
+    Args:
+        events (EventLog): The log the run is tracked in.
+        key (object): The key the run is tracked under, see EventLog.track.
+    """
+
+    def __init__(self, events, key):
+        self.events = events
+        self.key = key
+        self.lines = 0
+        self.seen_step = False
+
+    def feed(self, lines):
+        if not self.lines:
+            self.events.since(self.key, "started", "run.first_output")
+        self.lines += len(lines)
+
+        if not self.seen_step and any("Step:" in line.text for line in lines):
+            self.seen_step = True
+            self.events.since(self.key, "started", "run.first_step")
+
+# The log of this process, see configure
+EVENTS = EventLog()
+atexit.register(EVENTS.flush) # The events of the last half second
+
+def configure(path):
+    """Points the events of this process at another file, e.g. the daemon's."""
+    EVENTS.flush()
+    EVENTS.path = path
@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import time
+import math
+import random
+import signal
+import argparse
+
+# A stand-in for mlagents-learn, so the panel can be run and measured without Unity.
+#
+# It takes mlagents-learn's arguments, creates results/<run_id> the same way (refusing to
+# overwrite it without --force), prints the trainer's periodic summaries and, like the real
+# trainer, saves a checkpoint and exits cleanly on SIGINT. Filler lines carry the time they
+# were written, "t=<time.time()>", so a reader can measure end-to-end latency (see bench.py).
+#
+#     python fake_trainer.py config.yaml --run-id=test --rate=5000 --line-bytes=200 --duration=60
+
+# e.g. "[INFO] 3DBall. Step: 12000. Time Elapsed: 19.811 s. Mean Reward: 1.160. Std of Reward: 0.673. Training."
+SUMMARY_FORMAT = "[INFO] {behavior}. Step: {step}. Time Elapsed: {elapsed:.3f} s. Mean Reward: {mean:.3f}. Std of Reward: {std:.3f}. Training.\n"
+FILLER_FORMAT = "[DEBUG] t={stamp:.6f} n={count} "
+TICK = 0.005 # Seconds between batches of output
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic stand-in for mlagents-learn")
+
+    # The mlagents-learn arguments the panel passes
+    parser.add_argument("config", nargs="?", default="")
+    parser.add_argument("--run-id", default="ppo")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--initialize-from")
+    parser.add_argument("--base-port", type=int, default=5005)
+    parser.add_argument("--env")
+    parser.add_argument("--num-envs", type=int, default=1)
+    parser.add_argument("--results-dir", default="results")
+
+    # Behaviour of the stand-in, also read from FAKE_TRAINER_<NAME> environment variables
+    parser.add_argument("--rate", type=float, default=100.0, help="Output lines per second")
+    parser.add_argument("--line-bytes", type=int, default=120, help="Length of each filler line")
+    parser.add_argument("--stderr-fraction", type=float, default=0.0, help="Share of filler lines written to stderr")
+    parser.add_argument("--summary-every", type=float, default=1.0, help="Seconds between summaries of each behavior")
+    parser.add_argument("--behaviors", default="3DBall", help="Comma separated behavior names")
+    parser.add_argument("--steps-per-second", type=float, default=2000.0)
+    parser.add_argument("--duration", type=float, default=0.0, help="Seconds to train, 0 trains until stopped")
+    parser.add_argument("--startup-delay", type=float, default=0.0, help="Seconds before the first line")
+    parser.add_argument("--save-delay", type=float, default=0.5, help="Seconds spent saving after SIGINT")
+    parser.add_argument("--ignore-sigint", action="store_true", help="Keep training after SIGINT")
+    parser.add_argument("--ignore-sigterm", action="store_true", help="Only SIGKILL ends the run")
+    parser.add_argument("--diverge-at", type=float, default=0.0, help="Seconds until rewards turn to NaN, 0 never")
+    parser.add_argument("--seed", type=int, default=0)
+
+    for action in parser._actions:
+        value = os.environ.get("FAKE_TRAINER_" + action.dest.upper())
+        if value is None:
+            continue
+        if isinstance(action, argparse._StoreTrueAction):
+            value = value.lower() not in ("", "0", "false", "no")
+        elif action.type is not None:
+            value = action.type(value)
+        parser.set_defaults(**{action.dest: value})
+
+    args, unknown = parser.parse_known_args(argv)
+    if unknown:
+        print(f"[WARNING] Ignoring arguments: {' '.join(unknown)}", flush=True)
+    return args
+
+class FakeTrainer:
+    """Prints the output of a training run at a fixed rate until it ends or is stopped."""
+
+    def __init__(self, args):
+        self.args = args
+        self.run_dir = os.path.join(args.results_dir, args.run_id)
+        self.behaviors = [name for name in args.behaviors.split(",") if name]
+        self.random = random.Random(args.seed)
+        self.interrupted = False
+        self.count = 0 # Filler lines written
+        self.step = 0
+        self.start = time.time()
+
+    def prepare(self):
+        """Creates the results folder the way mlagents-learn does, returns an exit code or None."""
+        if os.path.isdir(self.run_dir) and not (self.args.force or self.args.resume):
+            print(
+                "Previous data from this run ID was found. Either specify a new run ID, use --resume "
+                "to resume this run, or use the --force parameter to overwrite existing data.",
+                file=sys.stderr, flush=True
+            )
+            return 1
+        if self.args.resume:
+            status = self._read_status()
+            self.step = max((behavior["steps"] for behavior in status.values()), default=0)
+
+        os.makedirs(os.path.join(self.run_dir, "run_logs"), exist_ok=True)
+        if self.args.config and os.path.exists(self.args.config):
+            with open(self.args.config, "rb") as src, open(os.path.join(self.run_dir, "configuration.yaml"), "wb") as dst:
+                dst.write(src.read())
+        return None
+
+    def run(self):
+        args = self.args
+        signal.signal(signal.SIGINT, self._on_sigint)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN if args.ignore_sigterm else signal.SIG_DFL)
+
+        code = self.prepare()
+        if code is not None:
+            return code
+
+        time.sleep(args.startup_delay)
+        out = sys.stdout
+        out.write("[INFO] Connected to Unity environment with package version 2.3.0 and communication version 1.5.0\n")
+        out.write(f"[INFO] Connected new brain: {', '.join(self.behaviors)}?team=0\n")
+        out.write(f"[INFO] Listening on port {args.base_port}. Start training by pressing the Play button in the Unity Editor.\n")
+        out.flush()
+
+        self.start = time.time()
+        pad = "x" * max(args.line_bytes - len(FILLER_FORMAT.format(stamp=self.start, count=0)) - 1, 0)
+        next_summary = self.start + args.summary_every
+        written = 0
+        while not self.interrupted or args.ignore_sigint:
+            now = time.time()
+            elapsed = now - self.start
+            if args.duration and elapsed >= args.duration:
+                break
+
+            # Catch up to the rate, in one write per stream
+            due = int(elapsed * args.rate) - written
+            if due > 0:
+                lines = [FILLER_FORMAT.format(stamp=now, count=self.count + i) + pad + "\n" for i in range(due)]
+                errors = int(due * args.stderr_fraction)
+                if errors:
+                    sys.stderr.write("".join(lines[:errors]))
+                    sys.stderr.flush()
+                out.write("".join(lines[errors:]))
+                self.count += due
+                written += due
+
+            if now >= next_summary:
+                self.step = int(elapsed * args.steps_per_second)
+                out.write("".join(self._summary(behavior, elapsed) for behavior in self.behaviors))
+                next_summary += args.summary_every
+            out.flush()
+            time.sleep(TICK)
+
+        if self.interrupted:
+            out.write("[INFO] Learning was interrupted. Please wait while the graph is generated.\n")
+            out.flush()
+        time.sleep(args.save_delay)
+        self._save()
+        out.write(f"[INFO] Exported {self.run_dir}/{self.behaviors[0]}.onnx\n")
+        out.flush()
+        return 0
+
+    def _summary(self, behavior, elapsed):
+        if self.args.diverge_at and elapsed >= self.args.diverge_at:
+            mean = std = math.nan
+        else:
+            # A learning curve that rises and levels off, with noise
+            mean = 1.0 - math.exp(-elapsed / 30.0) + self.random.gauss(0, 0.02)
+            std = abs(self.random.gauss(0.3, 0.05))
+        return SUMMARY_FORMAT.format(behavior=behavior, step=self.step, elapsed=elapsed, mean=mean, std=std)
+
+    def _save(self):
+        """Writes a checkpoint and training_status.json, as mlagents-learn does when it stops."""
+        status = {"metadata": {"stats_format_version": "0.3.0", "mlagents_version": "fake"}}
+        for behavior in self.behaviors:
+            folder = os.path.join(self.run_dir, behavior)
+            os.makedirs(folder, exist_ok=True)
+            for path in (
+                os.path.join(folder, "checkpoint.pt"),
+                os.path.join(folder, f"{behavior}-{self.step}.pt"),
+                os.path.join(folder, f"{behavior}-{self.step}.onnx"),
+                os.path.join(self.run_dir, f"{behavior}.onnx"),
+            ):
+                with open(path, "wb") as f:
+                    f.write(b"fake")
+            status[behavior] = {
+                "checkpoints": [{
+                    "steps": self.step,
+                    "file_path": os.path.join(folder, f"{behavior}-{self.step}.onnx"),
+                    "reward": None,
+                    "creation_time": time.time(),
+                }],
+                "final_checkpoint": None,
+            }
+        with open(os.path.join(self.run_dir, "run_logs", "training_status.json"), "w") as f:
+            json.dump(status, f, indent=4)
+        with open(os.path.join(self.run_dir, "run_logs", "timers.json"), "w") as f:
+            json.dump({"metadata": {"start_time_seconds": str(int(self.start)), "end_time_seconds": str(int(time.time()))}}, f)
+
+    def _read_status(self):
+        try:
+            with open(os.path.join(self.run_dir, "run_logs", "training_status.json"), "r") as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {
+            name: {"steps": max((c["steps"] for c in behavior.get("checkpoints", [])), default=0)}
+            for name, behavior in status.items() if name != "metadata"
+        }
+
+    def _on_sigint(self, signum, frame):
+        self.interrupted = True
+
+def main(argv=None):
+    return FakeTrainer(parse_args(argv)).run()
+
+if __name__ == "__main__":
+    sys.exit(main())
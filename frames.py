@@ -1,7 +1,13 @@
 import tkinter as tk
 import customtkinter as ctk
-from tkinter import filedialog, ttk
-from utils import get_conda_envs, begin_training, save_settings
+import re
+import time
+import os
+import csv
+import threading
+from tkinter import filedialog, ttk, messagebox
+from utils import begin_training, begin_sweep, save_settings, open_output
+from envs import get_conda_envs_async, resolve_env_async
 
 class Step1Frame(ctk.CTkFrame):
     def __init__(self, parent, controller):
@@ -99,26 +105,22 @@ class Step2Frame(ctk.CTkFrame):
         )
         self.step2_label_instruction.pack(pady=5)
 
-        conda_envs = get_conda_envs()
+        # Environments are discovered in the background and filled in when ready
+        self.env_dropdown = ttk.Combobox(
+            self,
+            values=[],
+            state="disabled",
+            textvariable=self.virtual_env
+        )
+        self.env_dropdown.set("Loading Conda environments...")
+        self.env_dropdown.pack(pady=10)
 
-        if conda_envs:
-            self.env_dropdown = ttk.Combobox(
-                self,
-                values=conda_envs,
-                state="readonly",
-                textvariable=self.virtual_env
-            )
-            self.env_dropdown.set("Select Conda Environment")
-            self.env_dropdown.pack(pady=10)
+        # Bind selection event to enable Next button
+        self.env_dropdown.bind("<<ComboboxSelected>>", self.on_env_selected)
 
-            # Bind selection event to enable Next button
-            self.env_dropdown.bind("<<ComboboxSelected>>", self.on_env_selected)
-        else:
-            env_dropdown = ctk.CTkLabel(
-                self,
-                text="No Conda environments found."
-            )
-            env_dropdown.pack(pady=10)
+        self.conda_envs = None
+        get_conda_envs_async(self.on_envs_found)
+        self.check_envs()
 
         self.save_button = ctk.CTkButton(
             self,
@@ -135,6 +137,22 @@ class Step2Frame(ctk.CTkFrame):
         )
         self.back_button.pack(pady=5)
 
+    def on_envs_found(self, envs):
+        # Runs on the discovery thread, the dropdown is updated from the Tk side in check_envs
+        self.conda_envs = envs
+
+    def check_envs(self):
+        """Fills the dropdown once environment discovery has finished."""
+        if self.conda_envs is None:
+            self.after(100, self.check_envs)
+            return
+
+        if self.conda_envs:
+            self.env_dropdown.configure(values=self.conda_envs, state="readonly")
+            self.env_dropdown.set("Select Conda Environment")
+        else:
+            self.env_dropdown.set("No Conda environments found.")
+
     def on_env_selected(self, event):
         # Enable the next button when a valid env is selected
         selected = self.virtual_env.get()
@@ -145,6 +163,7 @@ class Step2Frame(ctk.CTkFrame):
         """Save the user settings and handle the transition to the next frame"""
         self.controller.virtual_env = self.virtual_env.get() #Save the selected env to the controller
         print(f"    Selected Virtual Environment: {self.controller.virtual_env}")
+        resolve_env_async(self.controller.virtual_env) # Cached by the time the first run is launched
         
         save_settings(self.controller)
 
@@ -171,6 +190,69 @@ class MainMenu(ctk.CTkFrame):
         )
         self.start_button.pack(pady=5)
 
+        self.sweep_button = ctk.CTkButton(
+            self,
+            text = "Start Hyperparameter Sweep",
+            command = self.sweep_setup
+        )
+        self.sweep_button.pack(pady=5)
+
+        self.metrics_button = ctk.CTkButton(
+            self,
+            text = "View Run Metrics",
+            command = self.open_run_metrics
+        )
+        self.metrics_button.pack(pady=5)
+
+        self.browse_button = ctk.CTkButton(
+            self,
+            text = "Browse Runs",
+            command = lambda: RunBrowser(self, self.controller)
+        )
+        self.browse_button.pack(pady=5)
+
+        self.log_button = ctk.CTkButton(
+            self,
+            text = "Open Run Log",
+            command = self.open_run_log
+        )
+        self.log_button.pack(pady=5)
+
+        self.compare_button = ctk.CTkButton(
+            self,
+            text = "Compare Runs",
+            command = lambda: CompareWindow(self, self.controller)
+        )
+        self.compare_button.pack(pady=5)
+
+        self.profiles_button = ctk.CTkButton(
+            self,
+            text = "Launch Profiles",
+            command = lambda: ProfileEditor(self, self.controller)
+        )
+        self.profiles_button.pack(pady=5)
+
+        self.diagnostics_button = ctk.CTkButton(
+            self,
+            text = "Diagnostics",
+            command = lambda: DiagnosticsWindow(self, self.controller)
+        )
+        self.diagnostics_button.pack(pady=5)
+
+        self.storage_button = ctk.CTkButton(
+            self,
+            text = "Manage Storage",
+            command = lambda: StorageManager(self, self.controller)
+        )
+        self.storage_button.pack(pady=5)
+
+        self.stop_all_button = ctk.CTkButton(
+            self,
+            text = "Stop All Runs",
+            command = self.stop_all_runs
+        )
+        self.stop_all_button.pack(pady=5)
+
         self.back_button = ctk.CTkButton(
             self,
             text="Back",
@@ -178,6 +260,121 @@ class MainMenu(ctk.CTkFrame):
         )
         self.back_button.pack(pady=5)
 
+        # Live table of queued, running and finished jobs
+        self.jobs_label = ctk.CTkLabel(
+            self,
+            text="Training Runs",
+            font=("Arial", 12)
+        )
+        self.jobs_label.pack(pady=(10, 0))
+
+        self.jobs_table = ttk.Treeview(
+            self,
+            columns=("run_id", "state", "port", "cpus", "duration"),
+            show="headings",
+            height=6
+        )
+        for column, heading, width in (
+            ("run_id", "Run ID", 160),
+            ("state", "State", 80),
+            ("port", "Base Port", 80),
+            ("cpus", "CPUs", 100),
+            ("duration", "Duration", 80),
+        ):
+            self.jobs_table.heading(column, text=heading)
+            self.jobs_table.column(column, width=width, anchor="w")
+        self.jobs_table.pack(expand=True, fill="both", padx=10, pady=10)
+        self.jobs_table.bind("<Double-1>", self.show_job_output)
+
+        self.refresh_jobs()
+
+    def refresh_jobs(self):
+        """Updates the jobs table from the job manager, then schedules the next refresh."""
+        now = time.time()
+        rows = {}
+        for index, job in enumerate(self.controller.job_manager.snapshot()):
+            if job.started_at:
+                seconds = int((job.ended_at or now) - job.started_at)
+                duration = f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            else:
+                duration = ""
+            cpus = ",".join(str(cpu) for cpu in sorted(job.cpus)) if job.cpus else ""
+            rows[str(index)] = (job.run_id, job.state, job.base_port or "", cpus, duration)
+
+        for item in self.jobs_table.get_children():
+            if item not in rows:
+                self.jobs_table.delete(item)
+        for item, values in rows.items():
+            if self.jobs_table.exists(item):
+                self.jobs_table.item(item, values=values)
+            else:
+                self.jobs_table.insert("", "end", iid=item, values=values)
+
+        self.after(1000, self.refresh_jobs)
+
+    def show_job_output(self, event=None):
+        """Shows the output popup of the double-clicked run."""
+        selected = self.jobs_table.selection()
+        jobs = self.controller.job_manager.snapshot()
+        if not selected or int(selected[0]) >= len(jobs):
+            return
+        job = jobs[int(selected[0])]
+
+        if not open_output(self.controller, job):
+            print(f"[INFO] The output of {job.run_id} was closed, open its run log to see it.")
+
+    def stop_all_runs(self):
+        """Cancels queued runs and stops every running one in parallel."""
+        count = self.controller.job_manager.stop_all()
+        print(f"[ALERT] Stopping {count} runs")
+
+    def open_run_log(self):
+        """Asks for a run in the results folder and opens its latest saved output."""
+        from runlog import find_logs
+
+        results_dir = os.path.join(self.controller.working_dir or "", "results")
+        run_dir = filedialog.askdirectory(title="Select a Run", initialdir=results_dir)
+        if not run_dir:
+            print("[ALERT] No run selected.")
+            return
+
+        logs = find_logs(run_dir)
+        if not logs:
+            print(f"[ERROR] No saved output found for {run_dir}")
+            return
+        LogViewer(self, logs[-1])
+
+    def open_run_metrics(self):
+        """Asks for a run in the results folder and opens its TensorBoard scalars."""
+        results_dir = os.path.join(self.controller.working_dir or "", "results")
+        run_dir = filedialog.askdirectory(title="Select a Run", initialdir=results_dir)
+
+        if run_dir:
+            RunMetricsWindow(self, run_dir)
+        else:
+            print("[ALERT] No run selected.")
+
+    def profile_picker(self, popup):
+        """Adds a choice of the Unity editor or one of the project's launch profiles, returns its variable."""
+        from profiles import EDITOR, load_profiles
+
+        label = ctk.CTkLabel(
+            popup,
+            text="Train in the Unity editor or with a launch profile",
+            font=("Arial", 12)
+        )
+        label.pack(pady=(10, 0))
+
+        profile = tk.StringVar(value=EDITOR)
+        ctk.CTkComboBox(
+            popup,
+            values=[EDITOR, *sorted(load_profiles(self.controller.working_dir))],
+            variable=profile,
+            state="readonly",
+            width=250
+        ).pack(pady=5)
+        return profile
+
     def training_setup(self):
         popup = ctk.CTkToplevel(self)
         popup.title("Enter Run ID")
@@ -195,6 +392,67 @@ class MainMenu(ctk.CTkFrame):
         )
         id_entry.pack(pady=10)
 
+        # Warn about Run ID collisions while typing, from the run index
+        collision_label = ctk.CTkLabel(
+            popup,
+            text="",
+            text_color="orange",
+            font=("Arial", 11)
+        )
+        collision_label.pack()
+
+        run_index = self.controller.run_index
+        existing_ids = run_index.run_ids()
+        refreshed = threading.Event()
+
+        def refresh_index():
+            # Picks up runs created since the index was last updated, without blocking the dialog
+            run_index.update()
+            existing_ids.update(run_index.run_ids())
+            refreshed.set()
+
+        threading.Thread(target=refresh_index, daemon=True).start()
+
+        def check_collision(event=None):
+            run_id = id_entry.get()
+            if run_id and (run_id in existing_ids or self.controller.job_manager.find_active(run_id)):
+                collision_label.configure(text=f'A run with the Run ID "{run_id}" already exists')
+            else:
+                collision_label.configure(text="")
+
+        id_entry.bind("<KeyRelease>", check_collision)
+
+        profile = self.profile_picker(popup)
+
+        # Warm start from the checkpoint of any indexed run that saved one
+        init_label = ctk.CTkLabel(
+            popup,
+            text="Initialize from the checkpoint of a previous run",
+            font=("Arial", 12)
+        )
+        init_label.pack(pady=(10, 0))
+
+        no_run = "None"
+        initialize_from = tk.StringVar(value=no_run)
+        init_box = ctk.CTkComboBox(
+            popup,
+            values=[no_run, *run_index.resumable_run_ids()],
+            variable=initialize_from,
+            state="readonly",
+            width=250
+        )
+        init_box.pack(pady=5)
+
+        def check_refreshed():
+            if not popup.winfo_exists():
+                return
+            if refreshed.is_set():
+                init_box.configure(values=[no_run, *run_index.resumable_run_ids()])
+            else:
+                popup.after(200, check_refreshed)
+
+        check_refreshed()
+
         label2 = ctk.CTkLabel(
             popup,
             text="Select the configuration file for this training session",
@@ -211,6 +469,46 @@ class MainMenu(ctk.CTkFrame):
 
         label3.pack(pady=10)
 
+        # Problems, key hyperparameters and changes from the last run of the selected config
+        report_box = ctk.CTkTextbox(
+            popup,
+            width=520,
+            height=200,
+            font=("Courier", 11),
+            wrap="none"
+        )
+        checked = {} # Config path -> configcheck.preflight report, filled in by the worker thread
+
+        def check_config(config):
+            from configcheck import preflight # Deferred, it pulls in yaml which startup does not need
+
+            try:
+                checked[config] = preflight(config, self.controller.working_dir, run_index)
+            except Exception as e:
+                print(f"[ERROR] Failed to check the config {config}: {e}")
+                checked[config] = e
+
+        def show_report(config):
+            from configcheck import format_report, ERROR
+
+            if not popup.winfo_exists() or config != self.selected_config:
+                return # Closed, or another config was selected
+            if config not in checked:
+                popup.after(50, lambda: show_report(config))
+                return
+
+            report = checked[config]
+            text = f"Could not check the config: {report}" if isinstance(report, Exception) else format_report(report)
+            report_box.configure(state="normal", height=min(20, text.count("\n") + 2) * 15)
+            report_box.delete("1.0", tk.END)
+            report_box.insert("1.0", text)
+            report_box.configure(state="disabled")
+            report_box.pack(pady=5, padx=10, after=label3)
+            if not isinstance(report, Exception):
+                errors = sum(problem.severity == ERROR for problem in report["problems"])
+                print(f"[INFO] Config checked{' (cached)' if report['from_cache'] else ''}: "
+                      f"{errors} errors, {len(report['problems']) - errors} warnings")
+
         # Open config selection dialog
         def select_config_file():
             # Select config prompt
@@ -223,6 +521,11 @@ class MainMenu(ctk.CTkFrame):
                 start_button.configure(state="normal")
                 clear_button.configure(state="normal")
                 print(f"[INFO] Selected Config File: {self.selected_config}")
+
+                # Checked on every selection, an unchanged file is answered from the cache
+                checked.pop(config, None)
+                threading.Thread(target=check_config, args=(config,), daemon=True).start()
+                show_report(config)
             else:
                 print("[ALERT] No config file selected.")
 
@@ -238,6 +541,7 @@ class MainMenu(ctk.CTkFrame):
             if self.selected_config:
                 self.selected_config = ""
                 label3.configure(text="No config file selected")
+                report_box.pack_forget()
                 clear_button.configure(state="disabled")
                 start_button.configure(state="disabled")
 
@@ -258,13 +562,32 @@ class MainMenu(ctk.CTkFrame):
                 run_id = id_entry.get() # Retrieve user input
                 if not run_id: # Validate the input
                     raise ValueError("Run ID is empty. Please provide a valid Run ID.")
-                
+
+                # mlagents-learn would reject the config only after the environment has started
+                from configcheck import ERROR
+
+                report = checked.get(self.selected_config)
+                errors = [problem for problem in report["problems"] if problem.severity == ERROR] \
+                    if isinstance(report, dict) else []
+                if errors and not messagebox.askyesno(
+                    "Config Problems",
+                    message=f"The config has {len(errors)} errors, mlagents-learn will probably refuse it.",
+                    detail="\n".join(f"{problem.path}: {problem.message}" for problem in errors[:5]) + "\n\nStart anyway?",
+                    parent=popup
+                ):
+                    print("    [ALERT] Training session cancelled, the config has errors.")
+                    return
+
                 # Close the popup after processing
                 if popup: # Ensure popup exists before destroying it
                     popup.destroy()
 
                 # Begin training
-                begin_training(self.controller, run_id, self.selected_config)
+                source = initialize_from.get()
+                begin_training(
+                    self.controller, run_id, self.selected_config, profile.get(),
+                    initialize_from=None if source == no_run else source
+                )
 
             except ValueError as ve:
                 print(f"ValueError: {ve}")
@@ -281,4 +604,1355 @@ class MainMenu(ctk.CTkFrame):
             state="disabled",
             command=on_start
         )
-        start_button.pack(pady=10)
\ No newline at end of file
+        start_button.pack(pady=10)
+
+    def sweep_setup(self):
+        popup = ctk.CTkToplevel(self)
+        popup.title("Hyperparameter Sweep")
+
+        label1 = ctk.CTkLabel(
+            popup,
+            text="Enter the Sweep ID, used as the prefix of every Run ID",
+            font=("Arial", 12)
+        )
+        label1.pack(pady=10)
+
+        id_entry = ctk.CTkEntry(
+            popup,
+            width=250
+        )
+        id_entry.pack(pady=10)
+
+        profile = self.profile_picker(popup)
+
+        label2 = ctk.CTkLabel(
+            popup,
+            text="No sweep spec selected",
+            font=("Arial", 12)
+        )
+        label2.pack(pady=10)
+
+        selected_spec = tk.StringVar()
+
+        def select_spec_file():
+            spec = filedialog.askopenfilename(
+                title="Select a Sweep Spec",
+                filetypes=[("YAML files", "*.yaml *.yml"), ("All files", "*.*")]
+            )
+            if spec:
+                selected_spec.set(spec)
+                label2.configure(text=f"Selected Sweep Spec: {spec}")
+                start_button.configure(state="normal")
+                print(f"[INFO] Selected Sweep Spec: {spec}")
+            else:
+                print("[ALERT] No sweep spec selected.")
+
+        select_button = ctk.CTkButton(
+            popup,
+            text="Select Sweep Spec",
+            command=select_spec_file
+        )
+        select_button.pack(pady=5)
+
+        def on_start():
+            sweep_id = id_entry.get()
+            if not sweep_id:
+                print("ValueError: Sweep ID is empty. Please provide a valid Sweep ID.")
+                return
+
+            def on_queued(queued):
+                if popup.winfo_exists():
+                    popup.destroy()
+                SweepSummary(self, self.controller, sweep_id, queued)
+
+            begin_sweep(self.controller, sweep_id, selected_spec.get(), profile.get(), on_queued=on_queued)
+
+        start_button = ctk.CTkButton(
+            popup,
+            text="Begin Sweep",
+            state="disabled",
+            command=on_start
+        )
+        start_button.pack(pady=10)
+
+class ProfileEditor(ctk.CTkToplevel):
+    """Edits the project's launch profiles for built environments, and calibrates their --num-envs."""
+
+    FIELDS = (
+        ("num_envs", "--num-envs", int),
+        ("time_scale", "--time-scale", float),
+        ("quality_level", "--quality-level", int),
+        ("base_port", "--base-port", int),
+        ("torch_device", "--torch-device", str),
+    )
+
+    def __init__(self, parent, controller):
+        from profiles import load_profiles, CALIBRATION_NUM_ENVS, CALIBRATION_SECONDS
+
+        super().__init__(parent)
+        self.title("Launch Profiles")
+        self.geometry("520x720")
+
+        self.controller = controller
+        self.working_dir = controller.working_dir
+        self.profiles = load_profiles(self.working_dir)
+        self.calibration = None
+        self.config_file = ""
+
+        top = ctk.CTkFrame(self)
+        top.pack(fill="x", padx=10, pady=10)
+        self.name_box = ctk.CTkComboBox(top, values=sorted(self.profiles), width=200, command=self.show_profile)
+        self.name_box.set("")
+        self.name_box.pack(side="left", padx=5)
+        ctk.CTkButton(top, text="Save", width=80, command=self.save).pack(side="left", padx=5)
+        ctk.CTkButton(top, text="Delete", width=80, command=self.delete).pack(side="left", padx=5)
+
+        env_row = ctk.CTkFrame(self)
+        env_row.pack(fill="x", padx=10)
+        self.env_entry = ctk.CTkEntry(env_row, width=340, placeholder_text="Environment binary (--env)")
+        self.env_entry.pack(side="left", padx=5, pady=5)
+        ctk.CTkButton(env_row, text="Browse", width=80, command=self.browse_env).pack(side="left", padx=5)
+
+        form = ctk.CTkFrame(self)
+        form.pack(fill="x", padx=10, pady=5)
+        self.entries = {}
+        for row, (key, label, _) in enumerate(self.FIELDS):
+            ctk.CTkLabel(form, text=label).grid(row=row, column=0, sticky="w", padx=5, pady=2)
+            entry = ctk.CTkEntry(form, width=160)
+            entry.grid(row=row, column=1, sticky="w", padx=5, pady=2)
+            self.entries[key] = entry
+        self.no_graphics = tk.BooleanVar(value=True)
+        ctk.CTkCheckBox(form, text="--no-graphics", variable=self.no_graphics).grid(
+            row=len(self.FIELDS), column=0, columnspan=2, sticky="w", padx=5, pady=5
+        )
+
+        # Calibration, a short run for each --num-envs value
+        ctk.CTkLabel(self, text="Calibrate --num-envs on this machine", font=("Arial", 12)).pack(pady=(10, 0))
+        calibrate_row = ctk.CTkFrame(self)
+        calibrate_row.pack(fill="x", padx=10, pady=5)
+        self.values_entry = ctk.CTkEntry(calibrate_row, width=120)
+        self.values_entry.insert(0, ",".join(str(value) for value in CALIBRATION_NUM_ENVS))
+        self.values_entry.pack(side="left", padx=5)
+        self.seconds_entry = ctk.CTkEntry(calibrate_row, width=60)
+        self.seconds_entry.insert(0, str(CALIBRATION_SECONDS))
+        self.seconds_entry.pack(side="left", padx=5)
+        ctk.CTkLabel(calibrate_row, text="seconds each").pack(side="left")
+        ctk.CTkButton(calibrate_row, text="Select Config", width=100, command=self.select_config).pack(side="left", padx=5)
+
+        buttons = ctk.CTkFrame(self)
+        buttons.pack(fill="x", padx=10)
+        self.calibrate_button = ctk.CTkButton(buttons, text="Calibrate", width=100, state="disabled", command=self.calibrate)
+        self.calibrate_button.pack(side="left", padx=5, pady=5)
+        self.cancel_button = ctk.CTkButton(buttons, text="Cancel", width=100, state="disabled", command=self.cancel_calibration)
+        self.cancel_button.pack(side="left", padx=5)
+        ctk.CTkButton(buttons, text="Use Best", width=100, command=self.use_best).pack(side="left", padx=5)
+
+        self.results_table = ttk.Treeview(self, columns=("num_envs", "rate"), show="headings", height=6)
+        self.results_table.heading("num_envs", text="--num-envs")
+        self.results_table.heading("rate", text="Steps / Second")
+        self.results_table.pack(expand=True, fill="both", padx=10, pady=5)
+
+        self.status_label = ctk.CTkLabel(self, text="", font=("Arial", 11))
+        self.status_label.pack(pady=5)
+
+        if self.profiles:
+            first = sorted(self.profiles)[0]
+            self.name_box.set(first)
+            self.show_profile(first)
+        else:
+            self.show_profile(None)
+
+    def show_profile(self, name):
+        """Fills the form from a saved profile, or with the defaults for a new one."""
+        from profiles import new_profile
+
+        profile = self.profiles.get(name) or new_profile()
+        self.env_entry.delete(0, tk.END)
+        self.env_entry.insert(0, profile["env_path"])
+        for key, _, _ in self.FIELDS:
+            self.entries[key].delete(0, tk.END)
+            self.entries[key].insert(0, str(profile[key]))
+        self.no_graphics.set(profile["no_graphics"])
+        self.show_results(profile)
+
+    def show_results(self, profile, results=None):
+        """Shows the calibration results of this machine, or of the calibration in progress."""
+        if results is None:
+            import socket
+
+            results = profile["calibration"].get(socket.gethostname(), {})
+        self.results_table.delete(*self.results_table.get_children())
+        for num_envs, rate in sorted(results.items(), key=lambda item: int(item[0])):
+            self.results_table.insert("", "end", values=(num_envs, f"{rate:,.0f}" if rate else "not measured"))
+
+    def read_form(self):
+        """Returns the name and the profile in the form, or (None, None) if they are not valid."""
+        from profiles import new_profile, validate_profile
+
+        name = self.name_box.get().strip()
+        if not name:
+            print("ValueError: Profile name is empty.")
+            return None, None
+
+        profile = self.profiles.get(name) or new_profile()
+        profile = {**profile, "env_path": self.env_entry.get().strip(), "no_graphics": self.no_graphics.get()}
+        try:
+            for key, label, kind in self.FIELDS:
+                profile[key] = kind(self.entries[key].get().strip())
+            validate_profile(profile)
+        except ValueError as e:
+            print(f"[ERROR] Invalid launch profile: {e}")
+            self.status_label.configure(text=str(e))
+            return None, None
+        return name, profile
+
+    def save(self):
+        from profiles import save_profiles
+
+        name, profile = self.read_form()
+        if name is None:
+            return None
+        self.profiles[name] = profile
+        try:
+            save_profiles(self.working_dir, self.profiles)
+        except OSError as e:
+            print(f"[ERROR] Failed to save launch profiles: {e}")
+            self.status_label.configure(text=f"Failed to save: {e}")
+            return None
+        self.name_box.configure(values=sorted(self.profiles))
+        self.status_label.configure(text=f'Saved "{name}"')
+        print(f"[INFO] Saved launch profile {name}")
+        return name
+
+    def delete(self):
+        from profiles import save_profiles
+
+        name = self.name_box.get().strip()
+        if name not in self.profiles:
+            return
+        profile = self.profiles.pop(name)
+        try:
+            save_profiles(self.working_dir, self.profiles)
+        except OSError as e:
+            self.profiles[name] = profile # Still on disk
+            print(f"[ERROR] Failed to save launch profiles: {e}")
+            self.status_label.configure(text=f"Failed to delete: {e}")
+            return
+        self.name_box.configure(values=sorted(self.profiles))
+        self.name_box.set("")
+        self.show_profile(None)
+        self.status_label.configure(text=f'Deleted "{name}"')
+
+    def browse_env(self):
+        path = filedialog.askopenfilename(title="Select the Environment Binary")
+        if path:
+            self.env_entry.delete(0, tk.END)
+            self.env_entry.insert(0, path)
+
+    def select_config(self):
+        config = filedialog.askopenfilename(
+            title="Select a Config file",
+            filetypes=[("YAML files", "*.yaml *.yml"), ("All files", "*.*")]
+        )
+        if config:
+            self.config_file = config
+            self.calibrate_button.configure(state="normal")
+            self.status_label.configure(text=f"Calibrating with {os.path.basename(config)}")
+
+    def calibrate(self):
+        """Saves the profile, then queues a short run for each --num-envs value, one after another."""
+        from profiles import Calibration
+        from utils import queue_training
+
+        if not self.controller.virtual_env:
+            print("[ERROR] No environment selected for training!")
+            return
+        try:
+            values = sorted({int(value) for value in self.values_entry.get().split(",") if value.strip()})
+            seconds = float(self.seconds_entry.get())
+        except ValueError:
+            print("ValueError: --num-envs values must be numbers separated by commas, and seconds a number.")
+            return
+        name = self.save()
+        if name is None or not values:
+            return
+
+        job_manager = self.controller.job_manager
+        self.calibration = Calibration(
+            name, self.profiles[name], self.controller.virtual_env, self.config_file, self.working_dir,
+            queue=lambda run_id, argv, environ, first_port: queue_training(
+                self.controller, run_id, argv, environ, show_output=False, first_port=first_port
+            ),
+            stop=lambda job: job_manager.cancel(job) or job_manager.stop(job),
+            values=values,
+            seconds=seconds
+        ).start()
+        self.calibrate_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
+        self.poll_calibration()
+
+    def poll_calibration(self):
+        calibration = self.calibration
+        if calibration is None or not self.winfo_exists():
+            return
+        self.status_label.configure(text=calibration.status)
+        self.show_results(calibration.profile, {str(num_envs): rate for num_envs, rate in calibration.results.items()})
+
+        if not calibration.done.is_set():
+            self.after(500, self.poll_calibration)
+            return
+
+        # The results were stored in the profile, keep them even if it was saved again meanwhile
+        from profiles import save_profiles
+
+        self.calibration = None
+        self.calibrate_button.configure(state="normal")
+        self.cancel_button.configure(state="disabled")
+        self.show_results(calibration.profile)
+
+        if calibration.name in self.profiles:
+            self.profiles[calibration.name]["calibration"] = calibration.profile["calibration"]
+            try:
+                save_profiles(self.working_dir, self.profiles)
+            except OSError as e:
+                print(f"[ERROR] Failed to save launch profiles: {e}")
+                self.status_label.configure(text=f"{calibration.status}, but the results could not be saved: {e}")
+
+    def cancel_calibration(self):
+        if self.calibration is not None:
+            self.calibration.cancel()
+            self.status_label.configure(text="Cancelling...")
+
+    def use_best(self):
+        """Sets --num-envs to the fastest value calibrated on this machine."""
+        from profiles import best_num_envs
+
+        profile = self.profiles.get(self.name_box.get().strip())
+        best = best_num_envs(profile) if profile else None
+        if best is None:
+            self.status_label.configure(text="No calibration results on this machine.")
+            return
+        num_envs, rate = best
+        self.entries["num_envs"].delete(0, tk.END)
+        self.entries["num_envs"].insert(0, str(num_envs))
+        self.status_label.configure(text=f"--num-envs={num_envs} gave {rate:,.0f} steps/s, save to keep it")
+
+class SweepSummary(ctk.CTkToplevel):
+    """Live summary of a sweep's runs and their final rewards."""
+
+    def __init__(self, parent, controller, sweep_id, queued):
+        super().__init__(parent)
+        self.controller = controller
+        self.sweep_id = sweep_id
+        self.queued = queued
+        self.rewards = {} # Run ID -> final reward, read once the run has ended
+        self.saved = False
+
+        self.title(f"Sweep: {sweep_id}")
+        self.geometry("700x400")
+
+        keys = list(queued[0][1]) if queued else []
+        self.columns = ("run_id", *keys, "state", "reward")
+
+        self.table = ttk.Treeview(self, columns=self.columns, show="headings")
+        self.table.heading("run_id", text="Run ID")
+        for key in keys:
+            self.table.heading(key, text=key.split(".")[-1])
+        self.table.heading("state", text="State")
+        self.table.heading("reward", text="Final Reward")
+        for column in self.columns:
+            self.table.column(column, width=100, anchor="w")
+            self.table.heading(column, command=lambda c=column: self.sort_by(c))
+        self.table.pack(expand=True, fill="both", padx=10, pady=10)
+
+        # Double click a run to show its output popup
+        self.table.bind("<Double-1>", self.show_output)
+
+        self.status_label = ctk.CTkLabel(self, text="", font=("Arial", 12))
+        self.status_label.pack(pady=5)
+
+        for job, overrides in queued:
+            self.table.insert("", "end", iid=job.run_id, values=self.row(job, overrides))
+
+        self.refresh()
+
+    def row(self, job, overrides):
+        reward = self.rewards.get(job.run_id)
+        return (job.run_id, *overrides.values(), job.state, "" if reward is None else f"{reward:.3f}")
+
+    def refresh(self):
+        """Updates the table, and reads the final reward of every run that has ended."""
+        from runindex import final_reward
+
+        if not self.winfo_exists():
+            return
+        done = 0
+        for job, overrides in self.queued:
+            if not job.active:
+                done += 1
+                if job.run_id not in self.rewards:
+                    self.rewards[job.run_id] = final_reward(self.controller.working_dir, job.run_id)
+            self.table.item(job.run_id, values=self.row(job, overrides))
+
+        self.status_label.configure(text=f"{done} of {len(self.queued)} runs finished")
+
+        if done == len(self.queued):
+            if not self.saved:
+                self.save_summary()
+        else:
+            self.after(2000, self.refresh)
+
+    def save_summary(self):
+        """Writes the summary table next to the sweep's generated configs."""
+        from sweeps import SWEEP_CONFIG_DIR
+
+        path = os.path.join(self.controller.working_dir, SWEEP_CONFIG_DIR, self.sweep_id, "summary.csv")
+        try:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(self.columns)
+                for job, overrides in self.queued:
+                    writer.writerow(self.row(job, overrides))
+            self.saved = True
+            self.status_label.configure(text=f"Sweep complete, summary saved to {path}")
+            print(f"[SUCCESS] Sweep summary saved to {path}")
+        except Exception as e:
+            print(f"[ERROR] Failed to save sweep summary: {e}")
+
+    def sort_by(self, column):
+        def key(item):
+            value = self.table.set(item, column)
+            try:
+                return (0, float(value))
+            except ValueError:
+                return (1, value)
+
+        items = sorted(self.table.get_children(), key=key, reverse=(column == "reward"))
+        for index, item in enumerate(items):
+            self.table.move(item, "", index)
+
+    def show_output(self, event):
+        item = self.table.identify_row(event.y)
+        for job, _ in self.queued:
+            if job.run_id == item and not open_output(self.controller, job):
+                print(f"[INFO] The output of {job.run_id} was closed, open its run log to see it.")
+
+class CompareWindow(ctk.CTkToplevel):
+    """Overlays one scalar of several runs on a common step grid, smoothed, with bands across seeds.
+
+    Runs are read through compare.CachedRun on a background thread, so a comparison opened
+    before reopens from memory-mapped arrays without decoding any event files. Aligning the
+    runs to the grid also happens in the background; smoothing and bands are recomputed from
+    the aligned values, which is quick enough to follow the controls as they change.
+    """
+
+    SMOOTHING = {"None": None, "EMA": "ema", "Moving Average": "mean"}
+
+    def __init__(self, parent, controller, run_ids=()):
+        from charts import CompareChart
+
+        super().__init__(parent)
+        self.title("Compare Runs")
+        self.geometry("1100x560")
+
+        self.controller = controller
+        self.results_dir = os.path.join(controller.working_dir or "", "results")
+        self.runs = [] # compare.CachedRun of the loaded runs
+        self.aligned = None # (names, grid, matrix) of the current tag and zoom
+        self.x_range = None
+        self._generation = 0 # Increases with every load or alignment, so stale results are dropped
+        self._pending = None # (generation, kind, result) handed over by the worker thread
+        self._lock = threading.Lock()
+
+        left = ctk.CTkFrame(self)
+        left.pack(side="left", fill="y", padx=10, pady=10)
+        ctk.CTkLabel(left, text="Runs", font=("Arial", 12)).pack()
+        self.run_list = tk.Listbox(left, selectmode=tk.EXTENDED, width=32, exportselection=False)
+        self.run_list.pack(expand=True, fill="y", pady=5)
+        run_index = controller.run_index
+        self.run_ids = [row["run_id"] for row in run_index.query(limit=100000)]
+        for index, run_id in enumerate(self.run_ids):
+            self.run_list.insert(tk.END, run_id)
+            if run_id in run_ids:
+                self.run_list.selection_set(index)
+        ctk.CTkButton(left, text="Compare Selected", command=self.load).pack(pady=5)
+
+        right = ctk.CTkFrame(self)
+        right.pack(side="left", expand=True, fill="both", padx=(0, 10), pady=10)
+
+        controls = ctk.CTkFrame(right)
+        controls.pack(fill="x")
+        self.tag = tk.StringVar()
+        self.tag_box = ttk.Combobox(controls, textvariable=self.tag, state="readonly", width=40)
+        self.tag_box.pack(side="left", padx=5, pady=5)
+        self.tag_box.bind("<<ComboboxSelected>>", lambda event: self.realign())
+
+        self.smoothing = tk.StringVar(value="EMA")
+        ctk.CTkComboBox(controls, values=list(self.SMOOTHING), variable=self.smoothing, state="readonly",
+                        width=140, command=lambda value: self.render()).pack(side="left", padx=5)
+        self.weight = tk.DoubleVar(value=0.6)
+        ctk.CTkSlider(controls, from_=0.0, to=0.99, variable=self.weight, width=120,
+                      command=lambda value: self.render()).pack(side="left", padx=5)
+
+        self.group_seeds = tk.BooleanVar(value=True)
+        ctk.CTkCheckBox(controls, text="Seed bands", variable=self.group_seeds, command=self.render).pack(side="left", padx=5)
+        self.show_runs = tk.BooleanVar(value=True)
+        ctk.CTkCheckBox(controls, text="Each run", variable=self.show_runs, command=self.render).pack(side="left", padx=5)
+
+        self.chart = CompareChart(right, on_zoom=self.zoom)
+        self.chart.pack(expand=True, fill="both", pady=5)
+
+        self.status_label = ctk.CTkLabel(right, text="Select runs to compare", font=("Arial", 11))
+        self.status_label.pack()
+
+        self.check_pending()
+        if run_ids:
+            self.load()
+
+    def _start(self, kind, work):
+        """Runs `work` on a worker thread, its result is picked up by check_pending."""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+
+        def run():
+            try:
+                result = work()
+            except Exception as e:
+                print(f"[ERROR] Comparison failed: {e}")
+                result = e
+            with self._lock:
+                if generation == self._generation:
+                    self._pending = (kind, result)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def check_pending(self):
+        if not self.winfo_exists():
+            return
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending:
+            kind, result = pending
+            if isinstance(result, Exception):
+                self.status_label.configure(text=f"Failed: {result}")
+            elif kind == "load":
+                self.loaded(result)
+            else:
+                self.aligned = result
+                self.render()
+        self.after(100, self.check_pending)
+
+    def load(self):
+        from compare import load_runs
+
+        selected = [self.run_ids[index] for index in self.run_list.curselection()]
+        if not selected:
+            self.status_label.configure(text="Select runs to compare")
+            return
+        run_dirs = [os.path.join(self.results_dir, run_id) for run_id in selected]
+        self.status_label.configure(text=f"Loading {len(run_dirs)} runs...")
+        self._start("load", lambda: load_runs(run_dirs))
+
+    def loaded(self, runs):
+        self.runs = runs
+        self.x_range = None
+        tags = sorted({tag for run in runs for tag in run.tags()})
+        self.tag_box.configure(values=tags)
+        if self.tag.get() not in tags:
+            self.tag.set("Environment/Cumulative Reward" if "Environment/Cumulative Reward" in tags else (tags[0] if tags else ""))
+        cached = sum(run.from_cache for run in runs)
+        print(f"[INFO] Comparing {len(runs)} runs, {cached} of them from the cache")
+        self.realign()
+
+    def realign(self):
+        """Aligns the runs' current tag to the grid, over the zoomed range if there is one."""
+        from compare import curves, align
+
+        runs, tag, x_range = self.runs, self.tag.get(), self.x_range
+        if not runs or not tag:
+            return
+
+        def work():
+            series = curves(runs, tag)
+            grid, matrix = align([(steps, values) for _, steps, values in series], x_range=x_range)
+            return [name for name, _, _ in series], grid, matrix
+
+        self.status_label.configure(text="Aligning...")
+        self._start("align", work)
+
+    def zoom(self, x_range):
+        self.x_range = x_range
+        self.realign()
+
+    def render(self):
+        """Smooths the aligned values and computes the seed bands, then redraws the chart."""
+        from compare import smooth, bands, seed_group
+        from charts import COLORS
+
+        if not self.aligned:
+            return
+        names, grid, matrix = self.aligned
+        method = self.SMOOTHING[self.smoothing.get()]
+        # One slider sets the strength of either smoothing, the moving average spans up to 50 columns
+        smoothed = smooth(matrix, method, weight=self.weight.get(), window=max(int(self.weight.get() * 50), 1))
+
+        groups = [seed_group(name) for name in names] if self.group_seeds.get() else names
+        group_colors = {group: COLORS[i % len(COLORS)] for i, group in enumerate(dict.fromkeys(groups))}
+        colors = {**group_colors, **{name: group_colors[group] for name, group in zip(names, groups)}}
+
+        shown_bands = {group: band for group, band in bands(smoothed, groups).items() if groups.count(group) > 1} \
+            if self.group_seeds.get() else {}
+        lines = dict(zip(names, smoothed)) if self.show_runs.get() or not shown_bands else {}
+        self.chart.show(grid, lines, shown_bands, colors)
+
+        zoomed = f", steps {self.x_range[0]:,.0f} to {self.x_range[1]:,.0f} (right click to zoom out)" if self.x_range else ""
+        self.status_label.configure(text=f"{len(names)} series, {len(shown_bands)} seed groups{zoomed}")
+
+class RunMetricsWindow(ctk.CTkToplevel):
+    """Plots any scalar tag from a run's TensorBoard event files.
+
+    The event files are polled on a background thread, and only records written since the
+    last poll are decoded, so a running run's chart keeps up at little cost.
+    """
+
+    POLL_SECONDS = 2.0
+
+    def __init__(self, parent, run_dir):
+        from tfevents import RunEventReader
+        from charts import SeriesChart
+
+        super().__init__(parent)
+        self.title(f"Run Metrics: {os.path.basename(run_dir)}")
+        self.geometry("700x420")
+
+        self.reader = RunEventReader(run_dir)
+        self.closed = threading.Event()
+        self.tag = tk.StringVar()
+
+        self.tag_dropdown = ttk.Combobox(
+            self,
+            values=[],
+            state="readonly",
+            textvariable=self.tag,
+            width=50
+        )
+        self.tag_dropdown.set("Reading event files...")
+        self.tag_dropdown.pack(pady=10)
+        self.tag_dropdown.bind("<<ComboboxSelected>>", self.on_tag_selected)
+
+        self.chart = SeriesChart(self, self.reader.source("Environment/Cumulative Reward"), height=320)
+        self.chart.pack(expand=True, fill="both", padx=10, pady=10)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        threading.Thread(target=self.poll_events, daemon=True).start()
+        self.check_tags()
+
+    def poll_events(self):
+        # Runs on a background thread until the window is closed
+        while not self.closed.is_set():
+            try:
+                self.reader.poll()
+            except Exception as e:
+                print(f"[ERROR] Failed to read event files: {e}")
+            self.closed.wait(self.POLL_SECONDS)
+
+    def check_tags(self):
+        """Keeps the tag list up to date as new tags appear."""
+        if self.closed.is_set():
+            return
+
+        tags = self.reader.tags()
+        if tags and list(self.tag_dropdown.cget("values")) != tags:
+            self.tag_dropdown.configure(values=tags)
+            if self.tag.get() not in tags:
+                self.tag.set(self.chart.source.tag if self.chart.source.tag in tags else tags[0])
+                self.on_tag_selected(None)
+        self.after(1000, self.check_tags)
+
+    def on_tag_selected(self, event):
+        self.chart.set_source(self.reader.source(self.tag.get()))
+
+    def close(self):
+        self.closed.set()
+        self.destroy()
+
+class RunBrowser(ctk.CTkToplevel):
+    """Searchable, sortable view of every run in the results folder, backed by the run index.
+
+    Indexed runs are shown straight away, while the index is brought up to date on a
+    background thread and the table refreshed when it finishes.
+    """
+
+    COLUMNS = (
+        ("run_id", "Run ID", 180),
+        ("start_time", "Started", 130),
+        ("end_time", "Ended", 130),
+        ("last_step", "Last Step", 90),
+        ("final_reward", "Final Reward", 90),
+        ("checkpoints", "Checkpoints", 80),
+        ("resumable", "Resumable", 80),
+    )
+
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+        self.index = controller.run_index
+        self.sort = "start_time"
+        self.descending = True
+        self.updated = threading.Event()
+
+        self.title("Run Browser")
+        self.geometry("800x450")
+
+        self.search = tk.StringVar()
+        self.search_entry = ctk.CTkEntry(
+            self,
+            width=300,
+            placeholder_text="Search Run IDs",
+            textvariable=self.search
+        )
+        self.search_entry.pack(pady=10)
+        self.search.trace_add("write", lambda *args: self.refresh())
+
+        self.table = ttk.Treeview(self, columns=[column for column, _, _ in self.COLUMNS], show="headings")
+        for column, heading, width in self.COLUMNS:
+            self.table.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.table.column(column, width=width, anchor="w")
+        self.table.pack(expand=True, fill="both", padx=10, pady=5)
+
+        ctk.CTkButton(self, text="Compare Selected", command=self.compare_selected).pack(pady=(0, 5))
+
+        self.status_label = ctk.CTkLabel(self, text="Updating run index...", font=("Arial", 11))
+        self.status_label.pack(pady=5)
+
+        self.refresh()
+        threading.Thread(target=self.update_index, daemon=True).start()
+        self.check_updated()
+
+    def update_index(self):
+        try:
+            self.index.update()
+        except Exception as e:
+            print(f"[ERROR] Failed to update the run index: {e}")
+        self.updated.set()
+
+    def check_updated(self):
+        if self.updated.is_set():
+            self.refresh()
+        else:
+            self.after(200, self.check_updated)
+
+    def compare_selected(self):
+        run_ids = [self.table.set(item, "run_id") for item in self.table.selection()]
+        CompareWindow(self, self.controller, run_ids)
+
+    def sort_by(self, column):
+        if column in ("checkpoints", "resumable"):
+            return
+        self.descending = not self.descending if column == self.sort else column != "run_id"
+        self.sort = column
+        self.refresh()
+
+    def refresh(self):
+        """Reloads the table from the index with the current search and sort order."""
+        def format_time(seconds):
+            return time.strftime("%Y-%m-%d %H:%M", time.localtime(seconds)) if seconds else ""
+
+        rows = self.index.query(self.search.get(), self.sort, self.descending)
+        self.table.delete(*self.table.get_children())
+        for row in rows:
+            self.table.insert("", "end", values=(
+                row["run_id"],
+                format_time(row["start_time"]),
+                format_time(row["end_time"]),
+                "" if row["last_step"] is None else row["last_step"],
+                "" if row["final_reward"] is None else f"{row['final_reward']:.3f}",
+                len(row["checkpoints"]),
+                "yes" if row["resumable"] else "",
+            ))
+
+        if self.updated.is_set():
+            self.status_label.configure(text=f"Showing {len(rows)} of {self.index.count()} runs")
+
+class LogViewer(ctk.CTkToplevel):
+    """Pages through a saved run log, jumping to any line or time through its index."""
+
+    PAGE_LINES = 500
+
+    def __init__(self, parent, log_dir):
+        from runlog import RunLogReader
+
+        super().__init__(parent)
+        self.title(f"Run Log: {log_dir}")
+        self.geometry("800x500")
+
+        self.log_dir = log_dir
+        self.reader = RunLogReader(log_dir)
+        self.start = 0
+
+        controls = ctk.CTkFrame(self)
+        controls.pack(fill="x", padx=10, pady=10)
+
+        self.line_entry = ctk.CTkEntry(controls, width=120, placeholder_text="Line")
+        self.line_entry.pack(side="left", padx=5)
+        ctk.CTkButton(controls, text="Go to Line", width=90, command=self.go_to_line).pack(side="left", padx=5)
+
+        self.time_entry = ctk.CTkEntry(controls, width=120, placeholder_text="HH:MM:SS")
+        self.time_entry.pack(side="left", padx=5)
+        ctk.CTkButton(controls, text="Go to Time", width=90, command=self.go_to_time).pack(side="left", padx=5)
+
+        ctk.CTkButton(controls, text="Previous", width=80, command=lambda: self.show(self.start - self.PAGE_LINES)).pack(side="left", padx=5)
+        ctk.CTkButton(controls, text="Next", width=80, command=lambda: self.show(self.start + self.PAGE_LINES)).pack(side="left", padx=5)
+        ctk.CTkButton(controls, text="Search", width=80, command=self.open_search).pack(side="left", padx=5)
+
+        self.text_widget = tk.Text(self, wrap=tk.NONE, font=("Courier", 10))
+        self.text_widget.pack(expand=True, fill="both", padx=10)
+
+        self.status_label = ctk.CTkLabel(self, text="", font=("Arial", 11))
+        self.status_label.pack(pady=5)
+
+        self.show(0)
+
+    def show(self, start):
+        """Shows a page of lines starting at the given line number."""
+        self.reader.reload() # Pick up lines written since the last page, if the run is still going
+        self.start = max(start, 0)
+        lines = self.reader.read_lines(self.start, self.PAGE_LINES)
+
+        self.text_widget.configure(state="normal")
+        self.text_widget.delete("1.0", tk.END)
+        self.text_widget.insert(tk.END, "".join(lines))
+        self.text_widget.configure(state="disabled")
+
+        self.status_label.configure(
+            text=f"Lines {self.start:,} to {self.start + len(lines):,}, at least {self.reader.indexed_lines:,} lines in the log"
+        )
+
+    def open_search(self):
+        from search import LogSearch
+
+        SearchWindow(self, LogSearch(self.log_dir), f"Search: {self.log_dir}", on_select=lambda line: self.show(line - 10))
+
+    def go_to_line(self):
+        try:
+            self.show(int(self.line_entry.get().replace(",", "")))
+        except ValueError:
+            print("ValueError: Line must be a number.")
+
+    def go_to_time(self):
+        """Jumps to the first indexed line at or after a time of day, on the day the log started."""
+        if not self.reader.entries:
+            return
+        try:
+            clock = time.strptime(self.time_entry.get(), "%H:%M:%S")
+        except ValueError:
+            print("ValueError: Time must be HH:MM:SS.")
+            return
+
+        day = time.localtime(self.reader.entries[0].timestamp)
+        target = time.mktime((day.tm_year, day.tm_mon, day.tm_mday, clock.tm_hour, clock.tm_min, clock.tm_sec, 0, 0, -1))
+        if target < self.reader.entries[0].timestamp:
+            target += 24 * 60 * 60 # The time is on the following day
+        self.show(self.reader.line_at_time(target))
+
+
+class SearchWindow(ctk.CTkToplevel):
+    """Searches a run's output by text or regex, filtered by severity and behavior.
+
+    Searches run on a worker thread and a new search cancels the one before it, so the window
+    never waits on a long search and the run's output keeps streaming.
+
+    Args:
+        parent: The window this one belongs to.
+        source: A search.OutputIndex of a live run, or a search.LogSearch of a saved log.
+        title (str): The window title.
+        on_select (callable): Called with the line number of a double-clicked match.
+    """
+
+    CONTEXT_LINES = 20
+
+    def __init__(self, parent, source, title, on_select=None):
+        super().__init__(parent)
+        self.title(title)
+        self.geometry("800x600")
+
+        self.source = source
+        self.on_select = on_select
+        self.cancelled = threading.Event()
+        self.results = None # Set by the worker thread, shown by check_results
+
+        controls = ctk.CTkFrame(self)
+        controls.pack(fill="x", padx=10, pady=10)
+
+        self.pattern_entry = ctk.CTkEntry(controls, width=260, placeholder_text="Search")
+        self.pattern_entry.pack(side="left", padx=5)
+        self.pattern_entry.bind("<Return>", lambda event: self.search())
+
+        self.regex_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(controls, text="Regex", variable=self.regex_var, width=60).pack(side="left", padx=5)
+        self.case_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(controls, text="Match case", variable=self.case_var, width=90).pack(side="left", padx=5)
+
+        self.severity_combo = ttk.Combobox(controls, values=["All", "INFO", "WARNING", "ERROR"], state="readonly", width=9)
+        self.severity_combo.set("All")
+        self.severity_combo.pack(side="left", padx=5)
+
+        self.behavior_combo = ttk.Combobox(controls, values=["All"], state="readonly", width=16, postcommand=self.update_behaviors)
+        self.behavior_combo.set("All")
+        self.behavior_combo.pack(side="left", padx=5)
+
+        ctk.CTkButton(controls, text="Search", width=80, command=self.search).pack(side="left", padx=5)
+
+        self.status_label = ctk.CTkLabel(self, text="", font=("Arial", 11))
+        self.status_label.pack()
+
+        self.tree = ttk.Treeview(self, columns=("line", "text"), show="headings", height=12)
+        self.tree.heading("line", text="Line")
+        self.tree.heading("text", text="Output (newest first)")
+        self.tree.column("line", width=90, anchor="e", stretch=False)
+        self.tree.column("text", width=680)
+        self.tree.pack(fill="both", expand=True, padx=10)
+        self.tree.bind("<<TreeviewSelect>>", self.show_context)
+        self.tree.bind("<Double-1>", self.select_line)
+
+        self.context_text = tk.Text(self, height=12, wrap=tk.NONE, font=("Courier", 10))
+        self.context_text.tag_configure("match", background="#fff2a8")
+        self.context_text.pack(fill="both", expand=True, padx=10, pady=10)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def update_behaviors(self):
+        self.behavior_combo.configure(values=["All"] + self.source.behaviors())
+
+    def search(self):
+        from search import Query
+
+        severity = self.severity_combo.get()
+        behavior = self.behavior_combo.get()
+        try:
+            query = Query(
+                self.pattern_entry.get(),
+                regex=self.regex_var.get(),
+                match_case=self.case_var.get(),
+                severity=None if severity == "All" else severity,
+                behavior=None if behavior == "All" else behavior
+            )
+        except re.error as e:
+            self.status_label.configure(text=f"Invalid regex: {e}")
+            return
+
+        # Cancel the search still running, if any, and start this one
+        self.cancelled.set()
+        self.cancelled = cancelled = threading.Event()
+        self.results = None
+        self.status_label.configure(text="Searching...")
+
+        def worker():
+            started = time.perf_counter()
+            results = self.source.search(query, cancelled=cancelled)
+            if not cancelled.is_set():
+                self.results = (results, time.perf_counter() - started)
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(50, lambda: self.check_results(cancelled))
+
+    def check_results(self, cancelled):
+        if cancelled.is_set() or not self.winfo_exists():
+            return # Replaced by a newer search, or closed
+        if self.results is None:
+            self.after(50, lambda: self.check_results(cancelled))
+            return
+
+        results, seconds = self.results
+        self.results = None
+        self.tree.delete(*self.tree.get_children())
+        for line, text in results:
+            self.tree.insert("", "end", iid=str(line), values=(line, text.rstrip("\n")))
+        self.status_label.configure(text=f"{len(results):,} matches in {seconds * 1000:,.0f} ms")
+
+    def show_context(self, event=None):
+        selected = self.tree.selection()
+        if not selected:
+            return
+        line = int(selected[0])
+        start, lines = self.source.context(line, self.CONTEXT_LINES, self.CONTEXT_LINES)
+
+        self.context_text.configure(state="normal")
+        self.context_text.delete("1.0", tk.END)
+        for number, text in enumerate(lines, start):
+            self.context_text.insert(tk.END, f"{number:>9}  {text}", ("match",) if number == line else ())
+        self.context_text.configure(state="disabled")
+        self.context_text.see(f"{line - start + 1}.0")
+
+    def select_line(self, event=None):
+        selected = self.tree.selection()
+        if selected and self.on_select:
+            self.on_select(int(selected[0]))
+
+    def close(self):
+        self.cancelled.set()
+        self.destroy()
+
+class StorageManager(ctk.CTkToplevel):
+    """Disk usage of every run, and retention policies that prune and compress finished runs.
+
+    Sizes come from storage.SizeIndex, which only measures runs again once they change. A
+    policy is always previewed first: Apply carries out exactly the previewed actions, on a
+    low priority worker thread, skipping any run started since.
+    """
+
+    COLUMNS = (
+        ("run_id", "Run ID", 180),
+        ("total", "Total", 80),
+        ("checkpoints", "Checkpoints", 90),
+        ("models", "Models", 70),
+        ("events", "Events", 70),
+        ("logs", "Logs", 70),
+        ("other", "Other", 70),
+        ("state", "State", 70),
+    )
+    PREVIEW_COLUMNS = (
+        ("run_id", "Run ID", 150),
+        ("kind", "Action", 110),
+        ("path", "Path", 330),
+        ("bytes", "Size", 80),
+        ("reason", "Reason", 260),
+    )
+
+    def __init__(self, parent, controller):
+        from storage import SizeIndex
+
+        super().__init__(parent)
+        self.title("Storage")
+        self.geometry("900x650")
+
+        self.controller = controller
+        self.results_dir = os.path.join(controller.working_dir or "", "results")
+        self.index = SizeIndex(self.results_dir)
+        self.actions = [] # The previewed storage.Action, carried out by Apply
+        self.keep_status = False # Leave the status of an apply in place while sizes refresh
+        self.progress = None # (done, total) of the actions being applied
+        self._pending = None # (kind, result) handed over by the worker thread
+        self._lock = threading.Lock()
+
+        self.table = ttk.Treeview(self, columns=[column for column, _, _ in self.COLUMNS], show="headings", height=10)
+        for column, heading, width in self.COLUMNS:
+            self.table.heading(column, text=heading)
+            self.table.column(column, width=width, anchor="w")
+        self.table.pack(expand=True, fill="both", padx=10, pady=(10, 5))
+
+        retention = controller.retention
+        policy = ctk.CTkFrame(self)
+        policy.pack(fill="x", padx=10, pady=5)
+        ctk.CTkLabel(policy, text="Keep last").pack(side="left", padx=(10, 5))
+        self.keep_last = tk.StringVar(value=str(retention["keep_last"]))
+        ctk.CTkEntry(policy, width=50, textvariable=self.keep_last).pack(side="left", padx=5)
+        self.keep_best = tk.BooleanVar(value=retention["keep_best"])
+        ctk.CTkCheckBox(policy, text="Keep best", variable=self.keep_best).pack(side="left", padx=5)
+        self.compress_logs = tk.BooleanVar(value=retention["compress_logs"])
+        ctk.CTkCheckBox(policy, text="Compress logs", variable=self.compress_logs).pack(side="left", padx=5)
+        self.compress_events = tk.BooleanVar(value=retention["compress_events"])
+        ctk.CTkCheckBox(policy, text="Compress event files (not readable by TensorBoard)",
+                        variable=self.compress_events).pack(side="left", padx=5)
+
+        buttons = ctk.CTkFrame(self)
+        buttons.pack(pady=5)
+        self.preview_button = ctk.CTkButton(buttons, text="Preview", command=self.preview)
+        self.preview_button.pack(side="left", padx=5)
+        self.apply_button = ctk.CTkButton(buttons, text="Apply", state="disabled", command=self.apply)
+        self.apply_button.pack(side="left", padx=5)
+        ctk.CTkButton(buttons, text="Save Policy", command=self.save_policy).pack(side="left", padx=5)
+
+        self.preview_table = ttk.Treeview(self, columns=[column for column, _, _ in self.PREVIEW_COLUMNS], show="headings", height=10)
+        for column, heading, width in self.PREVIEW_COLUMNS:
+            self.preview_table.heading(column, text=heading)
+            self.preview_table.column(column, width=width, anchor="w")
+        self.preview_table.pack(expand=True, fill="both", padx=10, pady=5)
+
+        self.status_label = ctk.CTkLabel(self, text="Measuring runs...", font=("Arial", 11))
+        self.status_label.pack(pady=5)
+
+        self.refresh()
+        self.check_pending()
+
+    def policy(self):
+        """Returns the policy in the form of storage.RETENTION, or None if Keep last is not a number."""
+        try:
+            keep_last = int(self.keep_last.get())
+        except ValueError:
+            return None
+        if keep_last < 0:
+            return None
+        return {
+            **self.controller.retention,
+            "keep_last": keep_last,
+            "keep_best": self.keep_best.get(),
+            "compress_logs": self.compress_logs.get(),
+            "compress_events": self.compress_events.get(),
+        }
+
+    def active_run_ids(self):
+        return {job.run_id for job in self.controller.job_manager.snapshot() if job.active}
+
+    def _start(self, kind, work):
+        """Runs `work` on a worker thread, its result is picked up by check_pending."""
+        self.preview_button.configure(state="disabled")
+        self.apply_button.configure(state="disabled")
+
+        def run():
+            try:
+                result = work()
+            except Exception as e:
+                print(f"[ERROR] Storage {kind} failed: {e}")
+                result = e
+            with self._lock:
+                self._pending = (kind, result)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def check_pending(self):
+        from storage import format_bytes
+
+        if not self.winfo_exists():
+            return
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending:
+            kind, result = pending
+            self.progress = None
+            self.preview_button.configure(state="normal")
+            if isinstance(result, Exception):
+                self.status_label.configure(text=f"Failed: {result}")
+            elif kind == "measure":
+                self.show_sizes(result)
+            elif kind == "preview":
+                self.show_preview(*result)
+            else:
+                self.actions = []
+                self.preview_table.delete(*self.preview_table.get_children())
+                errors = f", {len(result['errors'])} errors (see the console)" if result["errors"] else ""
+                self.status_label.configure(text=f"Deleted {result['deleted']} files, compressed {result['compressed']}, "
+                                                 f"freed {format_bytes(result['freed'])}{errors}")
+                self.refresh(keep_status=True)
+        elif self.progress:
+            done, total = self.progress
+            self.status_label.configure(text=f"Applying... {done} of {total}")
+        self.after(100, self.check_pending)
+
+    def refresh(self, keep_status=False):
+        finished_after = self.controller.retention["finished_after"]
+        self.keep_status = keep_status
+        if not keep_status:
+            self.status_label.configure(text="Measuring runs...")
+        self._start("measure", lambda: self.index.update(finished_after))
+
+    def show_sizes(self, runs):
+        from storage import CATEGORIES, format_bytes
+
+        active = self.active_run_ids()
+        self.table.delete(*self.table.get_children())
+        for run_id, run in sorted(runs.items(), key=lambda item: item[1]["total"], reverse=True):
+            state = "Active" if run_id in active else ("Finished" if run["finished"] else "Recent")
+            self.table.insert("", "end", values=(
+                run_id,
+                format_bytes(run["total"]),
+                *(format_bytes(run["sizes"][name]) for name in CATEGORIES),
+                state
+            ))
+
+        if not self.keep_status:
+            total = sum(run["total"] for run in runs.values())
+            self.status_label.configure(text=f"{len(runs)} runs use {format_bytes(total)}. "
+                                             f"Select runs, or none for all, and preview a policy.")
+
+    def preview(self):
+        """Works out what the policy would change in the selected runs, or all of them, without changing anything."""
+        from storage import plan
+
+        policy = self.policy()
+        if policy is None:
+            self.status_label.configure(text="Keep last must be a whole number, 0 or more")
+            return
+        selected = [self.table.set(item, "run_id") for item in self.table.selection()]
+        run_ids = selected or sorted(self.index.runs)
+        active = self.active_run_ids()
+
+        self.actions = []
+        self.preview_table.delete(*self.preview_table.get_children())
+        self.status_label.configure(text=f"Previewing {len(run_ids)} runs...")
+        self._start("preview", lambda: plan(self.results_dir, run_ids, policy, active))
+
+    def show_preview(self, actions, skipped):
+        from storage import DELETE, format_bytes
+
+        self.actions = actions
+        for number, action in enumerate(actions):
+            self.preview_table.insert("", "end", iid=str(number), values=(
+                action.run_id,
+                action.kind,
+                os.path.relpath(action.path, self.results_dir),
+                format_bytes(action.bytes),
+                action.reason
+            ))
+
+        deleted = [action for action in actions if action.kind == DELETE]
+        compressed = len(actions) - len(deleted)
+        summary = (f"Would delete {len(deleted)} files ({format_bytes(sum(action.bytes for action in deleted))}) "
+                   f"and compress {compressed} event files or logs")
+        if skipped:
+            summary += f". Skipped {len(skipped)} runs: " + ", ".join(f"{run_id} ({why})" for run_id, why in skipped[:3])
+            summary += ", ..." if len(skipped) > 3 else ""
+        self.status_label.configure(text=summary)
+        self.apply_button.configure(state="normal" if actions else "disabled")
+
+    def apply(self):
+        """Carries out the previewed actions."""
+        from storage import apply
+
+        actions = self.actions
+        if not actions:
+            return
+        confirm = messagebox.askyesno(
+            "Apply Retention Policy",
+            message=f"Carry out the {len(actions)} previewed actions?",
+            detail="Deleted checkpoints cannot be recovered.",
+            parent=self
+        )
+        if not confirm:
+            return
+
+        def progress(done, total):
+            self.progress = (done, total)
+
+        # Runs started since the preview are left alone
+        job_manager = self.controller.job_manager
+        self.progress = (0, len(actions))
+        self._start("apply", lambda: apply(actions, skip=job_manager.find_active, progress=progress))
+
+    def save_policy(self):
+        policy = self.policy()
+        if policy is None:
+            self.status_label.configure(text="Keep last must be a whole number, 0 or more")
+            return
+        self.controller.retention = policy
+        save_settings(self.controller)
+
+class DiagnosticsWindow(ctk.CTkToplevel):
+    """Timing histograms and the latest events of the panel, or of the run daemon, see events.EventLog.
+
+    Refreshed every second. The daemon's events are fetched on a worker thread, as the
+    daemon can be slow to answer.
+    """
+
+    REFRESH_MS = 1000
+    TIMING_COLUMNS = (
+        ("name", "Timing", 170),
+        ("count", "Count", 60),
+        ("mean", "Mean", 80),
+        ("p50", "p50", 80),
+        ("p95", "p95", 80),
+        ("max", "Max", 80),
+    )
+    EVENT_COLUMNS = (
+        ("time", "Time", 90),
+        ("event", "Event", 150),
+        ("run_id", "Run ID", 140),
+        ("details", "Details", 340),
+    )
+
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+        self.fetched = None # (snapshot, error) from the daemon, set by the worker thread
+        self.fetching = False
+
+        self.title("Diagnostics")
+        self.geometry("760x560")
+
+        self.source = tk.StringVar(value="Panel")
+        if controller.job_manager.remote:
+            ctk.CTkSegmentedButton(
+                self,
+                values=["Panel", "Daemon"],
+                variable=self.source,
+                command=lambda value: self.refresh()
+            ).pack(pady=(10, 0))
+
+        self.timings = self._table(self.TIMING_COLUMNS, height=8)
+        self.events = self._table(self.EVENT_COLUMNS, height=12)
+
+        self.status_label = ctk.CTkLabel(self, text="", font=("Arial", 11))
+        self.status_label.pack(pady=5)
+
+        self.refresh()
+
+    def _table(self, columns, height):
+        table = ttk.Treeview(self, columns=[column for column, _, _ in columns], show="headings", height=height)
+        for column, heading, width in columns:
+            table.heading(column, text=heading)
+            table.column(column, width=width, anchor="w")
+        table.pack(expand=True, fill="both", padx=10, pady=(10, 0))
+        return table
+
+    def refresh(self):
+        if not self.winfo_exists():
+            return
+        if self.source.get() == "Daemon":
+            self.fetch()
+        else:
+            from events import EVENTS, EVENTS_FILE
+
+            self.show(EVENTS.snapshot())
+            self.status_label.configure(text=f"Events are written to {EVENTS.path or EVENTS_FILE}")
+        self.after(self.REFRESH_MS, self.refresh)
+
+    def fetch(self):
+        if self.fetched is not None:
+            snapshot, error = self.fetched
+            self.fetched = None
+            if error:
+                self.status_label.configure(text=f"Could not reach the run daemon: {error}")
+            else:
+                from daemon import DAEMON_EVENTS
+
+                self.show(snapshot)
+                self.status_label.configure(text=f"The daemon writes its events to {DAEMON_EVENTS}")
+        if self.fetching:
+            return
+
+        def worker():
+            try:
+                self.fetched = (self.controller.job_manager.client.request("events"), None)
+            except Exception as e:
+                self.fetched = (None, e)
+            self.fetching = False
+
+        self.fetching = True
+        threading.Thread(target=worker, daemon=True).start()
+
+    def show(self, snapshot):
+        def format_seconds(seconds):
+            if seconds is None:
+                return ""
+            return f"{seconds * 1000:,.1f} ms" if seconds < 1 else f"{seconds:,.2f} s"
+
+        self.timings.delete(*self.timings.get_children())
+        for name, summary in snapshot["histograms"].items():
+            self.timings.insert("", "end", values=(
+                name,
+                summary["count"],
+                *(format_seconds(summary[key]) for key in ("mean", "p50", "p95", "max"))
+            ))
+
+        self.events.delete(*self.events.get_children())
+        for event in reversed(snapshot["recent"]):
+            details = {key: value for key, value in event.items() if key not in ("event", "mono", "time", "run_id")}
+            if "seconds" in details:
+                details["seconds"] = format_seconds(details["seconds"])
+            self.events.insert("", "end", values=(
+                time.strftime("%H:%M:%S", time.localtime(event["time"])),
+                event["event"],
+                event.get("run_id", ""),
+                ", ".join(f"{key}={value}" for key, value in details.items())
+            ))
@@ -0,0 +1,341 @@
+import os
+import time
+import signal
+import threading
+import subprocess
+from resources import ResourceSampler, SAMPLE_INTERVAL
+from events import EVENTS
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+STOPPED = "stopped"
+CANCELLED = "cancelled"
+
+# Defaults for running several trainers side by side
+MAX_CONCURRENT_RUNS = 1
+BASE_PORT = 5005 # mlagents-learn's own default --base-port
+PORT_STRIDE = 100 # Ports reserved for each slot, enough for --num-envs up to this value
+
+# Seconds to wait after SIGINT, while mlagents-learn saves its model, and after SIGTERM
+SIGINT_TIMEOUT = 15
+SIGTERM_TIMEOUT = 5
+
+class Job:
+    """A single training run tracked by the JobManager.
+
+    Args:
+        run_id (str): The ID for the training session.
+        command (list): The argv that starts the run, without --base-port.
+        cwd (str): The directory the command runs in.
+        output (OutputBuffer): Receives the run's output and status messages.
+        environ (dict): Environment variables for the run, None to inherit the app's.
+        first_port (int): The first port of the slot ranges, BASE_PORT if None.
+    """
+
+    def __init__(self, run_id, command, cwd, output=None, environ=None, first_port=None):
+        self.run_id = run_id
+        self.command = command
+        self.cwd = cwd
+        self.environ = environ
+        self.first_port = first_port
+        self.output = output
+        self.window = None # The popup showing this job's output, if it has one
+        self.metrics = None # TrainingMetrics parsed from the output, if enabled
+        self.search = None # search.OutputIndex over the output, if enabled
+        self.log = None # runlog.RunLogWriter of the output, if enabled
+        self.watchdog = None # earlystop.EarlyStopping of the metrics, if enabled
+        self.consumers = [] # Objects whose feed(lines) receives every batch of output lines, and close() at the end
+        self.resources = None # ResourceSampler of the run's process group, while it runs
+
+        self.state = QUEUED
+        self.process = None
+        self.slot = None
+        self.base_port = None
+        self.cpus = None
+        self.stop_requested = False
+        self.stop_status = "" # Progress of a requested stop, for display
+        self.stop_reason = None # Why the run was stopped early, if it was
+
+        self.queued_at = time.time()
+        self.started_at = None
+        self.ended_at = None
+        self.returncode = None
+
+    @property
+    def active(self):
+        """True while the job is queued or running."""
+        return self.state in (QUEUED, RUNNING)
+
+    def write(self, data):
+        if self.output:
+            self.output.write(data)
+
+def _close_consumers(job):
+    """Closes the consumers of a job that has ended, or will never start."""
+    for consumer in job.consumers:
+        if hasattr(consumer, "close"):
+            consumer.close() # e.g. write out the rest of the run log and stop its thread
+
+class JobManager:
+    """Tracks training runs and starts them under a concurrency limit.
+
+    Runs beyond `max_concurrency` wait in a FIFO queue. Every running job occupies a slot,
+    and the slot decides its --base-port range and, if `cpus_per_run` is set, the CPUs it
+    is pinned to, so concurrent runs never collide.
+
+    Args:
+        stream_output (callable): Called on a worker thread with (process, output, consumers)
+            for every started job. It should return once the process has exited.
+        max_concurrency (int): The number of runs allowed to train at once.
+        cpus_per_run (int): Number of CPUs each run is pinned to, 0 disables pinning.
+        sigint_timeout (float): Seconds a stopping run gets to exit after SIGINT.
+        sigterm_timeout (float): Seconds a stopping run gets to exit after SIGTERM, before SIGKILL.
+        sample_interval (float): Seconds between resource samples of each run, 0 disables them.
+            Samples are saved to results/<run_id>/run_logs/resources.csv.
+    """
+
+    def __init__(self, stream_output, max_concurrency=MAX_CONCURRENT_RUNS, cpus_per_run=0,
+                 sigint_timeout=SIGINT_TIMEOUT, sigterm_timeout=SIGTERM_TIMEOUT, sample_interval=SAMPLE_INTERVAL):
+        self.stream_output = stream_output
+        self.max_concurrency = max_concurrency
+        self.cpus_per_run = cpus_per_run
+        self.sigint_timeout = sigint_timeout
+        self.sigterm_timeout = sigterm_timeout
+        self.sample_interval = sample_interval
+
+        self.remote = False # See remote.RemoteJobManager
+        self.jobs = []
+        self._slots = {} # Slot index -> running job
+        self._lock = threading.RLock()
+
+    def submit(self, job):
+        """Queues a job and starts it straight away if a slot is free."""
+        with self._lock:
+            self.jobs.append(job)
+        EVENTS.track(job, job.run_id, "queued")
+        EVENTS.emit("run.queued", job.run_id)
+        job.write(f"[CTRL Panel] Run queued: {job.run_id}\n")
+        self._schedule()
+        return job
+
+    def cancel(self, job):
+        """Removes a job from the queue before it starts.
+
+        Returns:
+            bool: True if the job was still queued and has been cancelled.
+        """
+        with self._lock:
+            if job.state != QUEUED:
+                return False
+            job.state = CANCELLED
+            job.ended_at = time.time()
+        EVENTS.since(job, "queued", "run.cancelled")
+        EVENTS.untrack(job)
+        job.write("\n[CTRL Panel] Queued run cancelled.\n")
+        _close_consumers(job)
+        return True
+
+    def stop(self, job):
+        """Starts stopping a running job, without waiting for it to exit.
+
+        The job's process group gets SIGINT, so mlagents-learn can save its model, then SIGTERM
+        and finally SIGKILL if it outlives each timeout. The sequence runs on its own thread, so
+        any number of runs can be stopped in parallel. Progress is written to the job's output
+        and kept in `job.stop_status`.
+
+        Returns:
+            bool: True if a stop was started, False if the job is not running or already stopping.
+        """
+        with self._lock:
+            if job.state != RUNNING or job.stop_requested:
+                return False
+            job.stop_requested = True
+
+        EVENTS.mark(job.process, "stop_requested")
+        EVENTS.emit("run.stop_requested", job.run_id, reason=job.stop_reason)
+        threading.Thread(target=self._terminate, args=(job,), daemon=True).start()
+        return True
+
+    def stop_all(self):
+        """Cancels every queued job and starts stopping every running one.
+
+        Returns:
+            int: The number of jobs cancelled or being stopped.
+        """
+        count = 0
+        for job in self.snapshot():
+            if self.cancel(job) or self.stop(job):
+                count += 1
+        return count
+
+    def find_active(self, run_id):
+        """Returns the queued or running job with the given Run ID, if there is one."""
+        with self._lock:
+            for job in self.jobs:
+                if job.run_id == run_id and job.active:
+                    return job
+        return None
+
+    def snapshot(self):
+        """Returns a list of all jobs, safe to iterate while runs start and end."""
+        with self._lock:
+            return list(self.jobs)
+
+    def running(self):
+        with self._lock:
+            return [job for job in self.jobs if job.state == RUNNING]
+
+    def _schedule(self):
+        """Starts queued jobs until every slot is taken."""
+        with self._lock:
+            for job in self.jobs:
+                if len(self._slots) >= self.max_concurrency:
+                    break
+                if job.state == QUEUED:
+                    self._start(job, self._free_slot())
+
+    def _free_slot(self):
+        slot = 0
+        while slot in self._slots:
+            slot += 1
+        return slot
+
+    def _cpus_for_slot(self, slot):
+        if not self.cpus_per_run or not hasattr(os, "sched_getaffinity"):
+            return None
+
+        available = sorted(os.sched_getaffinity(0))
+        start = (slot * self.cpus_per_run) % len(available)
+        return {available[(start + i) % len(available)] for i in range(min(self.cpus_per_run, len(available)))}
+
+    def _start(self, job, slot):
+        job.slot = slot
+        job.base_port = (job.first_port or BASE_PORT) + slot * PORT_STRIDE
+        job.cpus = self._cpus_for_slot(slot)
+
+        cpus = job.cpus
+        def preexec():
+            os.setsid() # Own process group, so the whole run can be signalled at once
+            if cpus:
+                os.sched_setaffinity(0, cpus)
+
+        spawn = time.monotonic()
+        try:
+            job.process = subprocess.Popen(
+                [*job.command, f"--base-port={job.base_port}"],
+                cwd=job.cwd,
+                env=job.environ,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                preexec_fn=preexec
+            )
+        except Exception as e:
+            print(f"    [ERROR] Failed to start run {job.run_id}: {e}")
+            EVENTS.emit("run.start_failed", job.run_id, error=str(e))
+            EVENTS.untrack(job)
+            job.state = FAILED
+            job.ended_at = time.time()
+            job.write(f"\n[ERROR] Failed to start training session: {e}\n")
+            _close_consumers(job)
+            return
+
+        job.state = RUNNING
+        job.started_at = time.time()
+        self._slots[slot] = job
+
+        # The process is the key from here on, stream_output only gets the process
+        EVENTS.timing("run.spawn", time.monotonic() - spawn, job.run_id, pid=job.process.pid)
+        EVENTS.since(job, "queued", "run.queue_wait", slot=slot, base_port=job.base_port)
+        EVENTS.untrack(job)
+        EVENTS.track(job.process, job.run_id, "started")
+
+        if self.sample_interval:
+            path = os.path.join(job.cwd, "results", job.run_id, "run_logs", "resources.csv")
+            job.resources = ResourceSampler(job.process.pid, self.sample_interval, path=path).start()
+
+        pinned = f", CPUs {sorted(job.cpus)}" if job.cpus else ""
+        job.write(f"[CTRL Panel] Run started on base port {job.base_port}{pinned}\n")
+        print(f"    [ALERT] Training started with run-id: {job.run_id} (base port {job.base_port}{pinned})")
+
+        threading.Thread(target=self._watch, args=(job,), daemon=True).start()
+
+    def _terminate(self, job):
+        process = job.process
+        sequence = (
+            (signal.SIGINT, self.sigint_timeout),
+            (signal.SIGTERM, self.sigterm_timeout),
+            (signal.SIGKILL, None),
+        )
+
+        for sig, timeout in sequence:
+            if process.poll() is not None:
+                break
+
+            name = signal.Signals(sig).name
+            try:
+                print(f"    [INFO] Sending {name} to the process group of {job.run_id}...")
+                os.killpg(process.pid, sig) # The run leads its own process group, see _start
+            except ProcessLookupError:
+                break # Exited in the meantime
+            except Exception as e:
+                print(f"    [ERROR] Failed to send {name}: {e}")
+                job.write(f"\n[ERROR] Failed to send {name}: {e}\n")
+                continue
+
+            EVENTS.emit("run.signal", job.run_id, signal=name)
+            job.write(f"\n[CTRL Panel] Sent {name} to the training session.\n")
+            if timeout is None:
+                job.stop_status = f"Sent {name}"
+                break
+
+            deadline = time.monotonic() + timeout
+            while process.poll() is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"    [WARNING] {job.run_id} did not exit within {timeout} seconds after {name}.")
+                    job.write(f"[CTRL Panel] Training session did not exit within {timeout} seconds after {name}.\n")
+                    break
+                job.stop_status = f"Waiting for the trainer to exit after {name} ({remaining:.0f}s left)"
+                time.sleep(min(0.25, remaining))
+
+        process.wait()
+
+        # Environment workers left behind by the trainer would keep the output pipes open
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except OSError:
+            pass # None left
+
+        job.stop_status = "Terminated"
+        print(f"    [SUCCESS] Training session {job.run_id} terminated.")
+        job.write("\n[CTRL Panel] Training session terminated.\n")
+
+    def _watch(self, job):
+        try:
+            self.stream_output(job.process, job.output, job.consumers)
+        finally:
+            job.returncode = job.process.wait()
+            if job.resources:
+                job.resources.stop()
+            _close_consumers(job)
+
+            with self._lock:
+                job.ended_at = time.time()
+                if job.stop_requested:
+                    job.state = STOPPED
+                elif job.returncode == 0:
+                    job.state = FINISHED
+                else:
+                    job.state = FAILED
+                self._slots.pop(job.slot, None)
+
+            if job.stop_requested:
+                EVENTS.since(job.process, "stop_requested", "run.shutdown", stop_status=job.stop_status)
+            EVENTS.since(job.process, "started", "run.ended", state=job.state, returncode=job.returncode)
+            EVENTS.untrack(job.process)
+
+            print(f"[ALERT] Run {job.run_id} {job.state} (exit code {job.returncode})")
+            self._schedule()
@@ -0,0 +1,142 @@
+import re
+import threading
+import numpy as np
+
+# e.g. "[INFO] 3DBall. Step: 12000. Time Elapsed: 19.811 s. Mean Reward: 1.160. Std of Reward: 0.673. Training."
+SUMMARY_PATTERN = re.compile(
+    r"(?:\[INFO\] )?(?P<behavior>\S.*?)\. Step: (?P<step>\d+)\. Time Elapsed: (?P<elapsed>[\d.]+) s\. "
+    r"Mean Reward: (?P<mean>[^ ]+?)\. Std of Reward: (?P<std>[^ ]+?)\."
+)
+
+def parse_summary(line):
+    """Parses a periodic summary line printed by mlagents-learn.
+
+    Returns:
+        tuple: (behavior, step, elapsed, mean_reward, std_reward), or None if the line is not a
+        summary line with a reward.
+    """
+    if "Mean Reward" not in line: # Cheap check first, almost every line fails it
+        return None
+
+    match = SUMMARY_PATTERN.search(line)
+    if not match:
+        return None
+
+    try:
+        return (
+            match["behavior"],
+            int(match["step"]),
+            float(match["elapsed"]),
+            float(match["mean"]),
+            float(match["std"]),
+        )
+    except ValueError:
+        return None
+
+class MetricSeries:
+    """Growable NumPy arrays of one behavior's summary points.
+
+    Columns are step, elapsed time, mean reward and std of reward. Capacity doubles when full,
+    so appending is amortised O(1) and the arrays stay compact.
+    """
+
+    COLUMNS = ("step", "elapsed", "mean", "std")
+
+    def __init__(self, capacity=256):
+        self._data = np.empty((capacity, len(self.COLUMNS)), dtype=np.float64)
+        self.size = 0
+
+    def append(self, step, elapsed, mean, std):
+        if self.size == len(self._data):
+            grown = np.empty((len(self._data) * 2, len(self.COLUMNS)), dtype=np.float64)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size] = (step, elapsed, mean, std)
+        self.size += 1
+
+    def column(self, name, start=0):
+        """Returns a view of one column, from row `start` to the latest point."""
+        return self._data[start:self.size, self.COLUMNS.index(name)]
+
+class TrainingMetrics:
+    """Per-behavior summary series parsed from a run's output.
+
+    It is a line consumer for stream_process_output: `feed` runs on the reader thread, while
+    the GUI reads the series under `lock`. `version` increases with every new point, so readers
+    can tell cheaply whether anything changed.
+    """
+
+    def __init__(self):
+        self.series = {}
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def feed(self, lines):
+        """Parses a batch of reader.OutputLine and appends any summary points found."""
+        for line in lines:
+            parsed = parse_summary(line.text)
+            if parsed is None:
+                continue
+
+            behavior, step, elapsed, mean, std = parsed
+            with self.lock:
+                series = self.series.get(behavior)
+                if series is None:
+                    series = self.series[behavior] = MetricSeries()
+                series.append(step, elapsed, mean, std)
+                self.version += 1
+
+    def steps_per_second(self):
+        """Returns the steps trained per second between the first and the latest summary, summed
+        over behaviors, or None until there are two summaries."""
+        total = 0.0
+        with self.lock:
+            for series in self.series.values():
+                steps = series.column("step")
+                elapsed = series.column("elapsed")
+                if len(steps) >= 2 and elapsed[-1] > elapsed[0]:
+                    total += (steps[-1] - steps[0]) / (elapsed[-1] - elapsed[0])
+        return total or None
+
+    def snapshot(self, start_at=None, column="mean"):
+        """Returns {behavior: (steps, values)} copies, from the given start index per behavior."""
+        with self.lock:
+            result = {}
+            for behavior, series in self.series.items():
+                start = (start_at or {}).get(behavior, 0)
+                result[behavior] = (series.column("step", start).copy(), series.column(column, start).copy())
+            return result
+
+def downsample(x, y, max_points):
+    """Reduces a series to about `max_points` points for display, keeping its extremes.
+
+    The series is cut into equal buckets and each bucket keeps its minimum and maximum, so
+    spikes stay visible however far the series is reduced.
+
+    Returns:
+        tuple: The reduced x and y arrays.
+    """
+    count = len(x)
+    if count <= max_points:
+        return x, y
+
+    buckets = max(max_points // 2, 1)
+    size = count // buckets
+    used = buckets * size
+
+    y_buckets = y[:used].reshape(buckets, size)
+    x_buckets = x[:used].reshape(buckets, size)
+    rows = np.arange(buckets)
+    low = np.argmin(np.where(np.isnan(y_buckets), np.inf, y_buckets), axis=1)
+    high = np.argmax(np.where(np.isnan(y_buckets), -np.inf, y_buckets), axis=1)
+
+    # Keep each bucket's pair in step order
+    first = np.minimum(low, high)
+    second = np.maximum(low, high)
+    x_out = np.column_stack((x_buckets[rows, first], x_buckets[rows, second])).ravel()
+    y_out = np.column_stack((y_buckets[rows, first], y_buckets[rows, second])).ravel()
+
+    if used < count: # The remainder that did not fill a bucket
+        x_out = np.concatenate((x_out, x[used:]))
+        y_out = np.concatenate((y_out, y[used:]))
+    return x_out, y_out
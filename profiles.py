@@ -0,0 +1,210 @@
+import os
+import re
+import json
+import time
+import socket
+import threading
+
+from jobs import QUEUED, BASE_PORT, PORT_STRIDE
+from engine import training_command, results_exist
+
+# Saved in the working directory, so each project keeps its own profiles
+PROFILES_FILE = os.path.join("config", "launch_profiles.json")
+CALIBRATION_DIR = os.path.join("config", "calibration")
+
+EDITOR = "Unity Editor" # Not a profile, the run waits for play to be pressed in the editor
+
+DEFAULT_PROFILE = {
+    "env_path": "", # The built environment binary, passed as --env
+    "num_envs": 1,
+    "no_graphics": True,
+    "time_scale": 20.0,
+    "quality_level": 0,
+    "base_port": BASE_PORT, # First port of the slot ranges, see jobs.JobManager
+    "torch_device": "cpu", # Empty lets mlagents-learn choose
+    "calibration": {}, # Host name -> {num_envs: steps per second}
+}
+
+# Calibration defaults
+CALIBRATION_NUM_ENVS = (1, 2, 4, 8)
+CALIBRATION_SECONDS = 90 # Per --num-envs value, including the environment's startup
+CALIBRATION_SUMMARY_FREQ = 2000 # So a short trial prints enough summaries to measure
+
+def load_profiles(working_dir):
+    """Returns the project's launch profiles as {name: profile}, each with every default key."""
+    try:
+        with open(os.path.join(working_dir, PROFILES_FILE), "r") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {name: {**new_profile(), **profile} for name, profile in saved.items()}
+
+def new_profile():
+    """Returns a profile with the default values."""
+    return {**DEFAULT_PROFILE, "calibration": {}}
+
+def save_profiles(working_dir, profiles):
+    path = os.path.join(working_dir, PROFILES_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(profiles, f, indent=4)
+
+def validate_profile(profile):
+    """Checks a profile's values before they are saved or used.
+
+    Raises:
+        ValueError: Describing the first invalid value.
+    """
+    if not profile["env_path"] or not os.path.exists(profile["env_path"]):
+        raise ValueError(f"The environment binary {profile['env_path']!r} does not exist.")
+    if not 1 <= int(profile["num_envs"]) <= PORT_STRIDE:
+        raise ValueError(f"--num-envs must be between 1 and {PORT_STRIDE}, the ports reserved for each run.")
+    if float(profile["time_scale"]) <= 0:
+        raise ValueError("--time-scale must be positive.")
+    if not 0 <= int(profile["quality_level"]) <= 5:
+        raise ValueError("--quality-level must be between 0 and 5.")
+    if not 1024 <= int(profile["base_port"]) <= 65535 - PORT_STRIDE:
+        raise ValueError("--base-port must be between 1024 and 65435.")
+
+def profile_args(profile, num_envs=None):
+    """Returns the mlagents-learn arguments of a profile, --base-port is added per run by the JobManager."""
+    args = [
+        f"--env={profile['env_path']}",
+        f"--num-envs={num_envs or profile['num_envs']}",
+        f"--time-scale={profile['time_scale']:g}",
+        f"--quality-level={profile['quality_level']}",
+    ]
+    if profile["no_graphics"]:
+        args.append("--no-graphics")
+    if profile["torch_device"]:
+        args.append(f"--torch-device={profile['torch_device']}")
+    return args
+
+def launch_args(working_dir, name):
+    """Returns the mlagents-learn arguments and the first port of a saved profile.
+
+    Raises:
+        KeyError: If the project has no profile with that name.
+        ValueError: If the profile is not valid, see validate_profile.
+    """
+    profile = load_profiles(working_dir)[name]
+    validate_profile(profile)
+    return profile_args(profile), int(profile["base_port"])
+
+def best_num_envs(profile, host=None):
+    """Returns (num_envs, steps per second) of the fastest calibrated value on a host, or None."""
+    results = profile["calibration"].get(host or socket.gethostname())
+    if not results:
+        return None
+    num_envs, rate = max(results.items(), key=lambda item: item[1] or 0)
+    return int(num_envs), rate
+
+class Calibration:
+    """Measures the training throughput of a profile for several --num-envs values.
+
+    Each value gets a short run of its own, one after another so they do not compete for the
+    machine. Throughput is taken from the trainer's summaries, between the first and the last
+    one, so the environment's startup is not counted. The config is copied with a small
+    summary_freq, so a short trial prints several summaries. Results are stored in the profile
+    under this machine's host name.
+
+    Args:
+        name (str): The profile's name.
+        profile (dict): The profile, updated with the results.
+        env (str): The Conda environment to train in.
+        config_file (str): The trainer config to calibrate with.
+        working_dir (str): The ML-Agents working directory.
+        queue (callable): Called with (run_id, argv, environ, first_port) to queue a run, returns its job.
+        stop (callable): Called with a job to stop it gracefully.
+        values (list): The --num-envs values to try.
+        seconds (float): How long each value trains.
+    """
+
+    def __init__(self, name, profile, env, config_file, working_dir, queue, stop,
+                 values=CALIBRATION_NUM_ENVS, seconds=CALIBRATION_SECONDS):
+        self.name = name
+        self.profile = profile
+        self.env = env
+        self.config_file = config_file
+        self.working_dir = working_dir
+        self.queue = queue
+        self.stop = stop
+        self.values = list(values)
+        self.seconds = seconds
+
+        self.results = {} # num_envs -> steps per second, None if it could not be measured
+        self.status = ""
+        self.job = None # The trial running now
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.job is not None and self.job.active:
+            self.stop(self.job)
+
+    def _config(self):
+        """Writes the calibration copy of the config, returns its path."""
+        import yaml # Deferred, startup does not need it
+        from sweeps import derive_config
+
+        with open(self.config_file, "r") as f:
+            config = derive_config(yaml.safe_load(f), {"summary_freq": CALIBRATION_SUMMARY_FREQ})
+
+        path = os.path.join(self.working_dir, CALIBRATION_DIR, f"{_safe_name(self.name)}.yaml")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            yaml.safe_dump(config, f, sort_keys=False)
+        return path
+
+    def _run(self):
+        try:
+            config = self._config()
+            for num_envs in self.values:
+                if self.cancelled.is_set():
+                    break
+                self.results[num_envs] = self._trial(config, num_envs)
+
+            host = socket.gethostname()
+            measured = {str(num_envs): rate for num_envs, rate in self.results.items() if rate}
+            self.profile["calibration"][host] = {**self.profile["calibration"].get(host, {}), **measured}
+            self.status = "Cancelled" if self.cancelled.is_set() else "Done"
+        except Exception as e:
+            print(f"[ERROR] Calibration of {self.name} failed: {e}")
+            self.status = f"Failed: {e}"
+        finally:
+            self.done.set()
+
+    def _trial(self, config, num_envs):
+        run_id = f"calibrate_{_safe_name(self.name)}_{num_envs}"
+        force = "--force" if results_exist(self.working_dir, run_id) else ""
+        argv, environ = training_command(self.env, config, run_id, force, profile_args(self.profile, num_envs))
+        self.job = job = self.queue(run_id, argv, environ, self.profile["base_port"])
+
+        while job.state == QUEUED and not self.cancelled.is_set():
+            self.status = f"--num-envs={num_envs}: waiting for a free slot"
+            time.sleep(0.5)
+
+        deadline = time.monotonic() + self.seconds
+        while job.active and time.monotonic() < deadline and not self.cancelled.is_set():
+            rate = job.metrics.steps_per_second()
+            measured = f", {rate:,.0f} steps/s" if rate else ""
+            self.status = f"--num-envs={num_envs}: {deadline - time.monotonic():.0f}s left{measured}"
+            time.sleep(0.5)
+
+        if job.active:
+            self.stop(job)
+            while job.active:
+                self.status = f"--num-envs={num_envs}: stopping"
+                time.sleep(0.5)
+
+        rate = job.metrics.steps_per_second()
+        print(f"[INFO] Calibration of {self.name}: --num-envs={num_envs} gave {rate or 0:,.0f} steps/s")
+        return rate
+
+def _safe_name(name):
+    return re.sub(r"[^\w.-]+", "_", name)
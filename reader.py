@@ -0,0 +1,82 @@
+import os
+import time
+import selectors
+from collections import namedtuple
+
+# Bytes requested per read, and the longest line held back while waiting for its newline
+READ_CHUNK_SIZE = 64 * 1024
+MAX_PENDING_BYTES = 1024 * 1024
+
+OutputLine = namedtuple("OutputLine", ["stream", "timestamp", "text"])
+OutputLine.__doc__ = """A single line of process output.
+
+    stream (str): "stdout" or "stderr".
+    timestamp (float): Wall-clock time the line was read, as returned by time.time().
+    text (str): The decoded line, including its trailing newline if it had one.
+"""
+
+def read_process_output(process, on_lines, chunk_size=READ_CHUNK_SIZE):
+    """Reads stdout and stderr of a process until both are closed.
+
+    Both pipes are switched to non-blocking mode and drained in large chunks as soon as
+    either has data, so a partial line on one stream never stalls the other and the process
+    never blocks on a full pipe. Each chunk is decoded once and split into lines, and every
+    batch of complete lines is handed to `on_lines`. The callback runs on the reading thread
+    and must not block.
+
+    Args:
+        process (subprocess.Popen): A process started with binary stdout and stderr pipes.
+        on_lines (callable): Called with a list of OutputLine for every chunk read.
+        chunk_size (int): The maximum number of bytes read from a pipe at once.
+    """
+    selector = selectors.DefaultSelector()
+    pending = {}
+
+    for name, stream in (("stdout", process.stdout), ("stderr", process.stderr)):
+        if stream is None:
+            continue
+        fd = stream.fileno()
+        os.set_blocking(fd, False)
+        selector.register(fd, selectors.EVENT_READ, name)
+        pending[fd] = b""
+
+    try:
+        while selector.get_map():
+            for key, _ in selector.select():
+                try:
+                    chunk = os.read(key.fd, chunk_size)
+                except BlockingIOError:
+                    continue
+
+                timestamp = time.time()
+
+                if not chunk:
+                    # End of stream, hand over whatever is left without a newline
+                    selector.unregister(key.fd)
+                    if pending[key.fd]:
+                        on_lines(_split_lines(key.data, timestamp, pending.pop(key.fd)))
+                    continue
+
+                data = pending[key.fd] + chunk
+                end = data.rfind(b"\n") + 1
+                if not end and len(data) >= MAX_PENDING_BYTES:
+                    end = len(data) # Never hold back an overly long line indefinitely
+
+                pending[key.fd] = data[end:]
+                if end:
+                    on_lines(_split_lines(key.data, timestamp, data[:end]))
+    finally:
+        selector.close()
+
+def _split_lines(stream, timestamp, data):
+    text = data.decode("utf-8", errors="replace")
+    if "\r\n" in text:
+        text = text.replace("\r\n", "\n")
+
+    lines = text.split("\n")
+    last = lines.pop() # Empty when the data ends with a newline
+
+    result = [OutputLine(stream, timestamp, line + "\n") for line in lines]
+    if last:
+        result.append(OutputLine(stream, timestamp, last))
+    return result
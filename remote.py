@@ -0,0 +1,332 @@
+import os
+import sys
+import json
+import time
+import socket
+import threading
+import subprocess
+
+from jobs import QUEUED, RUNNING
+from reader import OutputLine
+from resources import Sample
+
+# Where the daemon listens and where a daemon started by the GUI writes its output. They live
+# here rather than in daemon.py, so the GUI can look for a daemon without importing it
+DAEMON_SOCKET = os.path.join("cache", "daemon.sock")
+DAEMON_LOG = os.path.join("cache", "daemon.log")
+
+CONNECT_TIMEOUT = 5.0 # Seconds to wait for the daemon to answer, or to start
+POLL_INTERVAL = 1.0 # Seconds between refreshes of the daemon's run list
+
+class DaemonError(Exception):
+    """An error reported by the run daemon."""
+
+class DaemonClient:
+    """Talks to a RunDaemon over its Unix socket, one connection per request.
+
+    Args:
+        path (str): The daemon's socket.
+        timeout (float): Seconds to wait for a reply.
+    """
+
+    def __init__(self, path=DAEMON_SOCKET, timeout=CONNECT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+
+    def _connect(self, request, timeout):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(self.path)
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def request(self, cmd, **args):
+        """Sends a request and returns the reply.
+
+        Raises:
+            DaemonError: If the daemon could not carry out the request.
+            OSError: If the daemon cannot be reached.
+        """
+        with self._connect({"cmd": cmd, **args}, self.timeout) as sock, sock.makefile("rb") as replies:
+            raw = replies.readline()
+        if not raw:
+            raise DaemonError("The daemon closed the connection")
+        reply = json.loads(raw)
+        if not reply.get("ok"):
+            raise DaemonError(reply.get("error", "Unknown error"))
+        return reply
+
+    def tail(self, **args):
+        """Yields the output messages of a run, see RunDaemon.cmd_tail, until it is done."""
+        with self._connect({"cmd": "tail", **args}, self.timeout) as sock:
+            sock.settimeout(None) # A followed run can be quiet for a long time
+            with sock.makefile("rb") as replies:
+                for raw in replies:
+                    message = json.loads(raw)
+                    if message.get("ok") is False:
+                        raise DaemonError(message.get("error", "Unknown error"))
+                    if message.get("end"):
+                        return
+                    yield message
+
+def daemon_running(path=DAEMON_SOCKET):
+    """True if a daemon answers on the socket."""
+    try:
+        DaemonClient(path, timeout=1.0).request("ping")
+        return True
+    except (OSError, ValueError, DaemonError):
+        return False
+
+def spawn_daemon(path=DAEMON_SOCKET, timeout=CONNECT_TIMEOUT):
+    """Starts a daemon in its own session, so it outlives the GUI, and waits for it to answer.
+
+    Returns:
+        bool: True once the daemon answers, False if it did not within the timeout.
+    """
+    os.makedirs(os.path.dirname(DAEMON_LOG) or ".", exist_ok=True)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daemon.py")
+    with open(DAEMON_LOG, "ab") as log:
+        subprocess.Popen(
+            [sys.executable, script, "--socket", path, "serve"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True # Not killed with the GUI's process group
+        )
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if daemon_running(path):
+            return True
+        time.sleep(0.1)
+    return False
+
+class RemoteResources:
+    """The latest resource sample of a daemon's run, in the form of resources.ResourceSampler."""
+
+    def __init__(self):
+        self.sample = None
+
+    def latest(self):
+        return self.sample
+
+class RemoteJob:
+    """A run owned by the daemon, with the attributes of jobs.Job that the GUI reads.
+
+    Its state is refreshed by RemoteJobManager. Once `follow` is called, its output is tailed
+    from the first line into `output` and the metrics and search consumers, as if it ran here.
+    Those consumers, and numpy with them, are only created then, so listing the daemon's runs
+    when the GUI attaches stays cheap.
+
+    Args:
+        client (DaemonClient): The daemon's client.
+        run_id (str): The ID for the training session.
+        command (list): The argv that starts the run, without --base-port.
+        cwd (str): The directory the command runs in.
+        environ (dict): Environment variables for the run, None for the daemon's.
+        first_port (int): The first port of the slot ranges, see jobs.Job.
+        info (dict): The daemon's description of the run, for runs it already has.
+    """
+
+    def __init__(self, client, run_id, command=None, cwd=None, environ=None, first_port=None, info=None):
+        self.client = client
+        self.run_id = run_id
+        self.command = command
+        self.cwd = cwd
+        self.environ = environ
+        self.first_port = first_port
+        self.job_id = None
+        self.output = None
+        self.window = None
+        self.resources = RemoteResources()
+        self.log_dir = None # The run log written by the daemon, searched by `search`
+
+        self.state = QUEUED
+        self.base_port = None
+        self.cpus = None
+        self.stop_requested = False
+        self.stop_status = ""
+        self.stop_reason = None
+        self.queued_at = time.time()
+        self.started_at = None
+        self.ended_at = None
+        self.returncode = None
+
+        self._following = None # Set to stop the thread following the output
+        self.metrics = None
+        self.search = None
+        self.consumers = []
+        if info:
+            self.update(info)
+
+    @property
+    def active(self):
+        return self.state in (QUEUED, RUNNING)
+
+    def write(self, data):
+        if self.output:
+            self.output.write(data)
+
+    def reset(self):
+        """Stops following and starts fresh consumers, before the output is shown again."""
+        from metrics import TrainingMetrics
+        from search import OutputIndex
+
+        if self._following:
+            self._following.set()
+            self._following = None
+        self.metrics = TrainingMetrics()
+        self.search = OutputIndex(log=self) # Reads `log_dir` for lines no longer in memory
+        self.consumers = [self.metrics, self.search]
+
+    def update(self, info):
+        """Copies the daemon's description of the run."""
+        self.job_id = info["job_id"]
+        self.cwd = info["cwd"]
+        self.state = info["state"]
+        self.base_port = info["base_port"]
+        self.cpus = set(info["cpus"]) if info["cpus"] else None
+        self.queued_at = info["queued_at"]
+        self.started_at = info["started_at"]
+        self.ended_at = info["ended_at"]
+        self.returncode = info["returncode"]
+        self.stop_requested = info["stop_requested"]
+        self.stop_status = info["stop_status"]
+        self.stop_reason = info.get("stop_reason")
+        self.log_dir = info["log_dir"]
+        self.resources.sample = Sample(**info["resources"]) if info["resources"] else None
+
+    def follow(self):
+        """Starts tailing the run's output from its first line, on a worker thread."""
+        if self._following:
+            return
+        if self.metrics is None:
+            self.reset()
+        self._following = following = threading.Event()
+        threading.Thread(target=self._follow, args=(following,), daemon=True).start()
+
+    def _follow(self, following):
+        try:
+            for message in self.client.tail(job_id=self.job_id, from_start=True, follow=True):
+                if following.is_set():
+                    return # Replaced by a newer follower, see reset
+                if "lines" in message:
+                    lines = [OutputLine(*item) for item in message["lines"]]
+                    self.write("".join(line.text for line in lines))
+                    for consumer in self.consumers:
+                        consumer.feed(lines)
+                elif "message" in message:
+                    self.write(message["message"])
+        except (OSError, ValueError, DaemonError) as e:
+            print(f"[ERROR] Lost the output of {self.run_id}: {e}")
+            self.write(f"\n[CTRL Panel] Lost the connection to the run daemon: {e}\n")
+
+class RemoteJobManager:
+    """Stands in for jobs.JobManager when the GUI is a client of the run daemon.
+
+    Runs are started, stopped and scheduled by the daemon, so they survive the GUI closing.
+    The run list is refreshed on a background thread, which also picks up runs started by
+    another client or from the command line; `follow` shows their output.
+
+    The scheduling settings are kept so they can be saved with the others. The daemon reads the
+    saved settings whenever it starts a run.
+
+    Args:
+        client (DaemonClient): The daemon's client.
+        settings_from (jobs.JobManager): The manager whose settings are carried over.
+    """
+
+    remote = True
+
+    def __init__(self, client, settings_from=None):
+        self.client = client
+        for name in ("max_concurrency", "cpus_per_run", "sigint_timeout", "sigterm_timeout", "sample_interval"):
+            setattr(self, name, getattr(settings_from, name, None))
+
+        self.jobs = {} # Job id -> RemoteJob
+        self._lock = threading.RLock()
+        self._error = None # The last polling error, printed once
+
+        try:
+            self.poll()
+        except (OSError, ValueError, DaemonError) as e:
+            print(f"[ERROR] Could not list the daemon's runs: {e}")
+        threading.Thread(target=self._poll_loop, daemon=True).start()
+
+    def submit(self, job):
+        """Queues a RemoteJob on the daemon and follows its output."""
+        reply = self.client.request(
+            "start", run_id=job.run_id, argv=job.command, environ=job.environ, working_dir=job.cwd, first_port=job.first_port
+        )
+        job.update(reply["job"])
+        with self._lock:
+            self.jobs[job.job_id] = job
+        job.follow()
+        return job
+
+    def _stop(self, job):
+        try:
+            reply = self.client.request("stop", job_id=job.job_id)
+        except (OSError, DaemonError) as e:
+            print(f"[ERROR] The daemon could not stop {job.run_id}: {e}")
+            return None
+        job.update(reply["job"])
+        return reply["action"]
+
+    def cancel(self, job):
+        """Cancels a queued run, returns True if it was still queued."""
+        if job.state != QUEUED:
+            return False
+        return self._stop(job) == "cancelled"
+
+    def stop(self, job):
+        """Starts stopping a running run, returns False if it is not running or already stopping."""
+        if job.state != RUNNING or job.stop_requested:
+            return False
+        return self._stop(job) == "stopping"
+
+    def stop_all(self):
+        try:
+            return self.client.request("stop_all")["count"]
+        except (OSError, DaemonError) as e:
+            print(f"[ERROR] The daemon could not stop its runs: {e}")
+            return 0
+
+    def find_active(self, run_id):
+        with self._lock:
+            for job in self.jobs.values():
+                if job.run_id == run_id and job.active:
+                    return job
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            return [self.jobs[job_id] for job_id in sorted(self.jobs)]
+
+    def running(self):
+        return [job for job in self.snapshot() if job.state == RUNNING]
+
+    def poll(self):
+        """Refreshes every run from the daemon's list."""
+        for info in self.client.request("list")["jobs"]:
+            with self._lock:
+                job = self.jobs.get(info["job_id"])
+                if job is None:
+                    self.jobs[info["job_id"]] = RemoteJob(self.client, info["run_id"], info=info)
+                    continue
+            job.update(info)
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(POLL_INTERVAL)
+            try:
+                self.poll()
+                self._error = None
+            except (OSError, ValueError, DaemonError) as e:
+                if str(e) != self._error:
+                    print(f"[ERROR] Lost contact with the run daemon: {e}")
+                self._error = str(e)
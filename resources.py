@@ -0,0 +1,159 @@
+import os
+import csv
+import time
+import threading
+import collections
+
+SAMPLE_INTERVAL = 1.0 # Seconds between samples
+SAMPLE_CAPACITY = 3600 # Samples kept in memory, older ones are only on disk
+FLUSH_EVERY = 10 # Samples between writes to the CSV file
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+Sample = collections.namedtuple(
+    "Sample", ["time", "cpu_percent", "rss_bytes", "read_bytes", "write_bytes", "threads", "processes"]
+)
+
+def _read_stat(pid):
+    """Returns (pgrp, cpu ticks, threads, rss bytes) from /proc/<pid>/stat, or None."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    # The command name can contain spaces and parentheses, the fields start after the last ")"
+    fields = data[data.rfind(b")") + 2:].split()
+    try:
+        return int(fields[2]), int(fields[11]) + int(fields[12]), int(fields[17]), int(fields[21]) * PAGE_SIZE
+    except (IndexError, ValueError):
+        return None
+
+def _read_io(pid):
+    """Returns (read_bytes, write_bytes) from /proc/<pid>/io, zeros if it cannot be read."""
+    read_bytes = write_bytes = 0
+    try:
+        with open(f"/proc/{pid}/io", "rb") as f:
+            for line in f:
+                if line.startswith(b"read_bytes:"):
+                    read_bytes = int(line.split()[1])
+                elif line.startswith(b"write_bytes:"):
+                    write_bytes = int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return read_bytes, write_bytes
+
+class ResourceSampler:
+    """Samples the aggregate resource use of a process group from /proc on a background thread.
+
+    Every sample sums CPU, resident memory, disk I/O and threads over all processes in the
+    group, which for a training run covers mlagents-learn and its Unity environment workers.
+    The latest samples are kept in a ring buffer for display, and every sample is appended to a
+    CSV file once its folder exists.
+
+    Args:
+        pgid (int): The process group to sample.
+        interval (float): Seconds between samples.
+        capacity (int): Samples kept in memory.
+        path (str): CSV file the series is saved to, None to keep it in memory only.
+    """
+
+    def __init__(self, pgid, interval=SAMPLE_INTERVAL, capacity=SAMPLE_CAPACITY, path=None):
+        self.pgid = pgid
+        self.interval = interval
+        self.path = path
+        self.samples = collections.deque(maxlen=capacity)
+
+        self._ticks = {} # Pid -> CPU ticks at the previous sample
+        self._io = {} # Pid -> (read, write) bytes at the previous sample
+        self._io_total = [0, 0] # I/O of the group so far, including processes that have exited
+        self._last_time = None
+        self._pending = []
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops sampling and writes any samples not yet saved."""
+        self._stopped.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval * 2)
+        self._flush()
+
+    def latest(self):
+        return self.samples[-1] if self.samples else None
+
+    def sample(self):
+        """Takes one sample of the process group and records it."""
+        now = time.monotonic()
+        ticks = {}
+        threads = rss = 0
+        for name in os.listdir("/proc"):
+            if not name.isdigit():
+                continue
+            stat = _read_stat(name)
+            if stat is None or stat[0] != self.pgid:
+                continue
+            ticks[name] = stat[1]
+            threads += stat[2]
+            rss += stat[3]
+
+            read_bytes, write_bytes = _read_io(name)
+            previous = self._io.get(name, (0, 0))
+            self._io_total[0] += max(read_bytes - previous[0], 0)
+            self._io_total[1] += max(write_bytes - previous[1], 0)
+            self._io[name] = (read_bytes, write_bytes)
+
+        cpu_percent = 0.0
+        if self._last_time is not None and now > self._last_time:
+            used = sum(max(value - self._ticks.get(pid, 0), 0) for pid, value in ticks.items())
+            cpu_percent = used / CLOCK_TICKS / (now - self._last_time) * 100
+
+        self._ticks = ticks
+        self._io = {pid: value for pid, value in self._io.items() if pid in ticks}
+        self._last_time = now
+
+        sample = Sample(time.time(), cpu_percent, rss, self._io_total[0], self._io_total[1], threads, len(ticks))
+        self.samples.append(sample)
+        self._pending.append(sample)
+        return sample
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.sample()
+            except OSError as e:
+                print(f"[WARNING] Resource sampling failed: {e}")
+            if len(self._pending) >= FLUSH_EVERY:
+                self._flush()
+            self._stopped.wait(self.interval)
+
+    def _flush(self):
+        if not self.path or not self._pending or not os.path.isdir(os.path.dirname(self.path)):
+            return # The run's folder may not exist until mlagents-learn has started
+
+        pending, self._pending = self._pending, []
+        try:
+            new_file = not os.path.exists(self.path)
+            with open(self.path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(Sample._fields)
+                writer.writerows(pending)
+        except OSError as e:
+            print(f"[WARNING] Could not save resource samples: {e}")
+
+def format_sample(sample):
+    """Returns a one line summary of a sample for display."""
+    if sample is None:
+        return ""
+    return (
+        f"CPU {sample.cpu_percent:.0f}% | RSS {sample.rss_bytes / 2**20:,.0f} MB | "
+        f"Read {sample.read_bytes / 2**20:,.0f} MB | Write {sample.write_bytes / 2**20:,.0f} MB | "
+        f"Threads {sample.threads} | Processes {sample.processes}"
+    )
@@ -0,0 +1,283 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+
+RUN_INDEX_FILE = os.path.join("cache", "run_index.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    results_dir TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    config_hash TEXT,
+    start_time REAL,
+    end_time REAL,
+    last_step INTEGER,
+    final_reward REAL,
+    checkpoints TEXT,
+    fingerprint REAL NOT NULL,
+    resumable INTEGER,
+    PRIMARY KEY (results_dir, run_id)
+);
+CREATE INDEX IF NOT EXISTS runs_start_time ON runs (results_dir, start_time);
+"""
+
+# Columns the browser can sort by
+SORT_COLUMNS = ("run_id", "start_time", "end_time", "last_step", "final_reward")
+
+# What mlagents-learn loads for --resume and --initialize-from, in each behavior's folder
+CHECKPOINT_FILE = "checkpoint.pt"
+
+def read_training_status(run_dir):
+    """Reads a run's run_logs/training_status.json, returns an empty dict if it is missing."""
+    try:
+        with open(os.path.join(run_dir, "run_logs", "training_status.json"), "r") as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return status if isinstance(status, dict) else {}
+
+def _behaviors(status):
+    return [(name, behavior) for name, behavior in status.items() if name != "metadata" and isinstance(behavior, dict)]
+
+def final_reward(working_dir, run_id):
+    """Reads the final mean reward of a run from its training_status.json.
+
+    Returns:
+        float: The reward of the last checkpoint, averaged over behaviors, or None if the run
+        has not saved a checkpoint yet.
+    """
+    return _final_reward(read_training_status(os.path.join(working_dir, "results", run_id)))
+
+def _final_reward(status):
+    rewards = []
+    for _, behavior in _behaviors(status):
+        checkpoint = behavior.get("final_checkpoint") or (behavior.get("checkpoints") or [None])[-1]
+        if checkpoint and checkpoint.get("reward") is not None:
+            rewards.append(checkpoint["reward"])
+    return sum(rewards) / len(rewards) if rewards else None
+
+def find_checkpoints(run_dir):
+    """Finds the checkpoints a run saved, which decide whether it can be resumed or initialised from.
+
+    mlagents-learn saves <behavior>/checkpoint.pt, the state --resume and --initialize-from
+    load, next to <behavior>-<steps>.pt/.onnx snapshots, and exports <behavior>.onnx into the
+    run folder. The step counts are kept in run_logs/training_status.json.
+
+    Returns:
+        dict: `behaviors` as {name: {"checkpoint": path or None, "snapshots": [paths]}}, the
+        exported `models`, the `training_status` path or None, the `last_step` and whether
+        the run is `resumable`, i.e. every behavior has a checkpoint.pt.
+    """
+    behaviors = {}
+    models = []
+    try:
+        entries = sorted(os.scandir(run_dir), key=lambda entry: entry.name)
+    except OSError:
+        entries = []
+    for entry in entries:
+        if entry.is_file() and entry.name.endswith(".onnx"):
+            models.append(entry.path)
+        elif entry.is_dir() and entry.name != "run_logs":
+            try:
+                names = sorted(os.listdir(entry.path))
+            except OSError:
+                continue
+            snapshots = [os.path.join(entry.path, name) for name in names
+                         if name.endswith((".pt", ".onnx")) and name != CHECKPOINT_FILE]
+            checkpoint = os.path.join(entry.path, CHECKPOINT_FILE) if CHECKPOINT_FILE in names else None
+            if checkpoint or snapshots:
+                behaviors[entry.name] = {"checkpoint": checkpoint, "snapshots": snapshots}
+
+    status_path = os.path.join(run_dir, "run_logs", "training_status.json")
+    last_step = None
+    for _, behavior in _behaviors(read_training_status(run_dir)):
+        for checkpoint in behavior.get("checkpoints") or []:
+            if checkpoint.get("steps") is not None:
+                last_step = max(last_step or 0, int(checkpoint["steps"]))
+
+    return {
+        "behaviors": behaviors,
+        "models": models,
+        "training_status": status_path if os.path.exists(status_path) else None,
+        "last_step": last_step,
+        "resumable": bool(behaviors) and all(behavior["checkpoint"] for behavior in behaviors.values()),
+    }
+
+def _fingerprint(run_dir):
+    """Returns the newest mtime of a run folder, its run_logs folder and its training status.
+
+    mlagents-learn rewrites these while a run trains, so an unchanged fingerprint means the
+    indexed row is still current and the run does not need to be read again.
+    """
+    latest = 0.0
+    for path in (run_dir, os.path.join(run_dir, "run_logs"), os.path.join(run_dir, "run_logs", "training_status.json")):
+        try:
+            latest = max(latest, os.stat(path).st_mtime)
+        except OSError:
+            pass
+    return latest
+
+def scan_run(run_dir):
+    """Reads the indexed facts of one run from its results folder.
+
+    Returns:
+        dict: config_hash, start_time, end_time, last_step, final_reward, checkpoints and resumable.
+    """
+    config_hash = None
+    try:
+        with open(os.path.join(run_dir, "configuration.yaml"), "rb") as f:
+            config_hash = hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        pass
+
+    start_time = end_time = None
+    try:
+        with open(os.path.join(run_dir, "run_logs", "timers.json"), "r") as f:
+            metadata = json.load(f).get("metadata", {})
+        start_time = float(metadata["start_time_seconds"]) if "start_time_seconds" in metadata else None
+        end_time = float(metadata["end_time_seconds"]) if "end_time_seconds" in metadata else None
+    except (OSError, ValueError, AttributeError):
+        pass
+    if start_time is None:
+        try:
+            start_time = os.stat(run_dir).st_ctime
+        except OSError:
+            pass
+
+    status = read_training_status(run_dir)
+    last_step = None
+    checkpoints = []
+    for name, behavior in _behaviors(status):
+        for checkpoint in behavior.get("checkpoints") or []:
+            if checkpoint.get("file_path"):
+                checkpoints.append(checkpoint["file_path"])
+            if checkpoint.get("steps") is not None:
+                last_step = max(last_step or 0, int(checkpoint["steps"]))
+
+    return {
+        "config_hash": config_hash,
+        "start_time": start_time,
+        "end_time": end_time,
+        "last_step": last_step,
+        "final_reward": _final_reward(status),
+        "checkpoints": checkpoints,
+        "resumable": find_checkpoints(run_dir)["resumable"],
+    }
+
+class RunIndex:
+    """SQLite-backed index of the runs in a results folder.
+
+    `update` stats each run folder and only reads the runs whose fingerprint changed since
+    the last update, so keeping thousands of runs current costs a few stats per run. Queries
+    are answered from the database without touching the results folder.
+
+    Args:
+        results_dir (str): The {working_dir}/results folder.
+        db_path (str): Where the index is stored, shared by all results folders.
+    """
+
+    def __init__(self, results_dir, db_path=RUN_INDEX_FILE):
+        self.results_dir = os.path.abspath(results_dir)
+        self._lock = threading.Lock()
+        self._updating = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.executescript(SCHEMA)
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(runs)")}
+            if "resumable" not in columns:
+                # An index from before checkpoints were discovered, every run is read again
+                self._db.execute("ALTER TABLE runs ADD COLUMN resumable INTEGER")
+                self._db.execute("UPDATE runs SET fingerprint = -1")
+
+    def update(self):
+        """Brings the index up to date with the results folder.
+
+        Returns:
+            int: The number of runs added, changed or removed.
+        """
+        with self._updating: # One update at a time, others wait and then find nothing to do
+            with self._lock:
+                known = dict(self._db.execute(
+                    "SELECT run_id, fingerprint FROM runs WHERE results_dir = ?", (self.results_dir,)
+                ))
+
+            changed = []
+            present = set()
+            try:
+                entries = list(os.scandir(self.results_dir))
+            except OSError:
+                entries = []
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                present.add(entry.name)
+                fingerprint = _fingerprint(entry.path)
+                if known.get(entry.name) != fingerprint:
+                    row = scan_run(entry.path)
+                    changed.append((
+                        self.results_dir, entry.name, row["config_hash"], row["start_time"], row["end_time"],
+                        row["last_step"], row["final_reward"], json.dumps(row["checkpoints"]), fingerprint,
+                        int(row["resumable"])
+                    ))
+
+            removed = [(self.results_dir, run_id) for run_id in known if run_id not in present]
+
+            with self._lock, self._db:
+                self._db.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", changed)
+                self._db.executemany("DELETE FROM runs WHERE results_dir = ? AND run_id = ?", removed)
+
+        return len(changed) + len(removed)
+
+    def run_ids(self):
+        """Returns the set of indexed Run IDs."""
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT run_id FROM runs WHERE results_dir = ?", (self.results_dir,))}
+
+    def resumable_run_ids(self):
+        """Returns the indexed Run IDs with a checkpoint to resume or initialise from, newest first."""
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT run_id FROM runs WHERE results_dir = ? AND resumable ORDER BY start_time DESC",
+                (self.results_dir,)
+            )]
+
+    def query(self, search="", sort="start_time", descending=True, limit=500):
+        """Returns indexed runs whose Run ID contains `search`, as a list of dicts.
+
+        Args:
+            search (str): Case-insensitive substring of the Run ID.
+            sort (str): One of SORT_COLUMNS.
+            descending (bool): Sort order.
+            limit (int): The most rows returned.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort runs by {sort}")
+
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        order = "DESC" if descending else "ASC"
+        with self._lock:
+            cursor = self._db.execute(
+                f"SELECT run_id, config_hash, start_time, end_time, last_step, final_reward, checkpoints, resumable FROM runs "
+                f"WHERE results_dir = ? AND run_id LIKE ? ESCAPE '\\' "
+                f"ORDER BY {sort} IS NULL, {sort} {order} LIMIT ?",
+                (self.results_dir, pattern, limit)
+            )
+            columns = [description[0] for description in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor]
+
+        for row in rows:
+            row["checkpoints"] = json.loads(row["checkpoints"] or "[]")
+            row["resumable"] = bool(row["resumable"])
+        return rows
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM runs WHERE results_dir = ?", (self.results_dir,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
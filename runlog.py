@@ -0,0 +1,322 @@
+import os
+import time
+import zlib
+import bisect
+import struct
+import threading
+import collections
+
+LOG_DIR_PREFIX = "output-" # One folder per launch, inside results/<run_id>/run_logs/
+FALLBACK_LOG_DIR = os.path.join("cache", "logs") # Used if the run never creates its results folder
+INDEX_FILE = "output.idx"
+
+LOG_MAX_BYTES = 64 * 1024 * 1024 # Segment size before rotating to a new file
+INDEX_EVERY = 1000 # Lines between index entries
+WRITE_INTERVAL = 0.5 # Seconds between batched writes
+
+# Index entry: line number, timestamp, segment number, byte offset of the line in the segment
+INDEX_RECORD = struct.Struct("<QdIQ")
+
+IndexEntry = collections.namedtuple("IndexEntry", ["line", "timestamp", "segment", "offset"])
+
+def log_dir_for(working_dir, run_id):
+    """Returns a new log folder for a launch of a run, results/<run_id>/run_logs/output-<time>."""
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(working_dir, "results", run_id, "run_logs", f"{LOG_DIR_PREFIX}{stamp}")
+
+def find_logs(run_dir):
+    """Returns the log folders of a run, oldest first."""
+    run_logs = os.path.join(run_dir, "run_logs")
+    try:
+        names = sorted(name for name in os.listdir(run_logs) if name.startswith(LOG_DIR_PREFIX))
+    except OSError:
+        return []
+    return [os.path.join(run_logs, name) for name in names if os.path.exists(os.path.join(run_logs, name, INDEX_FILE))]
+
+def segment_name(segment, compress):
+    return f"output.{segment:04d}.log" + (".gz" if compress else "")
+
+class RunLogWriter:
+    """Writes a run's output to rotating log files on a dedicated thread.
+
+    `feed` only queues lines, so a slow disk never holds up the reader. The writer thread
+    writes the queue in batches, rotates to a new segment once one reaches `max_bytes`, and
+    appends an entry to a sidecar index every `INDEX_EVERY` lines, mapping the line number and
+    its timestamp to a segment and byte offset. With `compress`, each indexed block is its own
+    gzip member, so a reader can start decompressing at any index entry.
+
+    mlagents-learn refuses to start if the run's results folder already exists, so nothing is
+    written until it has created the folder. If it never does, the log goes to cache/logs.
+
+    Args:
+        log_dir (str): Folder the log is written to, see log_dir_for.
+        run_id (str): Used to name the fallback folder.
+        max_bytes (int): Segment size before rotating.
+        compress (bool): Gzip the segments.
+    """
+
+    def __init__(self, log_dir, run_id, max_bytes=LOG_MAX_BYTES, compress=False):
+        self.log_dir = log_dir
+        self.run_id = run_id
+        self.max_bytes = max_bytes
+        self.compress = compress
+
+        self.lines = 0 # Lines written so far
+        self._queue = collections.deque()
+        self._closed = threading.Event()
+        self._file = None
+        self._index = None
+        self._segment = -1
+        self._compressor = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def feed(self, lines):
+        """Queues a batch of reader.OutputLine for writing. Never blocks."""
+        self._queue.append(lines)
+
+    def close(self):
+        """Writes everything still queued and closes the files."""
+        self._closed.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            closing = self._closed.wait(WRITE_INTERVAL)
+            try:
+                self._write_pending(closing)
+            except OSError as e:
+                print(f"[ERROR] Failed to write the run log: {e}")
+            if closing:
+                break
+
+        if self._file:
+            self._finish_member()
+            self._file.close()
+            self._index.close()
+
+    def _ready(self, closing):
+        """Opens the first segment once the run's folder exists, or at close, the fallback."""
+        if self._file:
+            return True
+        run_dir = os.path.dirname(os.path.dirname(self.log_dir))
+        if not os.path.isdir(run_dir):
+            if not closing:
+                return False # Keep queueing until mlagents-learn creates its results folder
+            self.log_dir = os.path.join(FALLBACK_LOG_DIR, f"{self.run_id}-{time.strftime('%Y%m%d-%H%M%S')}")
+            print(f"[WARNING] The run folder was never created, writing its log to {self.log_dir}")
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._index = open(os.path.join(self.log_dir, INDEX_FILE), "ab")
+        self._rotate()
+        return True
+
+    def _write_pending(self, closing):
+        if not self._queue or not self._ready(closing):
+            return
+
+        chunk = []
+        while self._queue:
+            for line in self._queue.popleft():
+                if self.lines % INDEX_EVERY == 0 or self._file.tell() >= self.max_bytes:
+                    self._write(chunk)
+                    chunk = []
+                    self._checkpoint(line.timestamp)
+
+                text = line.text if line.text.endswith("\n") else line.text + "\n"
+                chunk.append(text.encode("utf-8"))
+                self.lines += 1
+
+        self._write(chunk)
+        if self._compressor:
+            self._file.write(self._compressor.flush(zlib.Z_SYNC_FLUSH)) # Readable up to here
+        self._file.flush()
+        self._index.flush()
+
+    def _write(self, chunk):
+        if not chunk:
+            return
+        data = b"".join(chunk)
+        self._file.write(self._compressor.compress(data) if self._compressor else data)
+
+    def _checkpoint(self, timestamp):
+        """Rotates if the segment is full, then indexes the next line at a member boundary."""
+        self._finish_member()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+        if self.compress:
+            self._compressor = zlib.compressobj(wbits=31) # A new gzip member
+        self._index.write(INDEX_RECORD.pack(self.lines, timestamp, self._segment, self._file.tell()))
+
+    def _finish_member(self):
+        if self._compressor:
+            self._file.write(self._compressor.flush())
+            self._compressor = None
+
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+        self._segment += 1
+        self._file = open(os.path.join(self.log_dir, segment_name(self._segment, self.compress)), "ab")
+
+class RunLogReader:
+    """Random access into a log written by RunLogWriter, without reading it from the start.
+
+    Only the index is loaded. Jumping to a line or a time finds the nearest index entry with a
+    binary search, seeks to its offset and reads forward at most INDEX_EVERY lines.
+
+    Args:
+        log_dir (str): The folder holding the log segments and their index.
+    """
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.entries = []
+        self.reload()
+
+    def reload(self):
+        """Reloads the index, to pick up lines written since it was opened."""
+        with open(os.path.join(self.log_dir, INDEX_FILE), "rb") as f:
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_RECORD.size
+        self.entries = [IndexEntry(*fields) for fields in INDEX_RECORD.iter_unpack(data[:usable])]
+        self._lines = [entry.line for entry in self.entries]
+        self._times = [entry.timestamp for entry in self.entries]
+
+    @property
+    def indexed_lines(self):
+        """The number of the last indexed line, the log holds at least this many lines."""
+        return self._lines[-1] if self._lines else 0
+
+    def line_at_time(self, timestamp):
+        """Returns the number of the first indexed line at or after a timestamp (a lower bound)."""
+        position = max(bisect.bisect_right(self._times, timestamp) - 1, 0)
+        return self.entries[position].line if self.entries else 0
+
+    def read_lines(self, start, count):
+        """Returns up to `count` lines starting at line number `start`."""
+        if not self.entries:
+            return []
+
+        position = max(bisect.bisect_right(self._lines, start) - 1, 0)
+        skip = start - self.entries[position].line
+        lines = []
+
+        while position is not None:
+            entry = self.entries[position]
+            for line in self._read_from(entry):
+                if skip:
+                    skip -= 1
+                    continue
+                lines.append(line)
+                if len(lines) >= count:
+                    return lines
+
+            # Reached the end of the segment, carry on from the start of the next one
+            position = next(
+                (index for index in range(position + 1, len(self.entries)) if self.entries[index].segment > entry.segment),
+                None
+            )
+
+        return lines
+
+    def read_chunk(self, position):
+        """Returns the raw bytes of the lines from one index entry up to the next.
+
+        A search can scan these directly, without splitting or decoding each line.
+        """
+        entry = self.entries[position]
+        following = self.entries[position + 1] if position + 1 < len(self.entries) else None
+        end = following.offset if following and following.segment == entry.segment else None
+
+        plain = os.path.join(self.log_dir, segment_name(entry.segment, False))
+        if os.path.exists(plain):
+            with open(plain, "rb") as f:
+                f.seek(entry.offset)
+                return f.read(-1 if end is None else end - entry.offset)
+
+        with open(os.path.join(self.log_dir, segment_name(entry.segment, True)), "rb") as f:
+            f.seek(entry.offset)
+            data = f.read(-1 if end is None else end - entry.offset)
+        # One gzip member per entry, possibly still being written
+        return zlib.decompressobj(wbits=31).decompress(data)
+
+    def _read_from(self, entry):
+        """Yields decoded lines from an index entry to the end of its segment."""
+        plain = os.path.join(self.log_dir, segment_name(entry.segment, False))
+        if os.path.exists(plain):
+            with open(plain, "rb") as f:
+                f.seek(entry.offset)
+                for line in f:
+                    yield line.decode("utf-8", errors="replace")
+            return
+
+        with open(os.path.join(self.log_dir, segment_name(entry.segment, True)), "rb") as f:
+            f.seek(entry.offset)
+            decompressor = zlib.decompressobj(wbits=31)
+            pending = b""
+            while True:
+                data = f.read(256 * 1024)
+                if not data:
+                    break
+                while data:
+                    pending += decompressor.decompress(data)
+                    data = decompressor.unused_data
+                    if decompressor.eof:
+                        decompressor = zlib.decompressobj(wbits=31) # Next gzip member
+                    else:
+                        data = b""
+                *complete, pending = pending.split(b"\n")
+                for line in complete:
+                    yield line.decode("utf-8", errors="replace") + "\n"
+            if pending:
+                yield pending.decode("utf-8", errors="replace")
+
+def compress_log(log_dir):
+    """Gzips the plain segments of a finished log in place, so RunLogReader keeps random access.
+
+    Each index entry starts a new gzip member, as in a log written with `compress`, and the
+    index is rewritten with the compressed offsets. The new files are complete before they
+    replace the old ones. Must not be used on a log that is still being written.
+
+    Returns:
+        int: The number of bytes saved.
+    """
+    with open(os.path.join(log_dir, INDEX_FILE), "rb") as f:
+        data = f.read()
+    entries = [IndexEntry(*fields) for fields in INDEX_RECORD.iter_unpack(data[:len(data) - len(data) % INDEX_RECORD.size])]
+
+    offsets = {} # (segment, plain offset) -> compressed offset
+    written = [] # (plain path, compressed path)
+    saved = 0
+    for segment in sorted({entry.segment for entry in entries}):
+        plain = os.path.join(log_dir, segment_name(segment, False))
+        if not os.path.exists(plain):
+            continue # Compressed already
+
+        starts = sorted({entry.offset for entry in entries if entry.segment == segment} | {0})
+        partial = os.path.join(log_dir, segment_name(segment, True) + ".partial")
+        with open(plain, "rb") as src, open(partial, "wb") as dst:
+            for start, end in zip(starts, starts[1:] + [None]):
+                src.seek(start)
+                offsets[segment, start] = dst.tell()
+                compressor = zlib.compressobj(wbits=31)
+                dst.write(compressor.compress(src.read(-1 if end is None else end - start)))
+                dst.write(compressor.flush())
+            saved += src.tell() - dst.tell()
+        written.append((plain, partial))
+
+    if not written:
+        return 0
+
+    partial_index = os.path.join(log_dir, INDEX_FILE + ".partial")
+    with open(partial_index, "wb") as f:
+        for entry in entries:
+            f.write(INDEX_RECORD.pack(entry.line, entry.timestamp, entry.segment, offsets.get((entry.segment, entry.offset), entry.offset)))
+
+    for plain, partial in written:
+        os.replace(partial, partial[:-len(".partial")])
+    os.replace(partial_index, os.path.join(log_dir, INDEX_FILE))
+    for plain, _ in written:
+        os.remove(plain)
+    return saved
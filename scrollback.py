@@ -0,0 +1,200 @@
+import tkinter as tk
+import tempfile
+import threading
+from array import array
+
+# Number of lines kept in the output widget, and how many are trimmed or paged in at once
+SCROLLBACK_LINES = 5000
+PAGE_LINES = 1000
+
+class ScrollbackHistory:
+    """Append-only on-disk copy of everything written to an output widget.
+
+    Only the byte offset of every `page_lines`-th line is kept in memory, so the index stays
+    tiny however long the run is, and any line range can be read back with one seek.
+
+    Args:
+        page_lines (int): Spacing of the line offset index.
+    """
+
+    def __init__(self, page_lines=PAGE_LINES):
+        self.page_lines = page_lines
+        self.lines = 0 # Number of complete lines written
+
+        self._file = tempfile.TemporaryFile()
+        self._size = 0
+        self._offsets = array("Q", [0]) # Offset of line 0, page_lines, 2 * page_lines...
+        self._lock = threading.Lock()
+
+    def append(self, data):
+        """Appends text to the history and extends the line index."""
+        encoded = data.encode("utf-8")
+        with self._lock:
+            self._file.seek(0, 2)
+            self._file.write(encoded)
+
+            start = 0
+            while True:
+                newline = encoded.find(b"\n", start)
+                if newline == -1:
+                    break
+                self.lines += 1
+                if self.lines % self.page_lines == 0:
+                    self._offsets.append(self._size + newline + 1)
+                start = newline + 1
+
+            self._size += len(encoded)
+
+    def read_lines(self, start, stop=None):
+        """Returns lines `start` up to `stop`, or up to the end of the history if `stop` is None.
+
+        Reading to the end includes the trailing partial line, if there is one.
+        """
+        with self._lock:
+            self._file.flush()
+            page = start // self.page_lines
+            self._file.seek(self._offsets[page])
+
+            for _ in range(start - page * self.page_lines):
+                self._file.readline()
+
+            if stop is None:
+                data = self._file.read()
+            else:
+                data = b"".join(self._file.readline() for _ in range(stop - start))
+
+        return data.decode("utf-8", errors="replace")
+
+    def close(self):
+        self._file.close()
+
+class ScrollbackView:
+    """Keeps a bounded window of the history in a Tk text widget.
+
+    While the window is attached to the end of the history, new output is appended and the
+    oldest lines are trimmed in bulk. Scrolling to the top pages older lines back in from
+    disk; if the user is reading older output when the window is full, the window detaches
+    and new output only goes to disk until they scroll back down to the end.
+
+    Args:
+        text_widget (scrolledtext.ScrolledText): The widget the window is shown in.
+        max_lines (int): Number of lines kept in the widget. Trimming happens once the window
+            grows a quarter beyond this, so it is done in bulk rather than per line.
+        page_lines (int): Number of lines paged in from disk per scroll past either edge.
+    """
+
+    def __init__(self, text_widget, max_lines=SCROLLBACK_LINES, page_lines=PAGE_LINES):
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.page_lines = min(page_lines, max_lines)
+        self.history = ScrollbackHistory(page_lines)
+
+        # The widget holds history lines [first, last), plus the partial tail when attached
+        self.first = 0
+        self.last = 0
+        self.attached = True
+        self._paging = False
+
+        text_widget.configure(yscrollcommand=self._on_yscroll)
+
+    def append(self, data):
+        """Records new output and shows it if the window is attached to the end.
+
+        Returns:
+            bool: True if the widget should be scrolled to the end.
+        """
+        self.history.append(data)
+        return self.show(data)
+
+    def show(self, data, lines=None):
+        """Shows output already appended to the history, if the window is attached to the end.
+
+        Args:
+            data (str): The output.
+            lines (int): `history.lines` right after `data` was appended, read under the lock the
+                append was made under. Defaults to the current count, which is only right if
+                nothing else appends to the history.
+
+        Returns:
+            bool: True if the widget should be scrolled to the end.
+        """
+        following = self.text_widget.yview()[1] >= 1.0
+        if not self.attached:
+            return False
+
+        if not following and self.last - self.first >= self.max_lines:
+            # The user is reading older output and the window is full, stop growing it
+            self._detach()
+            return False
+
+        self.text_widget.insert(tk.END, data)
+        self.last = self.history.lines if lines is None else lines
+        if self.last - self.first > self.max_lines + self.max_lines // 4:
+            self._trim_top(self.last - self.first - self.max_lines)
+
+        return following
+
+    def skip(self):
+        """Detaches the window after output went to the history without being shown.
+
+        The widget then pages the skipped lines in from disk as the user scrolls down to them.
+        """
+        if self.attached:
+            self._detach()
+
+    def close(self):
+        self.history.close()
+
+    def _on_yscroll(self, first, last):
+        self.text_widget.vbar.set(first, last)
+
+        if self._paging:
+            return
+        if float(first) <= 0.0 and self.first > 0:
+            self._paging = True
+            self.text_widget.after_idle(self._page_up)
+        elif float(last) >= 1.0 and not self.attached:
+            self._paging = True
+            self.text_widget.after_idle(self._page_down)
+
+    def _page_up(self):
+        count = min(self.page_lines, self.first)
+        self.text_widget.insert("1.0", self.history.read_lines(self.first - count, self.first))
+        self.first -= count
+        self.text_widget.yview(f"{count + 1}.0") # Keep the same line at the top of the view
+
+        excess = self.last - self.first - self.max_lines
+        if excess > 0:
+            self._trim_bottom(excess)
+        self._paging = False
+
+    def _page_down(self):
+        lines = self.history.lines # Before reading, output appended meanwhile is dropped by the next skip
+        count = min(self.page_lines, lines - self.last)
+        if self.last + count >= lines:
+            # Reached the end, bring in the partial tail and follow new output again
+            self.text_widget.insert(tk.END, self.history.read_lines(self.last))
+            self.last = lines
+            self.attached = True
+        else:
+            self.text_widget.insert(tk.END, self.history.read_lines(self.last, self.last + count))
+            self.last += count
+
+        excess = self.last - self.first - self.max_lines
+        if excess > 0:
+            self._trim_top(excess)
+        self._paging = False
+
+    def _detach(self):
+        # Drop the partial tail, so the widget only holds complete lines while detached
+        self.text_widget.delete(f"{self.last - self.first + 1}.0", tk.END)
+        self.attached = False
+
+    def _trim_top(self, count):
+        self.text_widget.delete("1.0", f"{count + 1}.0")
+        self.first += count
+
+    def _trim_bottom(self, count):
+        self.last -= count
+        self.text_widget.delete(f"{self.last - self.first + 1}.0", tk.END)
+        self.attached = False
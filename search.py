@@ -0,0 +1,358 @@
+import re
+import bisect
+import threading
+from array import array
+
+import numpy as np
+
+from runlog import RunLogReader
+
+BLOCK_LINES = 4096 # Lines per in-memory block
+MEMORY_LINES = 500_000 # Lines whose text is kept in memory, older ones are read from the run log
+MAX_RESULTS = 1000 # Matches returned by a search
+
+# Severity codes, a filter on one also matches the ones above it
+NO_SEVERITY, INFO, WARNING, ERROR = 0, 1, 2, 3
+SEVERITIES = {"INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+
+# "[INFO] Hallway. Step: 10000. Time Elapsed: ..." gives the severity and the behavior
+LEVEL_PATTERN = re.compile(r"\[(DEBUG|INFO|WARNING|ERROR|CRITICAL)\]\s*(?:(\S+?)\. Step:)?")
+ERROR_PATTERN = re.compile(r"Traceback \(most recent call last\)|\b\w*(?:Error|Exception)\b")
+
+def classify(text, previous=NO_SEVERITY):
+    """Returns (severity code, behavior name or None) of an output line.
+
+    Indented lines without a level of their own, such as the frames of a traceback, take the
+    severity of the line before them.
+    """
+    match = LEVEL_PATTERN.match(text)
+    if match:
+        level = match.group(1)
+        if level in ("ERROR", "CRITICAL"):
+            return ERROR, match.group(2)
+        return SEVERITIES.get(level, NO_SEVERITY), match.group(2)
+    if ERROR_PATTERN.search(text):
+        return ERROR, None
+    if text[:1].isspace() and text.strip():
+        return previous, None
+    return NO_SEVERITY, None
+
+class Block:
+    """Consecutive lines joined into one string, so a regex scans them in a single pass.
+
+    Args:
+        first (int): The line number of the first line.
+        lines (list): The lines, each ending with a newline.
+    """
+
+    __slots__ = ("first", "text", "offsets")
+
+    def __init__(self, first, lines):
+        self.first = first
+        self.text = "".join(lines)
+        self.offsets = array("Q", [0])
+        for line in lines:
+            self.offsets.append(self.offsets[-1] + len(line))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def line(self, index):
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+class Query:
+    """A search over output lines, compiled once and run against many blocks.
+
+    Args:
+        pattern (str): Text to find, empty to match every line that passes the filters.
+        regex (bool): Treat the pattern as a regular expression.
+        match_case (bool): Case-sensitive matching.
+        severity (str): Only lines at or above this level, one of SEVERITIES, or None.
+        behavior (str): Only lines about this behavior, or None.
+
+    Raises:
+        re.error: If the pattern is not a valid regular expression.
+    """
+
+    def __init__(self, pattern="", regex=False, match_case=False, severity=None, behavior=None):
+        self.pattern = pattern
+        self.severity = SEVERITIES[severity] if severity else NO_SEVERITY
+        self.behavior = behavior
+        self.match_case = match_case
+        self.regex = self.regex_bytes = None
+        self.needle = self.needle_bytes = None
+        if pattern:
+            source = pattern if regex else re.escape(pattern)
+            flags = re.MULTILINE | (0 if match_case else re.IGNORECASE)
+            self.regex = re.compile(source, flags)
+            self.regex_bytes = re.compile(source.encode("utf-8"), flags) # For the run log on disk
+        if pattern and not regex:
+            # Plain text is found with str.find, several times faster than an IGNORECASE regex
+            self.needle = pattern if match_case else pattern.lower()
+            self.needle_bytes = pattern.encode("utf-8") if match_case else pattern.encode("utf-8").lower()
+
+    def starts(self, data):
+        """Yields the offset of every match in a str or bytes, in order."""
+        regex = self.regex if isinstance(data, str) else self.regex_bytes
+        if self.needle is not None:
+            needle = self.needle if isinstance(data, str) else self.needle_bytes
+            if not self.match_case:
+                lowered = data.lower()
+                if len(lowered) != len(data): # A few characters change length when lowered
+                    yield from (found.start() for found in regex.finditer(data))
+                    return
+                data = lowered
+            position = data.find(needle)
+            while position >= 0:
+                yield position
+                position = data.find(needle, position + 1)
+            return
+        yield from (found.start() for found in regex.finditer(data))
+
+    def mask(self, severities, behaviors, behavior_ids):
+        """Returns a boolean array of the lines that pass the filters, None if there are none."""
+        mask = None
+        if self.severity:
+            mask = severities >= self.severity
+        if self.behavior:
+            matches = behaviors == behavior_ids.get(self.behavior, -1)
+            mask = matches if mask is None else mask & matches
+        return mask
+
+class OutputIndex:
+    """Incrementally built search index over a run's output, fed as a job consumer.
+
+    The severity and behavior of every line are classified as it arrives and kept in compact
+    arrays, three bytes per line, so filters are answered with numpy over the whole run. The
+    text of the newest `memory_lines` lines is kept in Blocks; older text is read from the run
+    log on disk, skipping every stretch between index entries that the filters rule out.
+    Searches copy what they need under a short lock and run on the caller's thread, so a
+    search never holds up the stream.
+
+    Args:
+        log (runlog.RunLogWriter): The run's log, searched for lines no longer in memory.
+        memory_lines (int): Lines whose text is kept in memory.
+    """
+
+    def __init__(self, log=None, memory_lines=MEMORY_LINES):
+        self.log = log
+        self.memory_lines = memory_lines
+        self.behavior_ids = {} # Behavior name -> id, 0 is no behavior
+
+        self._lock = threading.Lock()
+        self._severities = array("B")
+        self._behaviors = array("H")
+        self._severity = NO_SEVERITY # Of the last line, for lines that continue it
+        self._blocks = []
+        self._pending = [] # Lines of the block being filled
+        self._first = 0 # Line number of the oldest line in memory
+
+    @property
+    def lines(self):
+        return len(self._severities)
+
+    def behaviors(self):
+        """Returns the sorted names of the behaviors seen so far."""
+        return sorted(self.behavior_ids)
+
+    def feed(self, lines):
+        """Classifies and adds a batch of reader.OutputLine."""
+        texts = [line.text if line.text.endswith("\n") else line.text + "\n" for line in lines]
+        severities, behaviors = self._classify(texts)
+
+        block = None
+        if len(self._pending) + len(texts) >= BLOCK_LINES:
+            block = Block(self.lines - len(self._pending), self._pending + texts)
+
+        with self._lock:
+            self._severities.extend(severities)
+            self._behaviors.extend(behaviors)
+            if block is None:
+                self._pending.extend(texts)
+                return
+            self._blocks.append(block)
+            self._pending = []
+            while len(self._blocks) > 1 and (len(self._blocks) - 1) * BLOCK_LINES >= self.memory_lines:
+                self._blocks.pop(0)
+            self._first = self._blocks[0].first if self.memory_lines else self.lines
+
+    def _classify(self, texts):
+        severities = array("B")
+        behaviors = array("H")
+        for text in texts:
+            self._severity, behavior = classify(text, self._severity)
+            severities.append(self._severity)
+            if behavior is None:
+                behaviors.append(0)
+            else:
+                behaviors.append(self.behavior_ids.setdefault(behavior, len(self.behavior_ids) + 1))
+        return severities, behaviors
+
+    def _reader(self):
+        """Returns a RunLogReader of the run log, or None."""
+        if getattr(self.log, "log_dir", None) is None:
+            return None # No log, or a daemon's run whose log folder is not known yet
+        try:
+            return RunLogReader(self.log.log_dir)
+        except OSError:
+            return None
+
+    def search(self, query, limit=MAX_RESULTS, cancelled=None):
+        """Returns up to `limit` (line number, text) matches, newest first.
+
+        Args:
+            query (Query): What to find.
+            limit (int): The most matches returned.
+            cancelled (threading.Event): Set to stop the search early.
+        """
+        cancelled = cancelled or threading.Event()
+        with self._lock:
+            count = self.lines
+            severities = np.frombuffer(self._severities[:count], dtype=np.uint8) # Slices are copies
+            behaviors = np.frombuffer(self._behaviors[:count], dtype=np.uint16)
+            blocks = list(self._blocks)
+            if self._pending:
+                blocks.append(Block(count - len(self._pending), self._pending))
+            first = self._first if blocks else count
+
+        mask = query.mask(severities, behaviors, self.behavior_ids)
+        results = []
+
+        for block in reversed(blocks):
+            if cancelled.is_set():
+                return results
+            for index in reversed(self._match_block(query, block, mask)):
+                results.append((block.first + index, block.line(index)))
+                if len(results) >= limit:
+                    return results
+
+        if first:
+            reader = self._reader()
+            if reader is not None:
+                self._search_log(reader, query, mask, first, results, limit, cancelled)
+        return results
+
+    def _match_block(self, query, block, mask):
+        """Returns the indexes of the matching lines of an in-memory block, in order."""
+        window = mask[block.first:block.first + len(block)] if mask is not None else None
+        if window is not None and not window.any():
+            return []
+        if query.regex is None:
+            return np.flatnonzero(window).tolist() if window is not None else list(range(len(block)))
+
+        indexes = []
+        last = -1
+        for start in query.starts(block.text):
+            index = bisect.bisect_right(block.offsets, start) - 1
+            if index == last or index >= len(block):
+                continue
+            last = index
+            if window is None or window[index]:
+                indexes.append(index)
+        return indexes
+
+    def _search_log(self, reader, query, mask, stop, results, limit, cancelled):
+        """Adds matches among the lines before `stop` from the run log, newest first."""
+        entries = reader.entries
+        for position in range(len(entries) - 1, -1, -1):
+            if cancelled.is_set():
+                return
+            start = entries[position].line
+            if start >= stop:
+                continue
+            end = min(entries[position + 1].line if position + 1 < len(entries) else stop, stop)
+            if mask is not None and not mask[start:end].any():
+                continue # Nothing here passes the filters, skip reading it
+
+            data = reader.read_chunk(position)
+            found = []
+            if query.regex_bytes is None:
+                wanted = set(np.flatnonzero(mask[start:end]) + start) if mask is not None else None
+                line = start
+                pos = 0
+                while line < end and pos < len(data):
+                    newline = data.find(b"\n", pos)
+                    newline = len(data) if newline < 0 else newline
+                    if wanted is None or line in wanted:
+                        found.append((line, data[pos:newline + 1]))
+                    line += 1
+                    pos = newline + 1
+            else:
+                line = start
+                counted = 0
+                for match_start in query.starts(data):
+                    line += data.count(b"\n", counted, match_start)
+                    counted = match_start
+                    if line >= end:
+                        break
+                    if found and found[-1][0] == line:
+                        continue
+                    if mask is None or mask[line]:
+                        begin = data.rfind(b"\n", 0, match_start) + 1
+                        newline = data.find(b"\n", match_start)
+                        found.append((line, data[begin:len(data) if newline < 0 else newline + 1]))
+
+            for line, text in reversed(found):
+                results.append((line, text.decode("utf-8", errors="replace")))
+                if len(results) >= limit:
+                    return
+
+    def context(self, line, before=20, after=20):
+        """Returns (first line number, lines) around a line, from memory or the run log."""
+        start = max(line - before, 0)
+        stop = line + after + 1
+        with self._lock:
+            blocks = list(self._blocks)
+            pending_first = self.lines - len(self._pending)
+            pending = list(self._pending)
+            first = self._first
+        if (blocks or pending) and start >= first:
+            lines = []
+            for block in blocks:
+                lines.extend(block.line(index) for index in range(len(block)) if start <= block.first + index < stop)
+            lines.extend(text for index, text in enumerate(pending, pending_first) if start <= index < stop)
+            return start, lines
+
+        reader = self._reader()
+        return start, reader.read_lines(start, stop - start) if reader else []
+
+class LogSearch(OutputIndex):
+    """Searches the run log of a run that is no longer running.
+
+    The log is classified once, on the first search, then searched like the older lines of a
+    live run.
+
+    Args:
+        log_dir (str): A log folder written by runlog.RunLogWriter.
+    """
+
+    def __init__(self, log_dir):
+        super().__init__(memory_lines=0)
+        self.reader = RunLogReader(log_dir)
+        self._loaded = 0 # Index entries classified so far
+
+    def _reader(self):
+        return self.reader
+
+    def load(self):
+        """Classifies any lines added to the log since the last load."""
+        self.reader.reload()
+        entries = self.reader.entries
+        for position in range(self._loaded, len(entries)):
+            # Split on newlines only, as RunLogWriter counts lines, so "\r" from progress bars stays in its line
+            texts = self.reader.read_chunk(position).decode("utf-8", errors="replace").split("\n")
+            texts.pop() # Empty, or the last line, still being written
+            texts = [text + "\n" for text in texts]
+            texts = texts[self.lines - entries[position].line:] # The last entry may have been partly loaded
+
+            severities, behaviors = self._classify(texts)
+            with self._lock:
+                self._severities.extend(severities)
+                self._behaviors.extend(behaviors)
+                self._first = self.lines
+        self._loaded = max(len(entries) - 1, 0) # The last entry can still grow
+
+    def search(self, query, limit=MAX_RESULTS, cancelled=None):
+        """Returns up to `limit` (line number, text) matches, newest first."""
+        self.load()
+        return super().search(query, limit, cancelled)
@@ -0,0 +1,314 @@
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import shutil
+import threading
+import collections
+
+from runlog import LOG_DIR_PREFIX, find_logs, compress_log
+from tfevents import EVENT_FILE_PREFIX, COMPRESSED_SUFFIX
+
+# Disk usage of every run, reused while a finished run's folders are unchanged
+STORAGE_INDEX_FILE = os.path.join("cache", "storage_index.json")
+
+# Defaults of the "retention" settings
+RETENTION = {
+    "keep_last": 5, # Snapshots per behavior kept, by step, besides checkpoint.pt which is always kept
+    "keep_best": True, # Also keep each behavior's snapshot with the best reward
+    "compress_logs": True, # Gzip the panel's output logs, see runlog.compress_log
+    "compress_events": False, # Gzip the event files, which TensorBoard then cannot read
+    "finished_after": 600, # Seconds a run must be untouched before it is measured once or changed
+}
+
+CATEGORIES = ("checkpoints", "models", "events", "logs", "other")
+SNAPSHOT_PATTERN = re.compile(r"-(\d+)\.(?:pt|onnx)$") # <behavior>-<steps>.pt/.onnx
+
+# What an Action does
+DELETE = "delete"
+COMPRESS_EVENTS = "compress events"
+COMPRESS_LOG = "compress log"
+
+Action = collections.namedtuple("Action", ["run_id", "kind", "path", "bytes", "reason"])
+Action.__doc__ = """One change a retention policy makes to a run, see plan.
+
+    run_id (str): The run it belongs to.
+    kind (str): DELETE, COMPRESS_EVENTS or COMPRESS_LOG.
+    path (str): The file, or for COMPRESS_LOG the log folder.
+    bytes (int): Its size now.
+    reason (str): Why, for the preview.
+"""
+
+def lower_priority():
+    """Lowers the CPU and I/O priority of the calling thread, on Linux.
+
+    Linux applies nice to a single thread, and a thread without an I/O priority of its own
+    gets one derived from its nice value, so this one call covers both.
+    """
+    if not sys.platform.startswith("linux"):
+        return # Elsewhere the call would renice the whole process, or another one
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except OSError as e:
+        print(f"[WARNING] Could not lower the priority of the storage thread: {e}")
+
+def category(run_dir, path):
+    """Returns which of CATEGORIES a file of a run counts towards."""
+    parts = os.path.relpath(path, run_dir).split(os.sep)
+    name = parts[-1]
+    if name.startswith(EVENT_FILE_PREFIX):
+        return "events"
+    if parts[0] == "run_logs" and len(parts) > 2 and parts[1].startswith(LOG_DIR_PREFIX):
+        return "logs"
+    if name.endswith((".pt", ".onnx")):
+        return "models" if len(parts) == 1 else "checkpoints"
+    return "other"
+
+def _fingerprint(run_dir):
+    """Returns the mtimes of a run's folder, the folders in it and the log folders in run_logs.
+
+    They change whenever a checkpoint, event file or log is added, removed or renamed. Files
+    that only grow do not change them, which is why runs are measured again until finished.
+    """
+    stamps = []
+    for path in (run_dir, os.path.join(run_dir, "run_logs")):
+        try:
+            stamps.append([os.path.relpath(path, run_dir), os.stat(path).st_mtime_ns])
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False) and entry.name != "run_logs":
+                        stamps.append([os.path.relpath(entry.path, run_dir), entry.stat(follow_symlinks=False).st_mtime_ns])
+        except OSError:
+            pass
+    return sorted(stamps)
+
+def measure_run(run_dir):
+    """Adds up the size of every file of a run.
+
+    Returns:
+        tuple: {category: bytes} over CATEGORIES, and the newest mtime of any file.
+    """
+    sizes = dict.fromkeys(CATEGORIES, 0)
+    latest = 0.0
+    for root, _, names in os.walk(run_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.lstat(path)
+            except OSError:
+                continue
+            sizes[category(run_dir, path)] += stat.st_size
+            latest = max(latest, stat.st_mtime)
+    return sizes, latest
+
+class SizeIndex:
+    """Cached disk usage of every run in a results folder.
+
+    Measuring a run stats every file it has, which adds up over thousands of checkpoints and
+    log segments. A run that was finished when it was measured is only measured again once
+    its folders change, see _fingerprint, so an update mostly costs a few stats per run.
+
+    Args:
+        results_dir (str): The {working_dir}/results folder.
+        path (str): The cache file, shared by all results folders.
+    """
+
+    def __init__(self, results_dir, path=STORAGE_INDEX_FILE):
+        self.results_dir = os.path.abspath(results_dir)
+        self.path = path
+        self.runs = {} # Run ID -> {"fingerprint", "sizes", "total", "latest", "finished"}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def update(self, finished_after=RETENTION["finished_after"]):
+        """Measures the runs that are new, changed or were not finished, and saves the cache.
+
+        Returns:
+            dict: The runs' entries, by Run ID.
+        """
+        with self._lock:
+            saved = self._load()
+            known = saved.get(self.results_dir, {})
+            runs = {}
+            try:
+                entries = [entry for entry in os.scandir(self.results_dir) if entry.is_dir()]
+            except OSError:
+                entries = []
+
+            now = time.time()
+            for entry in entries:
+                fingerprint = _fingerprint(entry.path)
+                cached = known.get(entry.name)
+                if cached and cached["finished"] and cached["fingerprint"] == fingerprint:
+                    runs[entry.name] = cached
+                    continue
+                sizes, latest = measure_run(entry.path)
+                runs[entry.name] = {
+                    "fingerprint": fingerprint,
+                    "sizes": sizes,
+                    "total": sum(sizes.values()),
+                    "latest": latest,
+                    "finished": now - latest >= finished_after,
+                }
+
+            saved[self.results_dir] = runs
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path + ".partial", "w") as f:
+                    json.dump(saved, f)
+                os.replace(self.path + ".partial", self.path)
+            except OSError as e:
+                print(f"[ERROR] Failed to save the storage index: {e}")
+
+            self.runs = runs
+            return runs
+
+def _prune_snapshots(run_id, run_dir, keep_last, keep_best):
+    from runindex import find_checkpoints, read_training_status # Imports sqlite3, engine reads RETENTION at startup
+
+    checkpoints = find_checkpoints(run_dir)["behaviors"]
+    status = read_training_status(run_dir)
+    actions = []
+    for behavior, found in checkpoints.items():
+        by_step = collections.defaultdict(list)
+        for path in found["snapshots"]:
+            match = SNAPSHOT_PATTERN.search(os.path.basename(path))
+            if match:
+                by_step[int(match.group(1))].append(path) # Files without a step are never pruned
+
+        keep = set(sorted(by_step, reverse=True)[:max(int(keep_last), 0)])
+        rewarded = [c for c in (status.get(behavior) or {}).get("checkpoints") or []
+                    if c.get("reward") is not None and c.get("steps") is not None]
+        best = max(rewarded, key=lambda c: c["reward"]) if keep_best and rewarded else None
+        if best is not None:
+            keep.add(int(best["steps"]))
+
+        kept = f"keeping the last {keep_last}" + (f" and the best, at step {int(best['steps'])}" if best is not None else "")
+        for step in sorted(set(by_step) - keep):
+            for path in by_step[step]:
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                actions.append(Action(run_id, DELETE, path, size, f"{behavior} snapshot at step {step}, {kept}"))
+    return actions
+
+def plan(results_dir, run_ids, policy, active=()):
+    """Works out what a retention policy would change, without changing anything.
+
+    Runs that are active, or were modified within `finished_after` seconds, are left alone.
+
+    Args:
+        results_dir (str): The {working_dir}/results folder.
+        run_ids (list): The runs to apply the policy to.
+        policy (dict): Settings in the form of RETENTION.
+        active (set): Run IDs queued or running, which are skipped.
+
+    Returns:
+        tuple: The list of Action, and a list of (run_id, why it was skipped).
+    """
+    policy = {**RETENTION, **policy}
+    actions = []
+    skipped = []
+    now = time.time()
+    for run_id in run_ids:
+        run_dir = os.path.join(results_dir, run_id)
+        if run_id in active:
+            skipped.append((run_id, "queued or running"))
+            continue
+        _, latest = measure_run(run_dir)
+        if now - latest < policy["finished_after"]:
+            skipped.append((run_id, f"modified in the last {policy['finished_after']:.0f} seconds"))
+            continue
+
+        actions.extend(_prune_snapshots(run_id, run_dir, policy["keep_last"], policy["keep_best"]))
+
+        if policy["compress_events"]:
+            for root, _, names in os.walk(run_dir):
+                for name in sorted(names):
+                    if name.startswith(EVENT_FILE_PREFIX) and not name.endswith(COMPRESSED_SUFFIX):
+                        path = os.path.join(root, name)
+                        actions.append(Action(run_id, COMPRESS_EVENTS, path, os.path.getsize(path), "Event file of a finished run"))
+
+        if policy["compress_logs"]:
+            for log_dir in find_logs(run_dir):
+                plain = [os.path.join(log_dir, name) for name in os.listdir(log_dir) if name.endswith(".log")]
+                if plain:
+                    size = sum(os.path.getsize(path) for path in plain)
+                    actions.append(Action(run_id, COMPRESS_LOG, log_dir, size, f"{len(plain)} output log segments"))
+    return actions, skipped
+
+def compress_event_file(path):
+    """Replaces an event file with a gzipped copy, which tfevents still reads. Returns the bytes saved."""
+    folder, name = os.path.split(path)
+    partial = os.path.join(folder, f".{name}{COMPRESSED_SUFFIX}.partial") # Not an event file until complete
+    with open(path, "rb") as src, gzip.open(partial, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    shutil.copystat(path, partial)
+    saved = os.path.getsize(path) - os.path.getsize(partial)
+    os.replace(partial, path + COMPRESSED_SUFFIX)
+    os.remove(path)
+    return saved
+
+def apply(actions, skip=None, cancelled=None, progress=None):
+    """Carries out planned actions, e.g. those shown in a preview, at low priority.
+
+    Meant for a worker thread, whose priority is lowered for good, see lower_priority.
+
+    Args:
+        actions (list): Action from plan.
+        skip (callable): Called with a Run ID before each action, True leaves the run alone,
+            e.g. because it has been started since the plan was made.
+        cancelled (threading.Event): Stops before the next action once set.
+        progress (callable): Called with (done, total) after each action.
+
+    Returns:
+        dict: "deleted" and "compressed" files or logs, "freed" bytes and the "errors".
+    """
+    lower_priority()
+    result = {"deleted": 0, "compressed": 0, "freed": 0, "errors": []}
+    for done, action in enumerate(actions, 1):
+        if cancelled is not None and cancelled.is_set():
+            break
+        if skip is not None and skip(action.run_id):
+            continue
+
+        try:
+            if action.kind == DELETE:
+                os.remove(action.path)
+                result["deleted"] += 1
+                result["freed"] += action.bytes
+            elif action.kind == COMPRESS_EVENTS:
+                result["freed"] += compress_event_file(action.path)
+                result["compressed"] += 1
+            elif action.kind == COMPRESS_LOG:
+                result["freed"] += compress_log(action.path)
+                result["compressed"] += 1
+        except FileNotFoundError:
+            pass # Removed in the meantime
+        except OSError as e:
+            print(f"[ERROR] Failed to {action.kind} {action.path}: {e}")
+            result["errors"].append(f"{action.path}: {e}")
+
+        if progress is not None:
+            progress(done, len(actions))
+
+    print(f"[SUCCESS] Storage: deleted {result['deleted']} files, compressed {result['compressed']}, "
+          f"freed {format_bytes(result['freed'])}")
+    return result
+
+def format_bytes(count):
+    """Returns a size in the largest unit that keeps it at least 1, e.g. "1.4 GB"."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(count) < 1024:
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} TB"
@@ -0,0 +1,128 @@
+import os
+import json
+import copy
+import math
+import itertools
+import yaml
+
+SWEEP_CONFIG_DIR = "config/sweeps" # Derived configs are written here, relative to the working directory
+
+def load_sweep_spec(spec_file):
+    """Loads a sweep specification from a YAML file.
+
+    A spec names a base trainer config and the hyperparameters to vary. Parameter keys are
+    dotted paths inside each behavior's settings. A list gives the grid values directly, a
+    mapping with min, max and num spaces num values evenly, geometrically if log is true:
+
+        base: config/ppo/3DBall.yaml
+        parameters:
+          hyperparameters.learning_rate: {min: 1.0e-4, max: 1.0e-3, num: 3, log: true}
+          hyperparameters.batch_size: [64, 128, 256]
+          network_settings.num_layers: [1, 2]
+
+    Args:
+        spec_file (str): The path to the sweep specification.
+
+    Returns:
+        tuple: The base config path and a dict of parameter path -> list of values.
+    """
+    with open(spec_file, "r") as f:
+        spec = yaml.safe_load(f) or {}
+
+    base = spec.get("base")
+    if not base:
+        raise ValueError("The sweep spec does not name a base config file.")
+    if not os.path.isabs(base):
+        base = os.path.join(os.path.dirname(os.path.abspath(spec_file)), base)
+
+    parameters = {}
+    for key, values in (spec.get("parameters") or {}).items():
+        parameters[key] = expand_values(key, values)
+    if not parameters:
+        raise ValueError("The sweep spec does not define any parameters.")
+
+    return base, parameters
+
+def expand_values(key, values):
+    """Turns a parameter's grid or range definition into a list of values."""
+    if isinstance(values, list):
+        if not values:
+            raise ValueError(f"Parameter {key} has no values.")
+        return values
+
+    if isinstance(values, dict):
+        try:
+            low, high, num = values["min"], values["max"], int(values["num"])
+        except KeyError as e:
+            raise ValueError(f"Parameter {key} range is missing {e}.")
+        if num < 1:
+            raise ValueError(f"Parameter {key} range needs at least one value.")
+        if num == 1:
+            return [low]
+
+        if values.get("log"):
+            if low <= 0 or high <= 0:
+                raise ValueError(f"Parameter {key} log range must be positive.")
+            step = (math.log(high) - math.log(low)) / (num - 1)
+            result = [math.exp(math.log(low) + i * step) for i in range(num)]
+        else:
+            step = (high - low) / (num - 1)
+            result = [low + i * step for i in range(num)]
+
+        if isinstance(low, int) and isinstance(high, int):
+            return sorted(set(int(round(value)) for value in result))
+        return [float(f"{value:.6g}") for value in result] # Drop floating point noise from the config files
+
+    return [values] # A single fixed value
+
+def expand_grid(parameters):
+    """Returns every combination of parameter values as a list of dicts."""
+    keys = list(parameters)
+    return [dict(zip(keys, combination)) for combination in itertools.product(*(parameters[key] for key in keys))]
+
+def derive_config(base_config, overrides):
+    """Returns a copy of a trainer config with the overrides applied to every behavior."""
+    config = copy.deepcopy(base_config)
+    behaviors = config.get("behaviors") or {}
+    if not behaviors:
+        raise ValueError("The base config does not define any behaviors.")
+
+    for settings in behaviors.values():
+        for key, value in overrides.items():
+            node = settings
+            *parents, leaf = key.split(".")
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[leaf] = value
+    return config
+
+def generate_sweep(working_dir, sweep_id, spec_file):
+    """Writes a derived config file for every combination in a sweep.
+
+    Args:
+        working_dir (str): The ML-Agents working directory.
+        sweep_id (str): Prefix for the run IDs and the name of the config folder.
+        spec_file (str): The path to the sweep specification.
+
+    Returns:
+        list: (run_id, config_file, overrides) for each run in the sweep.
+    """
+    base, parameters = load_sweep_spec(spec_file)
+    with open(base, "r") as f:
+        base_config = yaml.safe_load(f)
+
+    sweep_dir = os.path.join(working_dir, SWEEP_CONFIG_DIR, sweep_id)
+    os.makedirs(sweep_dir, exist_ok=True)
+
+    runs = []
+    for index, overrides in enumerate(expand_grid(parameters)):
+        run_id = f"{sweep_id}_{index:03d}"
+        config_file = os.path.join(sweep_dir, f"{run_id}.yaml")
+        with open(config_file, "w") as f:
+            yaml.safe_dump(derive_config(base_config, overrides), f, sort_keys=False)
+        runs.append((run_id, config_file, overrides))
+
+    with open(os.path.join(sweep_dir, "sweep.json"), "w") as f:
+        json.dump({"base": base, "runs": [{"run_id": r, "config": c, "parameters": o} for r, c, o in runs]}, f, indent=4)
+
+    return runs
@@ -0,0 +1,49 @@
+import numpy as np
+
+from reader import OutputLine
+from metrics import TrainingMetrics
+from earlystop import EarlyStopping, fit_trends
+
+SUMMARY = "[INFO] {behavior}. Step: {step}. Time Elapsed: 1.0 s. Mean Reward: {mean}. Std of Reward: 0.1. Training.\n"
+
+def watch(rewards, behavior="Walker", every=10000, **options):
+    """Feeds a summary per reward to an EarlyStopping. Returns it and the reasons it stopped for."""
+    metrics = TrainingMetrics()
+    reasons = []
+    watchdog = EarlyStopping(metrics, reasons.append, **{"window": 10, "min_steps": 50000, **options})
+    for i, mean in enumerate(rewards, 1):
+        lines = [OutputLine("stdout", 0.0, SUMMARY.format(behavior=behavior, step=i * every, mean=mean))]
+        metrics.feed(lines)
+        watchdog.feed(lines)
+    return watchdog, reasons
+
+def test_fit_trends_fits_each_row():
+    steps = np.array([[0.0, 1.0, 2.0, 3.0], [10.0, 20.0, 30.0, 40.0]])
+    rewards = np.array([[1.0, 3.0, 5.0, 7.0], [4.0, 4.0, 4.0, 4.0]])
+    slope, latest = fit_trends(steps, rewards)
+    np.testing.assert_allclose(slope, [2.0, 0.0])
+    np.testing.assert_allclose(latest, [7.0, 4.0])
+
+def test_fit_trends_of_a_single_step_is_flat():
+    slope, latest = fit_trends(np.array([[5.0, 5.0, 5.0]]), np.array([[1.0, 2.0, 3.0]]))
+    assert slope[0] == 0.0 and latest[0] == 2.0
+
+def test_improving_run_keeps_going():
+    watchdog, reasons = watch([i * 0.5 for i in range(30)])
+    assert reasons == [] and watchdog.reason is None
+
+def test_plateau_stops_once():
+    watchdog, reasons = watch([i * 0.5 for i in range(10)] + [5.0] * 30)
+    assert len(reasons) == 1 and reasons[0].startswith("Mean reward plateaued")
+
+def test_plateau_waits_for_min_steps():
+    _, reasons = watch([1.0] * 30, min_steps=10 ** 9)
+    assert reasons == []
+
+def test_divergence_stops():
+    _, reasons = watch([i * 1.0 for i in range(20)] + [19.0 - i * 2.0 for i in range(10)])
+    assert len(reasons) == 1 and "diverged" in reasons[0]
+
+def test_nan_reward_stops_straight_away():
+    _, reasons = watch([1.0, 2.0, "nan"])
+    assert len(reasons) == 1 and "diverged" in reasons[0]
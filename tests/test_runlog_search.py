@@ -0,0 +1,109 @@
+"""The run log and the search index must agree on line numbers, see runlog.RunLogWriter."""
+import os
+import time
+import types
+
+import pytest
+
+from reader import OutputLine
+from runlog import RunLogWriter, RunLogReader, INDEX_EVERY
+from search import OutputIndex, LogSearch, Query
+from engine import create_job, stop_early
+
+# Separators str.splitlines() breaks on, which are not line ends to the run log
+SEPARATORS = ["\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", " "]
+
+def output(count):
+    """Returns `count` OutputLine, with progress bars, separators, errors and summaries mixed in."""
+    lines = []
+    for i in range(count):
+        if i % 7 == 0:
+            text = f"progress {i}\r 50%\r100%{SEPARATORS[i % len(SEPARATORS)]}done\n"
+        elif i % 100 == 0:
+            text = f"[ERROR] line {i}\n"
+        elif i % 50 == 0:
+            text = f"[INFO] Walker. Step: {i}. Time Elapsed: 1.0 s. Mean Reward: 1.0. Std of Reward: 0.1. Training.\n"
+        else:
+            text = f"[INFO] line {i}\n"
+        lines.append(OutputLine("stdout", float(i), text))
+    return lines
+
+@pytest.fixture
+def log_dir(tmp_path):
+    os.makedirs(tmp_path / "results" / "run")
+    return str(tmp_path / "results" / "run" / "run_logs" / "output-1")
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_log_search_counts_lines_like_the_writer(log_dir, compress):
+    lines = output(3 * INDEX_EVERY + 17)
+    writer = RunLogWriter(log_dir, "run", compress=compress)
+    writer.feed(lines)
+    writer.close()
+
+    index = LogSearch(log_dir)
+    index.load()
+    assert index.lines == writer.lines == len(lines)
+
+    reader = RunLogReader(log_dir)
+    results = index.search(Query(severity="ERROR"))
+    assert [line for line, _ in results] == [i for i in range(len(lines) - 1, -1, -1) if i % 100 == 0 and i % 7]
+    for line, text in results:
+        assert reader.read_lines(line, 1) == [text]
+
+    behaviors = index.search(Query(behavior="Walker"))
+    assert behaviors and all(line % 50 == 0 for line, _ in behaviors)
+
+def test_log_search_loads_a_growing_log(log_dir):
+    lines = output(2 * INDEX_EVERY + 500)
+    writer = RunLogWriter(log_dir, "run")
+    writer.feed(lines[:INDEX_EVERY + 300])
+    deadline = time.monotonic() + 10
+    while writer.lines < INDEX_EVERY + 300 and time.monotonic() < deadline:
+        time.sleep(0.05) # Written on the writer's thread
+
+    index = LogSearch(log_dir)
+    index.load() # The last index entry is only partly written
+    assert index.lines == INDEX_EVERY + 300
+
+    writer.feed(lines[INDEX_EVERY + 300:])
+    writer.close()
+    index.load()
+    assert index.lines == len(lines)
+    assert [line for line, _ in index.search(Query(severity="ERROR"))][-1] == 100
+
+def test_live_index_searches_the_log_by_line_number(log_dir):
+    lines = output(2 * INDEX_EVERY)
+    writer = RunLogWriter(log_dir, "run")
+    index = OutputIndex(log=writer, memory_lines=0) # Every line's text is read back from the log
+    for start in range(0, len(lines), 300):
+        writer.feed(lines[start:start + 300])
+        index.feed(lines[start:start + 300])
+    writer.close()
+
+    assert index.lines == writer.lines
+    reader = RunLogReader(log_dir)
+    results = index.search(Query("progress", severity=None))
+    assert len(results) == len([i for i in range(len(lines)) if i % 7 == 0])
+    for line, text in results:
+        assert reader.read_lines(line, 1) == [text]
+
+def test_stop_early_keeps_the_log_and_index_aligned(tmp_path):
+    job_manager = types.SimpleNamespace(stop=lambda job: True)
+    owner = types.SimpleNamespace(working_dir=str(tmp_path), log_max_bytes=1 << 20, log_compress=False,
+                                  early_stopping={"enabled": True}, job_manager=job_manager)
+    os.makedirs(tmp_path / "results" / "run")
+    job = create_job(owner, "run", ["mlagents-learn"])
+
+    first = output(10)
+    for consumer in job.consumers:
+        consumer.feed(first)
+    stop_early(job_manager, job, "Mean reward plateaued")
+    for consumer in job.consumers:
+        consumer.feed(output(5))
+    job.log.close()
+
+    assert job.stop_reason == "Mean reward plateaued"
+    assert job.log.lines == job.search.lines == 16
+    line, text = job.search.search(Query("Stopping early"))[0]
+    assert line == 10
+    assert RunLogReader(job.log.log_dir).read_lines(line, 1) == [text]
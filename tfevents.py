@@ -0,0 +1,304 @@
+import os
+import gzip
+import mmap
+import struct
+import threading
+from array import array
+
+EVENT_FILE_PREFIX = "events.out.tfevents."
+COMPRESSED_SUFFIX = ".gz" # Event files of finished runs compressed by the storage manager, see storage.py
+
+# Protobuf wire types
+VARINT, FIXED64, LENGTH_DELIMITED, FIXED32 = 0, 1, 2, 5
+
+# TensorProto dtypes used for scalars
+DT_FLOAT, DT_DOUBLE = 1, 2
+
+def _varint(buffer, pos):
+    result = shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+def _fields(buffer, start=0, end=None):
+    """Yields (field number, wire type, value) for every field of a protobuf message.
+
+    Length-delimited values are returned as (start, end) offsets into the buffer, so nested
+    messages are decoded without copying.
+    """
+    pos = start
+    end = len(buffer) if end is None else end
+    while pos < end:
+        key, pos = _varint(buffer, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == VARINT:
+            value, pos = _varint(buffer, pos)
+        elif wire_type == FIXED64:
+            value = pos
+            pos += 8
+        elif wire_type == FIXED32:
+            value = pos
+            pos += 4
+        elif wire_type == LENGTH_DELIMITED:
+            length, pos = _varint(buffer, pos)
+            value = (pos, pos + length)
+            pos += length
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield field, wire_type, value
+
+def _tensor_scalar(buffer, start, end):
+    """Returns the first value of a float or double TensorProto, or None."""
+    dtype = None
+    content = None
+    for field, wire_type, value in _fields(buffer, start, end):
+        if field == 1 and wire_type == VARINT:
+            dtype = value
+        elif field == 4 and wire_type == LENGTH_DELIMITED: # tensor_content
+            content = value
+        elif field == 5: # float_val, packed or not
+            if wire_type == LENGTH_DELIMITED and value[1] - value[0] >= 4:
+                return struct.unpack_from("<f", buffer, value[0])[0]
+            if wire_type == FIXED32:
+                return struct.unpack_from("<f", buffer, value)[0]
+        elif field == 6: # double_val, packed or not
+            if wire_type == LENGTH_DELIMITED and value[1] - value[0] >= 8:
+                return struct.unpack_from("<d", buffer, value[0])[0]
+            if wire_type == FIXED64:
+                return struct.unpack_from("<d", buffer, value)[0]
+
+    if content:
+        if dtype == DT_FLOAT and content[1] - content[0] >= 4:
+            return struct.unpack_from("<f", buffer, content[0])[0]
+        if dtype == DT_DOUBLE and content[1] - content[0] >= 8:
+            return struct.unpack_from("<d", buffer, content[0])[0]
+    return None
+
+def parse_event(buffer, start, end):
+    """Decodes the scalar summaries of one Event record.
+
+    Returns:
+        tuple: (wall_time, step, [(tag, value), ...]).
+    """
+    wall_time = 0.0
+    step = 0
+    scalars = []
+
+    for field, wire_type, value in _fields(buffer, start, end):
+        if field == 1 and wire_type == FIXED64:
+            wall_time = struct.unpack_from("<d", buffer, value)[0]
+        elif field == 2 and wire_type == VARINT:
+            step = value
+        elif field == 5 and wire_type == LENGTH_DELIMITED: # Summary
+            for summary_field, _, entry in _fields(buffer, *value):
+                if summary_field != 1: # Summary.Value
+                    continue
+                tag = None
+                scalar = None
+                for value_field, value_wire_type, item in _fields(buffer, *entry):
+                    if value_field == 1 and value_wire_type == LENGTH_DELIMITED:
+                        tag = bytes(buffer[item[0]:item[1]]).decode("utf-8", errors="replace")
+                    elif value_field == 2 and value_wire_type == FIXED32: # simple_value
+                        scalar = struct.unpack_from("<f", buffer, item)[0]
+                    elif value_field == 8 and value_wire_type == LENGTH_DELIMITED: # tensor
+                        scalar = _tensor_scalar(buffer, *item)
+                if tag is not None and scalar is not None:
+                    scalars.append((tag, scalar))
+
+    return wall_time, step, scalars
+
+class ScalarSeries:
+    """Compact step, value and wall time arrays of one scalar tag."""
+
+    def __init__(self):
+        self.steps = array("q")
+        self.values = array("d")
+        self.wall_times = array("d")
+
+    def __len__(self):
+        return len(self.steps)
+
+class EventFileReader:
+    """Incrementally reads the scalar summaries from one TFRecord event file.
+
+    The file is memory-mapped on each poll and only the records after the last offset are
+    decoded, so polling a growing file costs time proportional to what was added. A record
+    that is still being written is left for the next poll. CRCs are not checked; the length
+    of each record is enough to find the next one.
+
+    A gzipped event file belongs to a finished run, it is decompressed and read once.
+
+    Args:
+        path (str): The path to the events.out.tfevents.* file.
+        lock (threading.Lock): Held while new values are added to `scalars`, decoding happens
+            outside of it so readers are never blocked for long.
+    """
+
+    def __init__(self, path, lock=None):
+        self.path = path
+        self.lock = lock or threading.Lock()
+        self.offset = 0
+        self.scalars = {} # Tag -> ScalarSeries
+
+    def poll(self):
+        """Decodes any records added since the last poll.
+
+        Returns:
+            int: The number of new records.
+        """
+        if self.path.endswith(COMPRESSED_SUFFIX):
+            if self.offset:
+                return 0
+            try:
+                with gzip.open(self.path, "rb") as f:
+                    return self._decode(f.read())
+            except (OSError, EOFError):
+                return 0
+
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+        if size <= self.offset:
+            return 0
+
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return self._decode(buffer)
+
+    def _decode(self, buffer):
+        """Decodes the complete records of a buffer after `offset`, and moves `offset` past them."""
+        size = len(buffer)
+        count = 0
+        new = {} # Tag -> ScalarSeries of the records decoded by this poll
+        pos = self.offset
+        while pos + 12 <= size:
+            length = struct.unpack_from("<Q", buffer, pos)[0]
+            end = pos + 12 + length + 4 # Length, length CRC, data, data CRC
+            if end > size:
+                break # Partially written record
+
+            wall_time, step, scalars = parse_event(buffer, pos + 12, pos + 12 + length)
+            for tag, value in scalars:
+                series = new.get(tag)
+                if series is None:
+                    series = new[tag] = ScalarSeries()
+                series.steps.append(step)
+                series.values.append(value)
+                series.wall_times.append(wall_time)
+
+            pos = end
+            count += 1
+
+        with self.lock:
+            for tag, series in new.items():
+                existing = self.scalars.setdefault(tag, ScalarSeries())
+                existing.steps.extend(series.steps)
+                existing.values.extend(series.values)
+                existing.wall_times.extend(series.wall_times)
+            self.offset = pos
+
+        return count
+
+class RunEventReader:
+    """Reads the scalars of every event file under a run's results folder.
+
+    mlagents-learn writes one event file per behavior, in results/<run_id>/<behavior>/. New
+    files are picked up on each poll, and existing ones are read from where they left off.
+
+    Args:
+        run_dir (str): The results/<run_id> folder.
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.files = {} # Path -> EventFileReader
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def poll(self):
+        """Reads new records from all event files, returns the number of new records."""
+        paths = []
+        for root, _, names in os.walk(self.run_dir):
+            paths.extend(
+                os.path.join(root, name) for name in names
+                # While a file is being compressed both copies exist, read the original
+                if name.startswith(EVENT_FILE_PREFIX) and not (name.endswith(COMPRESSED_SUFFIX) and name[:-len(COMPRESSED_SUFFIX)] in names)
+            )
+
+        count = 0
+        with self.lock:
+            for path in [path for path in self.files if path not in paths]:
+                # Replaced by its compressed copy, which is read in full instead
+                del self.files[path]
+                count += 1
+        for path in sorted(paths):
+            reader = self.files.get(path)
+            if reader is None:
+                with self.lock:
+                    reader = self.files[path] = EventFileReader(path, self.lock)
+            count += reader.poll()
+
+        if count:
+            with self.lock:
+                self.version += 1
+        return count
+
+    def tags(self):
+        """Returns the sorted scalar tags found so far."""
+        with self.lock:
+            return sorted({tag for reader in self.files.values() for tag in reader.scalars})
+
+    def series(self, tag):
+        """Returns {behavior: ScalarSeries} for a tag, the behavior being the event file's folder."""
+        with self.lock:
+            result = {}
+            for path in sorted(self.files):
+                reader = self.files[path]
+                if tag not in reader.scalars:
+                    continue
+
+                behavior = os.path.relpath(os.path.dirname(path), self.run_dir)
+                if behavior == ".":
+                    behavior = os.path.basename(self.run_dir)
+
+                if behavior not in result:
+                    result[behavior] = reader.scalars[tag]
+                    continue
+
+                # A resumed run adds another event file to the same folder, join them in order
+                merged = ScalarSeries()
+                for series in (result[behavior], reader.scalars[tag]):
+                    merged.steps.extend(series.steps)
+                    merged.values.extend(series.values)
+                    merged.wall_times.extend(series.wall_times)
+                result[behavior] = merged
+            return result
+
+    def source(self, tag):
+        """Returns a view of one tag that a charts.SeriesChart can draw."""
+        return TagSource(self, tag)
+
+class TagSource:
+    """One tag of a RunEventReader, in the form charts.SeriesChart reads."""
+
+    def __init__(self, reader, tag):
+        self.reader = reader
+        self.tag = tag
+
+    @property
+    def version(self):
+        return self.reader.version
+
+    def snapshot(self, start_at=None):
+        """Returns {behavior: (steps, values)} copies, from the given start index per behavior."""
+        result = {}
+        for behavior, series in self.reader.series(self.tag).items():
+            start = (start_at or {}).get(behavior, 0)
+            with self.reader.lock:
+                result[behavior] = (series.steps[start:], series.values[start:])
+        return result
+
@@ -1,14 +1,23 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import messagebox, scrolledtext
 import customtkinter as ctk
 import subprocess
 import os
+import time
 import threading
-import signal
-import select
 import json
-
-CONFIG_FILE = "config.json"
+import collections
+from scrollback import ScrollbackView
+from resources import format_sample
+from events import EVENTS
+from envs import resolve_env_async
+from engine import CONFIG_FILE, read_settings, apply_settings, collect_settings, create_job, training_command
+
+# How often queued output is flushed into the text widget, and the most text moved per flush
+FLUSH_INTERVAL_MS = 50
+FLUSH_MAX_BYTES = 64 * 1024
+QUEUE_MAX_BYTES = 8 * 1024 * 1024 # Queued output beyond this skips the widget, see OutputBuffer
+PENDING_MAX_BYTES = 256 * 1024 # Output kept for a run whose popup has not been opened, see PendingOutput
 
 def load_settings(controller):
     """ Loads user settings from JSON file, if one exists"""
@@ -18,14 +27,12 @@ def load_settings(controller):
     if os.path.exists(CONFIG_FILE):
         print("    Settings file found! Skipping setup.")
         try:
-            with open(CONFIG_FILE, 'r') as f:
-                settings = json.load(f)
-
-                controller.working_dir = settings.get("working_dir", "")
-                controller.virtual_env = settings.get("virtual_env", "")
+            apply_settings(controller, read_settings())
 
-                print(f"        working_dir: {controller.working_dir}"),
-                print(f"        virtual_env: {controller.virtual_env}")
+            print(f"        working_dir: {controller.working_dir}"),
+            print(f"        virtual_env: {controller.virtual_env}")
+            if controller.virtual_env:
+                resolve_env_async(controller.virtual_env) # Cached by the time the first run is launched
         except Exception as e:
             messagebox.showerror(
                 title="Error!",
@@ -36,10 +43,7 @@ def load_settings(controller):
         return None
 
 def save_settings(controller):
-    settings = {
-        "working_dir": controller.working_dir,
-        "virtual_env": controller.virtual_env
-    }
+    settings = collect_settings(controller)
     try:
         with open(CONFIG_FILE, 'w') as f:
             json.dump(settings, f, indent=4)
@@ -51,33 +55,21 @@ def save_settings(controller):
     except Exception as e:
         messagebox.showerror("Error", f"Failed to save settings: {e}")
 
-def get_conda_envs():
-    # Fetch a list of Conda environments
-    try:
-        result = subprocess.run(["conda", "env", "list"], stdout=subprocess.PIPE, text=True)
-        envs = []
-        for line in result.stdout.splitlines():
-            if line.startswith("#") or not line.strip():
-                continue
-            env_name = line.split()[0]
-            envs.append(env_name)
-        return envs
-    except Exception as e:
-        print(f"[ERROR] Ran into issue fetching environments: {e}")
-        return []
-    
-def begin_training(controller, run_id, config_file):
-        """Begins a new training session in a subprocess
+def begin_training(controller, run_id, config_file, profile=None, initialize_from=None):
+        """Queues a new training session, it starts in a subprocess as soon as a slot is free
+
+        The command is built on a worker thread, since resolving a Conda environment that is not
+        cached yet runs conda, and the run is queued from the Tk main loop once it is ready.
 
         Args:
             controller (MLAgentsApp): The main application instance that acts as the controller for managing the application's state and navigation.
             run_id (str): The ID for the training session.
             config_file (str): The path to the configuation file for the training session.
-        
-        Returns:
-            subprocess.Popen: The process object for the training session, or None if an error occurs.
+            profile (str): The name of a launch profile for a built environment, None for the Unity editor.
+            initialize_from (str): The Run ID of a previous run whose checkpoint the new run starts from.
         """
         print(f"\n[ALERT] Attempting to begin training with run-id: {run_id}")
+        EVENTS.emit("training.requested", run_id, config_file=config_file, profile=profile, initialize_from=initialize_from)
 
         env = controller.virtual_env
         working_dir = controller.working_dir # The selected ml-agents working directory
@@ -87,74 +79,347 @@ def begin_training(controller, run_id, config_file):
         if not env: # Check if the environment is valid
             print("[ERROR] No environment selected for training!")
             return
+
+        if controller.job_manager.find_active(run_id): # Check the Run ID is not queued or running already
+            print(f'[ERROR] A run with Run ID "{run_id}" is already queued or running!')
+            messagebox.showerror("Run ID in use", f'A run with the Run ID "{run_id}" is already queued or running.')
+            return
+
+        extra_args, first_port = profile_launch_args(controller, profile)
+        if extra_args is None:
+            return
         
         # Check if the directory exists
         force_flag = ""
         if os.path.exists(run_id_path) and os.path.isdir(run_id_path):
-            print(f'    [INFO] Previous result found with Run ID "{run_id}". Overwrite?')
-
-            # Show an alert window to confirm overwriting
-            overwrite = messagebox.askyesno(
-                "Existing Run-ID",
-                message=f'A result with the Run ID "{run_id}" already exists.',
-                detail=f'Do you want to force start training and overwrite the previous result?',
-            )
-            if not overwrite:
-                print("    [ALERT] Training session cancelled by the user.")
+            from runindex import find_checkpoints
+
+            checkpoints = find_checkpoints(run_id_path)
+            if checkpoints["resumable"]:
+                # The run saved a checkpoint, so it can carry on where it stopped
+                print(f'    [INFO] Previous result found with Run ID "{run_id}". Resume or overwrite?')
+                force_flag = ask_resume_or_overwrite(controller, run_id, checkpoints)
+                if not force_flag:
+                    print("    [ALERT] Training session cancelled by the user.")
+                    return
+                print(f"    [INFO] User chose to {force_flag[2:]}. Adding {force_flag} flag")
+            else:
+                print(f'    [INFO] Previous result found with Run ID "{run_id}". Overwrite?')
+
+                # Show an alert window to confirm overwriting
+                overwrite = messagebox.askyesno(
+                    "Existing Run-ID",
+                    message=f'A result with the Run ID "{run_id}" already exists.',
+                    detail='It has no checkpoint to resume from. Do you want to force start training and overwrite the previous result?',
+                )
+                if not overwrite:
+                    print("    [ALERT] Training session cancelled by the user.")
+                    return
+
+                # User chose to overwrite, add the --force flag
+                print("    [INFO] User chose to overwrite. Adding --force flag")
+                force_flag = "--force"
+
+        if initialize_from and force_flag == "--resume":
+            print(f"    [INFO] Resuming {run_id}, so it is not initialised from {initialize_from}")
+        elif initialize_from:
+            from runindex import find_checkpoints
+
+            if not find_checkpoints(os.path.join(results_dir, initialize_from))["resumable"]:
+                print(f'[ERROR] "{initialize_from}" has no checkpoint to initialise from!')
+                messagebox.showerror("Initialize From", f'The run "{initialize_from}" has no checkpoint to initialise from.')
                 return
+            extra_args = [*extra_args, f"--initialize-from={initialize_from}"]
 
-            # User chose to overwrite, add the --force flag
-            print("    [INFO] User chose to overwrite. Adding --force flag")
-            force_flag = "--force"
+        def on_command(command, error):
+            try:
+                if error is not None:
+                    raise error
+                if controller.job_manager.find_active(run_id): # Queued while the command was being built
+                    print(f'[ERROR] A run with Run ID "{run_id}" is already queued or running!')
+                    messagebox.showerror("Run ID in use", f'A run with the Run ID "{run_id}" is already queued or running.')
+                    return
+                argv, environ = command
+                queue_training(controller, run_id, argv, environ, first_port=first_port)
 
-        try:
-            # Command to run the training session
-            command = f"source activate base && conda activate {env} && mlagents-learn {config_file} --run-id={run_id} {force_flag}"
-
-            # Create the popup to show training output
-            output_popup = create_output_popup(controller, run_id)
-
-            process = subprocess.Popen(
-                command,
-                shell=True,
-                cwd=controller.working_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                preexec_fn=os.setsid
-            )
+            except Exception as e:
+                print(f"    [ERROR] Failed to begin training. \n\n{str(e)}")
+
+                if env:
+                    deactivate_env(env, None)
+                    print(f'Deactivating virtual environment "{env}"" as a consequence')
 
-            # Use a seperate thread to read subprocess output
-            threading.Thread(target=stream_process_output, args=(process, output_popup), daemon=True).start()
+        call_in_background(controller, lambda: training_command(env, config_file, run_id, force_flag, extra_args), on_command)
 
-            # Store the process in the controller
-            controller.current_training_process = process
+def call_in_background(controller, work, done, interval_ms=50):
+    """Runs `work` on a worker thread and calls `done` with its result on the Tk main loop.
 
-            print(f"    [ALERT] Training started with run-id: {run_id}")
-            return process
+    Args:
+        controller (MLAgentsApp): The main application instance, whose `after` polls the thread.
+        work (callable): Called without arguments on the worker thread, it must not touch Tk.
+        done (callable): Called with (result, None), or (None, exception) if `work` raised.
+        interval_ms (int): Milliseconds between checks for the result.
+    """
+    outcome = []
 
+    def run():
+        try:
+            outcome.append((work(), None))
         except Exception as e:
-            print(f"    [ERROR] Failed to begin training. \n\n{str(e)}")
+            outcome.append((None, e))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    def check_done():
+        if outcome:
+            done(*outcome[0])
+        else:
+            controller.after(interval_ms, check_done)
+
+    check_done()
+    return thread
+
+def ask_resume_or_overwrite(controller, run_id, checkpoints):
+    """Asks whether an existing run with a checkpoint is resumed or overwritten.
+
+    Args:
+        controller (MLAgentsApp): The main application instance.
+        run_id (str): The ID for the training session.
+        checkpoints (dict): The run's checkpoints, see runindex.find_checkpoints.
+
+    Returns:
+        str: "--resume", "--force" or "" if the user cancelled.
+    """
+    popup = ctk.CTkToplevel(controller)
+    popup.title("Existing Run-ID")
+    choice = tk.StringVar(value="")
+
+    step = checkpoints["last_step"]
+    behaviors = ", ".join(sorted(checkpoints["behaviors"]))
+    ctk.CTkLabel(
+        popup,
+        text=f'A result with the Run ID "{run_id}" already exists.',
+        font=("Arial", 14)
+    ).pack(padx=20, pady=(15, 5))
+    ctk.CTkLabel(
+        popup,
+        text=f"Checkpoints of {behaviors}" + (f", last saved at step {step:,}" if step is not None else ""),
+        font=("Arial", 12)
+    ).pack(padx=20, pady=5)
+
+    def choose(flag):
+        choice.set(flag)
+        popup.destroy()
+
+    buttons = ctk.CTkFrame(popup)
+    buttons.pack(pady=15)
+    ctk.CTkButton(buttons, text="Resume", width=100, command=lambda: choose("--resume")).pack(side="left", padx=5)
+    ctk.CTkButton(buttons, text="Overwrite", width=100, command=lambda: choose("--force")).pack(side="left", padx=5)
+    ctk.CTkButton(buttons, text="Cancel", width=100, command=popup.destroy).pack(side="left", padx=5)
+
+    popup.transient(controller)
+    popup.after(100, popup.grab_set) # Once the window is viewable
+    controller.wait_window(popup)
+    return choice.get()
+
+def profile_launch_args(controller, profile):
+    """Returns the mlagents-learn arguments and first port of a launch profile, see profiles.launch_args.
+
+    Returns:
+        tuple: ([], None) for the Unity editor, or (None, None) if the profile cannot be used.
+    """
+    from profiles import EDITOR, launch_args
+
+    if not profile or profile == EDITOR:
+        return [], None
+    try:
+        return launch_args(controller.working_dir, profile)
+    except KeyError:
+        message = f'The launch profile "{profile}" does not exist in this project.'
+    except ValueError as e:
+        message = f'The launch profile "{profile}" is not valid: {e}'
+    print(f"[ERROR] {message}")
+    messagebox.showerror("Launch Profile", message)
+    return None, None
+
+def queue_training(controller, run_id, argv, environ=None, show_output=True, first_port=None):
+    """Creates the output popup for a run and hands it to the job manager.
+
+    Args:
+        controller (MLAgentsApp): The main application instance.
+        run_id (str): The ID for the training session.
+        argv (list): The command that starts the run.
+        environ (dict): Environment variables for the run, None to inherit the app's.
+        show_output (bool): Whether the output popup is shown straight away. Otherwise the
+            popup is only created once the run is opened, see open_output, so a large sweep
+            does not create a window and a scrollback file for every run it queues.
+        first_port (int): The first port of the slot ranges, see jobs.Job.
+
+    Returns:
+        jobs.Job: The queued job.
+    """
+    start = time.monotonic()
+    if controller.job_manager.remote:
+        from remote import RemoteJob
+
+        # The daemon runs the job and keeps its log, this side only follows the output
+        job = RemoteJob(controller.job_manager.client, run_id, argv, controller.working_dir, environ, first_port)
+    else:
+        job = create_job(controller, run_id, argv, environ, first_port=first_port)
+
+    # Create the popup to show training output
+    job.output = create_output_popup(controller, job) if show_output else PendingOutput()
+
+    # The job manager starts the process and reads its output on a seperate thread
+    try:
+        controller.job_manager.submit(job)
+    except Exception:
+        if job.window is not None:
+            job.output.stop()
+            job.window.destroy()
+        raise
+
+    EVENTS.timing("ui.queue_training", time.monotonic() - start, run_id, remote=controller.job_manager.remote)
+    print(f"    [ALERT] Training queued with run-id: {run_id}")
+    return job
+
+def begin_sweep(controller, sweep_id, spec_file, profile=None, on_queued=None):
+    """Generates the configs for a hyperparameter sweep and queues a run for each of them.
+
+    Like begin_training, the commands are built on a worker thread and the runs are queued
+    from the Tk main loop once they are ready.
+
+    Args:
+        controller (MLAgentsApp): The main application instance.
+        sweep_id (str): Prefix for the run IDs of the sweep.
+        spec_file (str): The path to the sweep specification, see sweeps.load_sweep_spec.
+        profile (str): The name of a launch profile for a built environment, None for the Unity editor.
+        on_queued (callable): Called with a list of (job, overrides), one for each queued run.
+
+    Returns:
+        bool: True if the sweep is being queued, False if it was not started.
+    """
+    from sweeps import generate_sweep # Deferred, it pulls in yaml which startup does not need
+
+    print(f"\n[ALERT] Attempting to begin sweep: {sweep_id}")
+
+    env = controller.virtual_env
+    if not env:
+        print("[ERROR] No environment selected for training!")
+        return False
+
+    extra_args, first_port = profile_launch_args(controller, profile)
+    if extra_args is None:
+        return False
+
+    try:
+        runs = generate_sweep(controller.working_dir, sweep_id, spec_file)
+    except Exception as e:
+        print(f"    [ERROR] Failed to generate sweep configs: {e}")
+        messagebox.showerror("Sweep Error", f"Failed to generate sweep configs: {e}")
+        return False
+
+    in_use = [run_id for run_id, _, _ in runs if controller.job_manager.find_active(run_id)]
+    if in_use:
+        messagebox.showerror("Run ID in use", f'{len(in_use)} runs of sweep "{sweep_id}" are already queued or running.')
+        return False
+
+    # Ask once about overwriting, rather than for every run
+    results_dir = os.path.join(controller.working_dir, "results")
+    existing = [run_id for run_id, _, _ in runs if os.path.isdir(os.path.join(results_dir, run_id))]
+    force_flag = ""
+    if existing:
+        overwrite = messagebox.askyesno(
+            "Existing Run-IDs",
+            message=f'{len(existing)} of the {len(runs)} runs in sweep "{sweep_id}" already have results.',
+            detail="Do you want to force start the sweep and overwrite the previous results?",
+        )
+        if not overwrite:
+            print("    [ALERT] Sweep cancelled by the user.")
+            return False
+        force_flag = "--force"
+
+    def build_commands():
+        return [training_command(env, config_file, run_id, force_flag if run_id in existing else "", extra_args)
+                for run_id, config_file, _ in runs]
+
+    def on_commands(commands, error):
+        if error is not None:
+            print(f"    [ERROR] Failed to begin sweep: {error}")
+            messagebox.showerror("Sweep Error", f"Failed to begin sweep: {error}")
+            return
+        in_use = [run_id for run_id, _, _ in runs if controller.job_manager.find_active(run_id)]
+        if in_use: # Queued while the commands were being built
+            messagebox.showerror("Run ID in use", f'{len(in_use)} runs of sweep "{sweep_id}" are already queued or running.')
+            return
+
+        queued = []
+        for (run_id, _, overrides), (argv, environ) in zip(runs, commands):
+            queued.append((queue_training(controller, run_id, argv, environ, show_output=False, first_port=first_port), overrides))
 
-            if env:
-                deactivate_env(env, process)
-                print(f'Deactivating virtual environment "{env}"" as a consequence')
+        print(f"    [ALERT] Sweep {sweep_id} queued {len(queued)} runs")
+        if on_queued:
+            on_queued(queued)
 
-            return None
+    call_in_background(controller, build_commands, on_commands)
+    return True
         
-def create_output_popup(controller, run_id):
-    """Creates a popup window to display training output."""
+def open_output(controller, job):
+    """Shows the output popup of a run, creating it if the run was queued without one.
+
+    Returns:
+        bool: False if the run's output was closed, it is then only in the run log.
+    """
+    if job.window is not None:
+        job.window.deiconify()
+        job.window.lift()
+    elif isinstance(job.output, PendingOutput) and job.output.buffer is None:
+        job.output.attach(create_output_popup(controller, job))
+    elif hasattr(job, "follow"):
+        # A daemon's run, e.g. started before the app was, tail it from the first line
+        job.reset()
+        job.output = create_output_popup(controller, job)
+        job.follow()
+    else:
+        return False
+    return True
+
+def create_output_popup(controller, job, show=True):
+    """Creates a popup window to display the output of a training job."""
+    run_id = job.run_id
+
     popup = ctk.CTkToplevel(controller)
     popup.title(f"{run_id}")
-    popup.geometry("600x400")
+    job.window = popup
+    if not show:
+        popup.withdraw()
+    popup.geometry("600x560")
 
+    # A run of a built environment starts it itself, the editor waits for play
+    built = any(arg.startswith("--env=") for arg in job.command or ())
     label = ctk.CTkLabel(
         popup,
-        text=f'Training session "{run_id}" initialised, press play in the Unity editor to begin training',
+        text=f'Training session "{run_id}" initialised' + ("" if built else ", press play in the Unity editor to begin training"),
         font=("Arial", 14)
     )
     label.pack(pady=10)
 
+    # Live CPU, memory, I/O and thread use of the run's process group
+    resources_label = ctk.CTkLabel(
+        popup,
+        text="",
+        font=("Courier", 10)
+    )
+    resources_label.pack()
+
+    # Mean reward chart, fed by the metrics parsed from the output
+    if job.metrics is not None:
+        from charts import SeriesChart
+
+        chart = SeriesChart(popup, job.metrics)
+        chart.pack(fill="x", padx=10)
+
     # ScrolledText widget to show output
     text_widget = scrolledtext.ScrolledText(
         popup, 
@@ -163,74 +428,31 @@ def create_output_popup(controller, run_id):
     )
     text_widget.pack(expand=True, fill="both", padx=10, pady=10)
 
+    # Output is queued here by the reader thread and flushed into the widget in batches
+    output = OutputBuffer(text_widget, scrollback_lines=controller.scrollback_lines)
+    output.start()
+
     def end_training():
         """Signals to end the training session."""
         print(f"    [ALERT] Attempting to terminate training session, stand by...")
+        EVENTS.emit("ui.end_training", run_id, state=job.state)
 
-        text_widget.insert(
-                    tk.END,
-                    "\n[CTRL Panel] Attempting to terminate training session, stand by...\n"
-                )
+        output.write("\n[CTRL Panel] Attempting to terminate training session, stand by...\n")
         
-        process = getattr(controller, 'current_training_process', None)
-
-        if process and process.poll() is None:
-            try:
-                # Attempt graceful termination with SIGINT
-                try:
-                    print("    [INFO] Terminating the process group with SIGINT...")
-                    os.killpg(os.getpgid(process.pid), signal.SIGINT) # Send SIGINT to terminate the process
-                    process.wait(timeout=15)
-                except subprocess.TimeoutExpired:
-                    print("    [WARNING] Process group did not terminate within timeout, forcing termination...")
-                except Exception as e:
-                    print(f"    [ERROR] Failed to send SIGINT: {e}")
-                
-                # If process hasn't ended, forcefully terminate it
-                if process.poll() is None:
-                    try:
-                        print("    [INFO] Sending SIGTERM to process group...")
-                        os.killpg(os.getpgid(process.pid), signal.SIGTERM) # Send SIGTERM to terminate gracefully (less aggressive)
-                        process.wait(timeout=5)
-                    except subprocess.TimeoutExpired:
-                        print("    [WARNING] Process group did not terminate within 5 seconds after SIGTERM.")
-                    except Exception as e:
-                        print(f"    [ERROR] Failed to send SIGTERM: {e}")
-
-                # If the process still hasn't terminated, kill it
-                if process.poll() is None:
-                    try:
-                        print("    [INFO] Forcing process group termination with SIGKILL...")
-                        os.killpg(os.getpgid(process.pid), signal.SIGKILL)
-                    except Exception as e:
-                        print(f"    [ERROR] Failed to kill process: {e}")
-
-                # Process terminated successfully
-                print(f"    [SUCCESS] Training session terminated.")
-                text_widget.after(
-                    0,
-                    text_widget.insert,
-                    tk.END,
-                    "\n[CTRL Panel] Training session terminated.\n"
-                )
-
-                end_button.after(0, lambda: end_button.configure(state="disabled"))
-                close_button.after(0, lambda: close_button.configure(state="normal"))
+        if controller.job_manager.cancel(job):
+            print(f"    [SUCCESS] Queued run {run_id} cancelled.")
+            end_button.configure(state="disabled")
+            close_button.configure(state="normal")
+            return
 
-            except Exception as e:
-                print(f"[ERROR] Failed to terminate training session: {e}")
-                text_widget.after(
-                    0,
-                    text_widget.insert,
-                    tk.END,
-                    f"\n[ERROR] Encountered a problem terminating session: {e}\n"
-                )
+        # Escalates from SIGINT to SIGTERM to SIGKILL on a worker thread, see JobManager.stop
+        if controller.job_manager.stop(job):
+            end_button.configure(state="disabled")
+        elif job.stop_requested:
+            output.write("\n[CTRL Panel] The training session is already stopping.\n")
         else:
             print("[ERROR] No active training session to terminate.")
-            text_widget.insert(
-                tk.END,
-                "\n[CTRL Panel] No active training session to terminate.\n"
-            )
+            output.write("\n[CTRL Panel] No active training session to terminate.\n")
 
     end_button = ctk.CTkButton(
         popup,
@@ -239,36 +461,228 @@ def create_output_popup(controller, run_id):
     )
     end_button.pack(pady=5)
 
+    def close_popup():
+        output.stop()
+        popup.destroy()
+        job.window = None
+        if job.output is output:
+            job.output = None # The reader keeps a reference, but writes to a stopped buffer are ignored
+
     close_button = ctk.CTkButton(
         popup,
         text="Close",
         state="disabled",
-        command=popup.destroy
+        command=close_popup
     )
     close_button.pack(pady=5)
+    popup.protocol("WM_DELETE_WINDOW", close_popup) # Closed from the title bar, even while the run goes on
 
-    return text_widget
+    def open_search():
+        from frames import SearchWindow # Deferred, frames imports this module
 
-def stream_process_output(process, text_widget):
-    """Streams the subprocess output to the given text widget."""
-    def append_text(data):
-        text_widget.insert(tk.END, data)
-        text_widget.see(tk.END) # Auto-scroll to the end
+        SearchWindow(popup, job.search, f"Search: {run_id}")
 
-    while process.poll() is None:
-        readable, _, _ = select.select([process.stdout, process.stderr], [], [], 0.1)
-        for stream in readable:
-            line = stream.readline()
-            if line:
-                text_widget.after(0, append_text, line)
-    
-    # Handle remaining output after process ends
-    for stream in (process.stdout, process.stderr):
-        for line in stream:
-            text_widget.after(0, append_text, line)
-    
-    # Mark process as finished
-    text_widget.after(0, append_text, "\n[CTRL Panel] Training Session Ended\n")
+    if job.search is not None:
+        search_button = ctk.CTkButton(
+            popup,
+            text="Search Output",
+            command=open_search
+        )
+        search_button.pack(pady=5)
+
+    status_label = ctk.CTkLabel(
+        popup,
+        text="",
+        font=("Arial", 11)
+    )
+    status_label.pack(pady=(0, 5))
+
+    def watch_job():
+        """Shows resource use and stop progress, and enables Close once the run has ended."""
+        try:
+            status_label.configure(text=f"Stopped early: {job.stop_reason}\n{job.stop_status}" if job.stop_reason else job.stop_status)
+            if job.resources:
+                resources_label.configure(text=format_sample(job.resources.latest()))
+            if job.active:
+                popup.after(250, watch_job)
+            else:
+                end_button.configure(state="disabled")
+                close_button.configure(state="normal")
+        except tk.TclError:
+            pass # The popup has been closed
+
+    watch_job()
+
+    return output
+
+class OutputBuffer:
+    """Thread-safe queue of output text, flushed into a Tk text widget in batches.
+
+    Reader threads call `write`, which never touches Tk. A single periodic callback on the
+    Tk main loop drains the queue with one `insert` and one `see` per flush, so a chatty
+    trainer cannot flood the event queue.
+
+    If the main loop falls behind by more than `max_queued` bytes, the oldest queued output
+    goes straight to the on-disk scrollback, and is paged in from there once scrolled to.
+    Without a scrollback it is dropped. Once stopped, e.g. because its popup was closed,
+    the buffer ignores further writes.
+
+    Args:
+        text_widget (tk.Text): The widget the output is flushed into.
+        interval_ms (int): Milliseconds between flushes.
+        max_bytes (int): Upper bound on the amount of text inserted per flush. Anything
+            beyond it stays queued for the next flush.
+        scrollback_lines (int): Number of lines kept in the widget, with the full history
+            kept on disk. None keeps everything in the widget.
+        max_queued (int): Upper bound on the amount of text waiting for a flush.
+    """
+
+    def __init__(self, text_widget, interval_ms=FLUSH_INTERVAL_MS, max_bytes=FLUSH_MAX_BYTES, scrollback_lines=None,
+                 max_queued=QUEUE_MAX_BYTES):
+        self.text_widget = text_widget
+        self.interval_ms = interval_ms
+        self.max_bytes = max_bytes
+        self.max_queued = max_queued
+        self.scrollback = ScrollbackView(text_widget, scrollback_lines) if scrollback_lines else None
+
+        self._chunks = collections.deque()
+        self._queued = 0 # Length of the text in _chunks
+        self._skipped = 0 # Length of the text that bypassed the widget since the last flush
+        self._history_lines = 0 # Lines in the scrollback history once the last _take appended to it
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._after_id = None
+
+    def write(self, data):
+        """Queues text for the next flush. Safe to call from any thread."""
+        if not data:
+            return
+        with self._lock:
+            if self._stopped:
+                return
+            self._chunks.append(data)
+            self._queued += len(data)
+
+            while self._queued > self.max_queued and len(self._chunks) > 1:
+                chunk = self._chunks.popleft()
+                self._queued -= len(chunk)
+                self._skipped += len(chunk)
+                if self.scrollback:
+                    self.scrollback.history.append(chunk) # Under the lock, so it stays in order with _take
+
+    def start(self):
+        """Starts the periodic flush on the Tk main loop."""
+        if self._after_id is None:
+            self._after_id = self.text_widget.after(self.interval_ms, self._flush)
+
+    def stop(self):
+        """Cancels the periodic flush, drops the queued text and releases the on-disk scrollback."""
+        with self._lock:
+            self._stopped = True
+            self._chunks.clear()
+            self._queued = 0
+
+        if self._after_id is not None:
+            try:
+                self.text_widget.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+
+        if self.scrollback:
+            self.scrollback.close()
+
+    def _take(self):
+        """Removes and returns up to `max_bytes` of queued text, recorded in the scrollback history."""
+        parts = []
+        budget = self.max_bytes
+        with self._lock:
+            while self._chunks and budget > 0:
+                chunk = self._chunks.popleft()
+                if len(chunk) > budget:
+                    # Split oversized chunks, the remainder goes back to the front of the queue
+                    self._chunks.appendleft(chunk[budget:])
+                    chunk = chunk[:budget]
+                parts.append(chunk)
+                budget -= len(chunk)
+            data = "".join(parts)
+            self._queued -= len(data)
+            if data and self.scrollback:
+                self.scrollback.history.append(data)
+                self._history_lines = self.scrollback.history.lines # Before a writer can append more
+        return data
+
+    def _flush(self):
+        with self._lock:
+            skipped, self._skipped = self._skipped, 0
+        data = self._take()
+        try:
+            if skipped and self.scrollback:
+                self.scrollback.skip()
+            elif skipped:
+                self.text_widget.insert(tk.END, f"\n[CTRL Panel] {skipped} characters of output were dropped, the panel fell behind\n")
+
+            if data and self.scrollback:
+                if self.scrollback.show(data, self._history_lines):
+                    self.text_widget.see(tk.END) # Only follow the output if the view is at the end
+            elif data:
+                self.text_widget.insert(tk.END, data)
+                self.text_widget.see(tk.END) # Auto-scroll to the end, once per batch
+            self._after_id = self.text_widget.after(self.interval_ms, self._flush)
+        except tk.TclError:
+            # The widget has been destroyed, nothing left to flush into
+            self._after_id = None
+            self.stop()
+
+class PendingOutput:
+    """Keeps the latest output of a run whose popup has not been opened yet.
+
+    It stands in for the OutputBuffer, without any Tk widget or scrollback file, until `attach`
+    hands the kept output and everything written after it to the popup's buffer. Only the
+    last `max_bytes` are kept, the rest is in the run log.
+
+    Args:
+        max_bytes (int): Upper bound on the output kept.
+    """
+
+    def __init__(self, max_bytes=PENDING_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.buffer = None # The popup's OutputBuffer, once attached
+
+        self._chunks = collections.deque()
+        self._size = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        """Keeps or forwards text. Safe to call from any thread."""
+        if not data:
+            return
+        with self._lock:
+            buffer = self.buffer
+            if buffer is None:
+                self._chunks.append(data)
+                self._size += len(data)
+                while self._size > self.max_bytes and len(self._chunks) > 1:
+                    chunk = self._chunks.popleft()
+                    self._size -= len(chunk)
+                    self._dropped += len(chunk)
+                return
+        buffer.write(data)
+
+    def attach(self, buffer):
+        """Writes the kept output to `buffer` and forwards all later output to it."""
+        with self._lock:
+            if self._dropped:
+                buffer.write(f"[CTRL Panel] {self._dropped} characters of earlier output are only in the run log\n")
+            buffer.write("".join(self._chunks))
+            self._chunks.clear()
+            self._size = 0
+            self.buffer = buffer
+
+    def stop(self):
+        if self.buffer is not None:
+            self.buffer.stop()
 
 def deactivate_env(env, process):
     "Deactivates the selected virtual environment in a subprocess"